@@ -50,6 +50,7 @@ import hcraft.planning as planning
 from hcraft.elements import Item, Stack, Zone
 from hcraft.transformation import Transformation
 from hcraft.env import HcraftEnv, HcraftState
+from hcraft.state import BatchedHcraftState
 from hcraft.purpose import Purpose
 from hcraft.render.human import get_human_action, render_env_with_human
 from hcraft.task import GetItemTask, GoToZoneTask, PlaceItemTask
@@ -57,6 +58,7 @@ from hcraft.task import GetItemTask, GoToZoneTask, PlaceItemTask
 
 __all__ = [
     "HcraftState",
+    "BatchedHcraftState",
     "Transformation",
     "Item",
     "Stack",
@@ -0,0 +1,1339 @@
+"""# Compiled transformations
+
+All transformations of a `hcraft.world.World` can be compiled into stacked sparse arrays
+where the row `t` of each array describes the transformation of index `t`.
+
+This allows to compute the legality of every action with a few vectorized comparisons
+instead of checking each transformation one by one.
+
+```python
+from hcraft.examples import MineHcraftEnv
+
+env = MineHcraftEnv()
+env.reset()
+compiled = env.world.compiled_transformations
+action_is_legal = compiled.valid_mask(env.state)
+```
+
+Those arrays are built once by `World.compile` into a `CompiledWorld`,
+a flat read-only buffer without reference to the transformations
+that can be pickled or memory-mapped to share it between processes.
+
+"""
+
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from hcraft.kernels import NUMBA_AVAILABLE, KernelWorld
+from hcraft.transformation import (
+    MAX_SENTINEL,
+    MIN_SENTINEL,
+    InventoryOperation,
+    InventoryOwner,
+    _add_to_inventory,
+)
+
+if TYPE_CHECKING:
+    from hcraft.state import HcraftState
+    from hcraft.transformation import TransformationOperations
+    from hcraft.world import World
+
+
+NO_SLOT = -1
+"""Slot used when a transformation has no zone restriction or no destination."""
+
+HASH_SEED = 0
+"""Seed of the random hash keys, so that equal states hash equally across processes."""
+HASH_MASK = 2**64 - 1
+
+BUFFER_ALIGNMENT = 64
+"""Alignment in bytes of the arrays in the buffer of a `CompiledWorld`."""
+_HEADER_LENGTH_BYTES = 8
+
+WrittenChanges = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+"""Player slots, their changes, flattened zones slots and their changes."""
+
+
+class SparseOperation:
+    """Rows of (slot, value) pairs stored in compressed sparse row format.
+
+    The entries of the row `t` are `slots[indptr[t]:indptr[t+1]]`
+    and `values[indptr[t]:indptr[t+1]]`.
+    """
+
+    def __init__(
+        self, rows_slots: List[np.ndarray], rows_values: List[np.ndarray]
+    ) -> None:
+        lengths = [len(slots) for slots in rows_slots]
+        self.indptr = np.zeros(len(rows_slots) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum(lengths)
+        self.slots = _concatenate(rows_slots, dtype=np.int64)
+        self.values = _concatenate(rows_values, dtype=np.int32)
+        self.rows = np.repeat(np.arange(len(rows_slots)), lengths)
+
+    @classmethod
+    def from_entries(
+        cls, indptr: np.ndarray, slots: np.ndarray, values: np.ndarray
+    ) -> "SparseOperation":
+        """Sparse operation over existing entries, without copying them."""
+        operation = cls.__new__(cls)
+        operation.indptr, operation.slots, operation.values = indptr, slots, values
+        operation.rows = np.repeat(np.arange(indptr.shape[0] - 1), np.diff(indptr))
+        return operation
+
+    @property
+    def nnz(self) -> int:
+        """Number of stored entries."""
+        return self.values.shape[0]
+
+    @property
+    def entries(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Row pointers, slots and values of the entries."""
+        return self.indptr, self.slots, self.values
+
+    def row(self, index: int) -> slice:
+        """Slice of the entries of the given row."""
+        return slice(self.indptr[index], self.indptr[index + 1])
+
+    def gather(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Entries of the given rows, one row per position.
+
+        Args:
+            rows: Row to gather for each position.
+
+        Returns:
+            The position of each gathered entry and the index of the entry.
+        """
+        starts = self.indptr[rows]
+        lengths = self.indptr[np.asarray(rows) + 1] - starts
+        positions = np.repeat(np.arange(lengths.shape[0]), lengths)
+        first_entries = np.cumsum(lengths) - lengths
+        offsets = np.arange(positions.shape[0]) - first_entries[positions]
+        return positions, starts[positions] + offsets
+
+
+class IndexLists:
+    """Lists of indexes stored in compressed sparse row format."""
+
+    def __init__(self, keys: np.ndarray, indexes: np.ndarray, n_keys: int) -> None:
+        """
+        Args:
+            keys: Key of each index.
+            indexes: Indexes to store in the list of their key.
+            n_keys: Total number of keys.
+        """
+        order = np.lexsort((indexes, keys))
+        self.indexes = indexes[order].astype(np.int64)
+        self.indptr = np.zeros(n_keys + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum(np.bincount(keys, minlength=n_keys))
+
+    @classmethod
+    def from_entries(cls, indptr: np.ndarray, indexes: np.ndarray) -> "IndexLists":
+        """Index lists over existing entries, without copying them."""
+        index_lists = cls.__new__(cls)
+        index_lists.indptr, index_lists.indexes = indptr, indexes
+        return index_lists
+
+    def row(self, key: int) -> np.ndarray:
+        """Indexes stored for the given key."""
+        return self.indexes[self.indptr[key] : self.indptr[key + 1]]
+
+
+class CompiledWorld:
+    """Arrays of every compiled transformation of a world, in a single flat buffer.
+
+    It holds the operations, zone buckets, dependency index and hash keys
+    used by `CompiledTransformations` without any reference to
+    the Transformation objects, so it is cheap to pickle into subprocesses
+    and can be saved once then memory-mapped by each of them:
+
+    ```python
+    compiled_world = world.compile()
+    compiled_world.save("world.npy")
+
+    # In each worker
+    world.attach_compiled(CompiledWorld.load("world.npy"))
+    ```
+
+    The buffer starts with the length of a JSON header giving the sizes of the world
+    and the offset, shape and dtype of each array, followed by the arrays
+    aligned on `BUFFER_ALIGNMENT` bytes. Arrays are read-only views over the buffer.
+
+    """
+
+    def __init__(self, buffer: np.ndarray) -> None:
+        """
+        Args:
+            buffer: Flat uint8 buffer, as built by `CompiledWorld.from_arrays`.
+        """
+        self.buffer = buffer
+        header_length = int(buffer[:_HEADER_LENGTH_BYTES].view(np.uint64)[0])
+        header_end = _HEADER_LENGTH_BYTES + header_length
+        header = json.loads(buffer[_HEADER_LENGTH_BYTES:header_end].tobytes())
+        self.sizes: Dict[str, int] = header["sizes"]
+        self.arrays: Dict[str, np.ndarray] = {}
+        data_offset = _aligned(header_end)
+        for name, (offset, shape, dtype) in header["arrays"].items():
+            array = np.ndarray(
+                shape, dtype=dtype, buffer=buffer, offset=data_offset + offset
+            )
+            array.flags.writeable = False
+            self.arrays[name] = array
+
+    @classmethod
+    def from_arrays(
+        cls, arrays: Dict[str, np.ndarray], sizes: Dict[str, int]
+    ) -> "CompiledWorld":
+        """Lay out the given arrays in a new buffer.
+
+        Args:
+            arrays: Arrays to store by name.
+            sizes: Integer sizes of the world by name.
+        """
+        layout, size = {}, 0
+        for name, array in arrays.items():
+            layout[name] = (size, array.shape, array.dtype.str)
+            size = _aligned(size + array.nbytes)
+        header = json.dumps({"sizes": sizes, "arrays": layout}).encode()
+        header_end = _HEADER_LENGTH_BYTES + len(header)
+        data_offset = _aligned(header_end)
+        buffer = np.zeros(data_offset + size, dtype=np.uint8)
+        buffer[:_HEADER_LENGTH_BYTES].view(np.uint64)[0] = len(header)
+        buffer[_HEADER_LENGTH_BYTES:header_end] = np.frombuffer(header, np.uint8)
+        for name, array in arrays.items():
+            start = data_offset + layout[name][0]
+            buffer[start : start + array.nbytes] = (
+                np.ascontiguousarray(array).view(np.uint8).reshape(-1)
+            )
+        return cls(buffer)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap: bool = True) -> "CompiledWorld":
+        """Load a compiled world saved with `CompiledWorld.save`.
+
+        Args:
+            path: Path of the saved .npy file.
+            mmap: Whether to memory-map the file instead of reading it,
+                so that processes loading it share the same memory.
+                Defaults to True.
+        """
+        return cls(np.load(path, mmap_mode="r" if mmap else None))
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Save the buffer as a .npy file."""
+        np.save(path, self.buffer)
+
+    def __reduce__(self):
+        return (CompiledWorld, (np.array(self.buffer),))
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+    def operation(self, name: str) -> SparseOperation:
+        """Sparse operation stored under the given name."""
+        return SparseOperation.from_entries(
+            self[f"{name}.indptr"], self[f"{name}.slots"], self[f"{name}.values"]
+        )
+
+    def index_lists(self, name: str) -> IndexLists:
+        """Index lists stored under the given name."""
+        return IndexLists.from_entries(self[f"{name}.indptr"], self[f"{name}.indexes"])
+
+    @property
+    def n_items(self) -> int:
+        """Number of different items the player can have."""
+        return self.sizes["n_items"]
+
+    @property
+    def n_zones(self) -> int:
+        """Number of different zones."""
+        return self.sizes["n_zones"]
+
+    @property
+    def n_zones_items(self) -> int:
+        """Number of different items the zones can have."""
+        return self.sizes["n_zones_items"]
+
+    @property
+    def n_transformations(self) -> int:
+        """Number of transformations."""
+        return self.sizes["n_transformations"]
+
+
+class CompiledTransformations:
+    """Every transformation of a world compiled into stacked sparse operations.
+
+    Each operation is stored as a `SparseOperation` whose row `t` holds the slots
+    where the transformation `t` differs from the operation default,
+    so that memory only grows with the number of inventory changes.
+    Bounds are integers using `MIN_SENTINEL` and `MAX_SENTINEL` for unbounded slots.
+    Specific zones operations are stored over the flattened zones inventories.
+
+    Minimum operations also have a default of 0 on every other slot,
+    (for transformations flagged in the corresponding `*_min_default` array)
+    which only matters for inventories with negative amounts.
+
+    Effects of each transformation are also stored as `SparseOperation`
+    of the slots it writes, and used to build a dependency index from each
+    transformation to the transformations whose preconditions read those slots.
+    (See `CompiledTransformations.affected_transformations`)
+
+    States are hashed as the sum modulo 2^64 of a random key of each slot multiplied
+    by its amount, plus a random key of the current zone. This hash only depends on
+    the state and is updated from the few slots written by each transformation.
+    (See `CompiledTransformations.state_hash`)
+
+    If `use_kernels`, states are updated by the fused loops of `hcraft.kernels`
+    over these arrays instead. It defaults to whether numba is installed.
+
+    """
+
+    def __init__(self, compiled_world: CompiledWorld) -> None:
+        """
+        Args:
+            compiled_world: Arrays of the compiled transformations,
+                used without copy. (See `compile_world`)
+        """
+        self.compiled_world = compiled_world
+        self.n_transformations = compiled_world.n_transformations
+        self.n_zones_items = compiled_world.n_zones_items
+
+        self.zone = compiled_world["zone"]
+        self.destination = compiled_world["destination"]
+        self.zone_transformations = compiled_world.index_lists("zone_transformations")
+        self.global_transformations = compiled_world["global_transformations"]
+        self._zones_candidates_entries: Dict[int, Dict] = {}
+
+        self.player_min = compiled_world.operation("player_min")
+        self.player_max = compiled_world.operation("player_max")
+        self.current_min = compiled_world.operation("current_min")
+        self.current_max = compiled_world.operation("current_max")
+        self.destination_min = compiled_world.operation("destination_min")
+        self.destination_max = compiled_world.operation("destination_max")
+        self.zones_min = compiled_world.operation("zones_min")
+        self.zones_max = compiled_world.operation("zones_max")
+        self.player_min_default = compiled_world["player_min_default"]
+        self.current_min_default = compiled_world["current_min_default"]
+        self.destination_min_default = compiled_world["destination_min_default"]
+        self.zones_min_default = compiled_world["zones_min_default"]
+
+        self.player_apply = compiled_world.operation("player_apply")
+        self.current_apply = compiled_world.operation("current_apply")
+        self.destination_apply = compiled_world.operation("destination_apply")
+        self.zones_apply = compiled_world.operation("zones_apply")
+
+        self.keeps_non_negative = bool(compiled_world.sizes["keeps_non_negative"])
+        self.dependents = compiled_world.index_lists("dependents")
+        self.zone_readers = compiled_world.index_lists("zone_readers")
+        self.current_readers = compiled_world["current_readers"]
+
+        self.player_keys = compiled_world["player_keys"]
+        self.zones_keys = compiled_world["zones_keys"]
+        self.zone_keys = compiled_world["zone_keys"]
+
+        self.use_kernels = NUMBA_AVAILABLE
+        self._kernel_world: Optional[KernelWorld] = None
+
+    @property
+    def kernel_world(self) -> KernelWorld:
+        """Arrays of the compiled transformations given to `hcraft.kernels`."""
+        if self._kernel_world is None:
+            self._kernel_world = KernelWorld(
+                zone=self.zone,
+                destination=self.destination,
+                player_min=self.player_min.entries,
+                player_max=self.player_max.entries,
+                current_min=self.current_min.entries,
+                current_max=self.current_max.entries,
+                destination_min=self.destination_min.entries,
+                destination_max=self.destination_max.entries,
+                zones_min=self.zones_min.entries,
+                zones_max=self.zones_max.entries,
+                player_min_default=self.player_min_default,
+                current_min_default=self.current_min_default,
+                destination_min_default=self.destination_min_default,
+                player_apply=self.player_apply.entries,
+                current_apply=self.current_apply.entries,
+                destination_apply=self.destination_apply.entries,
+                zones_apply=self.zones_apply.entries,
+                player_keys=self.player_keys,
+                zones_keys=self.zones_keys,
+                zone_keys=self.zone_keys,
+                n_zones_items=self.n_zones_items,
+            )
+        return self._kernel_world
+
+    def state_hash(
+        self,
+        player_inventory: np.ndarray,
+        zone_slot: int,
+        zones_inventories: np.ndarray,
+    ) -> int:
+        """Hash of a state, computed over all its slots."""
+        return self.slots_hash(
+            np.arange(self.player_keys.shape[0]),
+            player_inventory,
+            np.arange(self.zones_keys.shape[0]),
+            zones_inventories.reshape(-1),
+            zone_slot,
+        )
+
+    def slots_hash(
+        self,
+        player_slots: np.ndarray,
+        player_values: np.ndarray,
+        zones_slots: np.ndarray,
+        zones_values: np.ndarray,
+        zone_slot: int,
+    ) -> int:
+        """Part of the state hash given by the given slots and current zone.
+
+        Args:
+            player_slots: Slots of the player inventory.
+            player_values: Amounts in those player slots.
+            zones_slots: Slots of the flattened zones inventories.
+            zones_values: Amounts in those zones slots.
+            zone_slot: Slot of the current zone.
+        """
+        player_hash = self.player_keys[player_slots] * player_values.astype(np.uint64)
+        zones_hash = self.zones_keys[zones_slots] * zones_values.astype(np.uint64)
+        hash_value = int(np.sum(player_hash)) + int(np.sum(zones_hash))
+        if zone_slot != NO_SLOT:
+            hash_value += int(self.zone_keys[zone_slot])
+        return hash_value & HASH_MASK
+
+    def written_changes(self, index: int, zone_slot: int) -> WrittenChanges:
+        """Slots written by applying a transformation in the given zone
+        and the total change of each of them.
+
+        Returns:
+            Slots of the player inventory, their changes, unique slots of the
+            flattened zones inventories and their changes.
+        """
+        player_row = self.player_apply.row(index)
+        zones_slots = [self.zones_apply.slots[self.zones_apply.row(index)]]
+        zones_changes = [self.zones_apply.values[self.zones_apply.row(index)]]
+        for operation, zone in (
+            (self.current_apply, zone_slot),
+            (self.destination_apply, self.destination[index]),
+        ):
+            row = operation.row(index)
+            if row.stop > row.start:
+                zones_slots.append(zone * self.n_zones_items + operation.slots[row])
+                zones_changes.append(operation.values[row])
+        zones_slots, inverse = np.unique(
+            _concatenate(zones_slots, dtype=np.int64), return_inverse=True
+        )
+        zones_changes = np.bincount(
+            inverse.reshape(-1),
+            weights=_concatenate(zones_changes, dtype=np.int64),
+            minlength=zones_slots.shape[0],
+        ).astype(np.int64)
+        return (
+            self.player_apply.slots[player_row],
+            self.player_apply.values[player_row].astype(np.int64),
+            zones_slots,
+            zones_changes,
+        )
+
+    def batched_written_slots(
+        self, actions: np.ndarray, zone_slots: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Slots written by applying a transformation on each state of a batch.
+
+        Args:
+            actions: Index of the transformation applied on each state of shape (N,).
+            zone_slots: Slot of the zone where each transformation is applied.
+
+        Returns:
+            States and slots of the player inventories, then states and slots
+            of the flattened zones inventories. Slots may repeat.
+        """
+        player_states, indexes = self.player_apply.gather(actions)
+        zones_states, zones_slots = [], []
+        for operation, zones in (
+            (self.current_apply, zone_slots),
+            (self.destination_apply, self.destination[actions]),
+            (self.zones_apply, None),
+        ):
+            states, operation_indexes = operation.gather(actions)
+            cells = operation.slots[operation_indexes]
+            if zones is not None:
+                cells = zones[states] * self.n_zones_items + cells
+            zones_states.append(states)
+            zones_slots.append(cells)
+        return (
+            player_states,
+            self.player_apply.slots[indexes],
+            _concatenate(zones_states, dtype=np.int64),
+            _concatenate(zones_slots, dtype=np.int64),
+        )
+
+    def max_applications(
+        self,
+        index: int,
+        player_inventory: np.ndarray,
+        zone_slot: int,
+        zones_inventories: np.ndarray,
+    ) -> int:
+        """Number of times in a row a transformation can be applied from a state.
+
+        Transformations moving the player can only be applied once in a row,
+        others until one of their written slots leaves its bounds.
+
+        Returns:
+            0 if the transformation is not valid, `MAX_SENTINEL` if it can be applied
+            indefinitely.
+        """
+        if not self._is_valid(index, player_inventory, zone_slot, zones_inventories):
+            return 0
+        if self.destination[index] != NO_SLOT:
+            return 1
+        player_slots, player_changes, zones_slots, zones_changes = self.written_changes(
+            index, zone_slot
+        )
+        player_default = 0 if self.player_min_default[index] else MIN_SENTINEL
+        lower = [self._row_bounds(self.player_min, index, player_slots, player_default)]
+        upper = [self._row_bounds(self.player_max, index, player_slots, MAX_SENTINEL)]
+        zones_lower = self._row_bounds(self.zones_min, index, zones_slots, 0)
+        zones_upper = self._row_bounds(self.zones_max, index, zones_slots, MAX_SENTINEL)
+        if zone_slot != NO_SLOT:
+            current = zones_slots // self.n_zones_items == zone_slot
+            items = zones_slots[current] % self.n_zones_items
+            current_default = 0 if self.current_min_default[index] else MIN_SENTINEL
+            zones_lower[current] = np.maximum(
+                zones_lower[current],
+                self._row_bounds(self.current_min, index, items, current_default),
+            )
+            zones_upper[current] = np.minimum(
+                zones_upper[current],
+                self._row_bounds(self.current_max, index, items, MAX_SENTINEL),
+            )
+        values = np.concatenate(
+            (
+                player_inventory[player_slots].astype(np.int64),
+                zones_inventories.reshape(-1)[zones_slots].astype(np.int64),
+            )
+        )
+        return _repetitions(
+            values,
+            np.concatenate((player_changes, zones_changes)),
+            np.concatenate(lower + [zones_lower]),
+            np.concatenate(upper + [zones_upper]),
+        )
+
+    def batched_state_hash(
+        self,
+        player_inventories: np.ndarray,
+        zone_slots: np.ndarray,
+        zones_inventories: np.ndarray,
+    ) -> np.ndarray:
+        """Hash of each state of a batch, the same as `state_hash`.
+
+        Returns:
+            Hashes as uint64 of shape (N,).
+        """
+        flat_inventories = _flat_zones_inventories(zones_inventories)
+        hashes = np.sum(self.player_keys * player_inventories.astype(np.uint64), axis=1)
+        hashes += np.sum(self.zones_keys * flat_inventories.astype(np.uint64), axis=1)
+        if self.zone_keys.shape[0] > 0:
+            hashes += self.zone_keys[zone_slots]
+        return hashes
+
+    def zone_candidates(self, zone_slot: int) -> np.ndarray:
+        """Indexes of the transformations that can be valid in the given zone.
+
+        Those are the transformations restricted to this zone
+        and the ones without zone restriction.
+        """
+        if zone_slot == NO_SLOT:
+            return self.global_transformations
+        return np.concatenate(
+            (self.global_transformations, self.zone_transformations.row(zone_slot))
+        )
+
+    def _candidates_entries(
+        self, zone_slot: Optional[int], rows: np.ndarray
+    ) -> Dict[SparseOperation, Tuple[np.ndarray, ...]]:
+        """Entries of the given rows of each bound operation,
+        cached for the candidates of each zone."""
+        if zone_slot is not None and zone_slot in self._zones_candidates_entries:
+            return self._zones_candidates_entries[zone_slot]
+        rows_entries = {
+            entries: _rows_entries(entries, rows)
+            for entries in (
+                self.player_min,
+                self.player_max,
+                self.current_min,
+                self.current_max,
+                self.destination_min,
+                self.destination_max,
+                self.zones_min,
+                self.zones_max,
+            )
+        }
+        if zone_slot is not None:
+            self._zones_candidates_entries[zone_slot] = rows_entries
+        return rows_entries
+
+    def valid_mask(
+        self, state: "HcraftState", rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Boolean mask of the transformations that are valid in the given state.
+
+        Args:
+            state: State to check transformations against.
+            rows: Indexes of the transformations to check. Defaults to all of them.
+        """
+        return self._valid_mask(
+            state.player_inventory,
+            state.zone_slot,
+            state.zones_inventories,
+            rows,
+        )
+
+    def is_valid(self, index: int, state: "HcraftState") -> bool:
+        """Is the transformation of the given index valid in the given state?"""
+        return self._is_valid(
+            index,
+            state.player_inventory,
+            state.zone_slot,
+            state.zones_inventories,
+        )
+
+    def batched_valid_mask(
+        self,
+        player_inventories: np.ndarray,
+        zone_slots: np.ndarray,
+        zones_inventories: np.ndarray,
+    ) -> np.ndarray:
+        """Boolean mask of valid transformations for each state of a batch.
+
+        Args:
+            player_inventories: Player inventories of shape (N, n_items).
+            zone_slots: Slot of the current zone of each state of shape (N,).
+            zones_inventories: Zones inventories of shape (N, n_zones, n_zones_items).
+
+        Returns:
+            Boolean mask of shape (N, n_transformations).
+        """
+        if self.zone_transformations.indexes.shape[0] == 0:
+            valid = self._non_negative_batched_valid_mask(
+                player_inventories,
+                zone_slots,
+                zones_inventories,
+                np.arange(self.n_transformations),
+            )
+        else:
+            # Only transformations available in the zone of states are checked.
+            valid = np.zeros(
+                (player_inventories.shape[0], self.n_transformations), dtype=bool
+            )
+            for zone_slot in np.unique(zone_slots):
+                states = np.flatnonzero(zone_slots == zone_slot)
+                rows = self.zone_candidates(zone_slot)
+                valid[np.ix_(states, rows)] = self._non_negative_batched_valid_mask(
+                    player_inventories[states],
+                    zone_slots[states],
+                    zones_inventories[states],
+                    rows,
+                    zone_slot=int(zone_slot),
+                )
+        # Rare states with negative inventories use the exact single state check.
+        for state_index in _negative_states(player_inventories, zones_inventories):
+            valid[state_index] = self._valid_mask(
+                player_inventories[state_index],
+                zone_slots[state_index],
+                zones_inventories[state_index],
+            )
+        return valid
+
+    def _non_negative_batched_valid_mask(
+        self,
+        player_inventories: np.ndarray,
+        zone_slots: np.ndarray,
+        zones_inventories: np.ndarray,
+        rows: np.ndarray,
+        zone_slot: Optional[int] = None,
+    ) -> np.ndarray:
+        """Batched valid mask of the given rows, for non-negative inventories.
+
+        If all states are in the same zone, its slot can be given to reuse
+        the entries of its candidate rows.
+        """
+        rows_entries = self._candidates_entries(zone_slot, rows)
+        zone_slots = zone_slots[:, np.newaxis]
+        zone, destination = self.zone[rows], self.destination[rows]
+        valid = (zone == NO_SLOT) | (zone == zone_slots)
+        valid &= (destination == NO_SLOT) | (destination != zone_slots)
+        checks = [
+            (self.player_min, np.less, player_inventories),
+            (self.player_max, np.greater, player_inventories),
+        ]
+        if zones_inventories.shape[1] * zones_inventories.shape[2] > 0:
+            states = np.arange(zones_inventories.shape[0])
+            current_inventories = zones_inventories[states, zone_slots[:, 0]]
+            flat_inventories = _flat_zones_inventories(zones_inventories)
+            checks += [
+                (self.current_min, np.less, current_inventories),
+                (self.current_max, np.greater, current_inventories),
+                (self.destination_min, np.less, None),
+                (self.destination_max, np.greater, None),
+                (self.zones_min, np.less, flat_inventories),
+                (self.zones_max, np.greater, flat_inventories),
+            ]
+        for entries, compare, inventories in checks:
+            indptr, slots, values, positions = rows_entries[entries]
+            if slots.shape[0] == 0:
+                continue
+            if inventories is None:
+                amounts = zones_inventories[:, destination[positions], slots]
+            else:
+                amounts = inventories[:, slots]
+            valid &= ~_any_per_row(compare(amounts, values), indptr)
+        return valid
+
+    def batched_is_valid(
+        self,
+        actions: np.ndarray,
+        player_inventories: np.ndarray,
+        zone_slots: np.ndarray,
+        zones_inventories: np.ndarray,
+    ) -> np.ndarray:
+        """Is the given transformation valid for each state of a batch?
+
+        Args:
+            actions: Index of the transformation to check for each state of shape (N,).
+            player_inventories: Player inventories of shape (N, n_items).
+            zone_slots: Slot of the current zone of each state of shape (N,).
+            zones_inventories: Zones inventories of shape (N, n_zones, n_zones_items).
+
+        Returns:
+            Boolean array of shape (N,).
+        """
+        valid = self._non_negative_batched_is_valid(
+            actions, player_inventories, zone_slots, zones_inventories
+        )
+        for state_index in _negative_states(player_inventories, zones_inventories):
+            valid[state_index] = self._is_valid(
+                actions[state_index],
+                player_inventories[state_index],
+                zone_slots[state_index],
+                zones_inventories[state_index],
+            )
+        return valid
+
+    def _non_negative_batched_is_valid(
+        self,
+        actions: np.ndarray,
+        player_inventories: np.ndarray,
+        zone_slots: np.ndarray,
+        zones_inventories: np.ndarray,
+    ) -> np.ndarray:
+        zone, destination = self.zone[actions], self.destination[actions]
+        valid = (zone == NO_SLOT) | (zone == zone_slots)
+        valid &= (destination == NO_SLOT) | (destination != zone_slots)
+        for entries, compare in (
+            (self.player_min, np.less),
+            (self.player_max, np.greater),
+        ):
+            states, indexes = entries.gather(actions)
+            bad = compare(
+                player_inventories[states, entries.slots[indexes]],
+                entries.values[indexes],
+            )
+            valid[states[bad]] = False
+        if zones_inventories.shape[1] * zones_inventories.shape[2] == 0:
+            return valid
+
+        flat_inventories = _flat_zones_inventories(zones_inventories)
+        for entries, compare, zones in (
+            (self.current_min, np.less, zone_slots),
+            (self.current_max, np.greater, zone_slots),
+            (self.destination_min, np.less, destination),
+            (self.destination_max, np.greater, destination),
+            (self.zones_min, np.less, None),
+            (self.zones_max, np.greater, None),
+        ):
+            states, indexes = entries.gather(actions)
+            cells = entries.slots[indexes]
+            if zones is not None:
+                cells = zones[states] * self.n_zones_items + cells
+            bad = compare(flat_inventories[states, cells], entries.values[indexes])
+            valid[states[bad]] = False
+        return valid
+
+    def batched_apply(
+        self,
+        actions: np.ndarray,
+        player_inventories: np.ndarray,
+        zone_slots: np.ndarray,
+        zones_inventories: np.ndarray,
+        hashes: Optional[np.ndarray] = None,
+    ) -> None:
+        """Apply in place the given transformation on each state of a batch.
+
+        Validity is not checked, states that should not change must be filtered out.
+
+        Args:
+            actions: Index of the transformation to apply for each state of shape (N,).
+            player_inventories: Player inventories of shape (N, n_items).
+            zone_slots: Slot of the current zone of each state of shape (N,).
+            zones_inventories: Zones inventories of shape (N, n_zones, n_zones_items).
+            hashes: Hashes of the states of shape (N,) to update in place if given.
+        """
+        states, indexes = self.player_apply.gather(actions)
+        _add_and_hash(
+            player_inventories,
+            states,
+            self.player_apply.slots[indexes],
+            self.player_apply.values[indexes],
+            self.player_keys,
+            hashes,
+        )
+        destination = self.destination[actions]
+        flat_inventories = _flat_zones_inventories(zones_inventories)
+        for operation, zones in (
+            (self.current_apply, zone_slots),
+            (self.destination_apply, destination),
+            (self.zones_apply, None),
+        ):
+            states, indexes = operation.gather(actions)
+            cells = operation.slots[indexes]
+            if zones is not None:
+                cells = zones[states] * self.n_zones_items + cells
+            _add_and_hash(
+                flat_inventories,
+                states,
+                cells,
+                operation.values[indexes],
+                self.zones_keys,
+                hashes,
+            )
+        moving = destination != NO_SLOT
+        if hashes is not None and np.any(moving):
+            hashes[moving] += self.zone_keys[destination[moving]]
+            hashes[moving] -= self.zone_keys[zone_slots[moving]]
+        zone_slots[moving] = destination[moving]
+
+    def _valid_mask(
+        self,
+        player_inventory: np.ndarray,
+        zone_slot: int,
+        zones_inventories: np.ndarray,
+        rows: Optional[np.ndarray] = None,
+        rows_entries: Optional[Dict[SparseOperation, Tuple[np.ndarray, ...]]] = None,
+    ) -> np.ndarray:
+        if rows is None:
+            if self.zone_transformations.indexes.shape[0] == 0:
+                rows = np.arange(self.n_transformations)
+            else:
+                # Only transformations available in the current zone are checked.
+                valid = np.zeros(self.n_transformations, dtype=bool)
+                rows = self.zone_candidates(zone_slot)
+                valid[rows] = self._valid_mask(
+                    player_inventory,
+                    zone_slot,
+                    zones_inventories,
+                    rows,
+                    self._candidates_entries(zone_slot, rows),
+                )
+                return valid
+        rows = np.asarray(rows, dtype=np.int64)
+        zone, destination = self.zone[rows], self.destination[rows]
+        valid = (zone == NO_SLOT) | (zone == zone_slot)
+        valid &= (destination == NO_SLOT) | (destination != zone_slot)
+
+        checks = [
+            (self.player_min, np.less, player_inventory, None),
+            (self.player_max, np.greater, player_inventory, None),
+        ]
+        if zones_inventories.size > 0:
+            flat_inventories = zones_inventories.reshape(-1)
+            current = np.full(rows.shape[0], zone_slot)
+            checks += [
+                (self.current_min, np.less, flat_inventories, current),
+                (self.current_max, np.greater, flat_inventories, current),
+                (self.destination_min, np.less, flat_inventories, destination),
+                (self.destination_max, np.greater, flat_inventories, destination),
+                (self.zones_min, np.less, flat_inventories, None),
+                (self.zones_max, np.greater, flat_inventories, None),
+            ]
+        for entries, compare, inventory, zones in checks:
+            positions, slots, values = self._row_entries(
+                entries, rows, zones, rows_entries
+            )
+            bad = compare(inventory[slots], values)
+            valid[positions[bad]] = False
+
+        if player_inventory.size > 0 and player_inventory.min() < 0:
+            negative = player_inventory < 0
+            valid &= ~self._uncovered_negatives(
+                self.player_min, self.player_min_default, rows, negative
+            )
+        if zones_inventories.size > 0 and zones_inventories.min() < 0:
+            negative = flat_inventories < 0
+            valid &= ~self._uncovered_negatives(
+                self.zones_min, self.zones_min_default, rows, negative
+            )
+            negative_per_zone = np.sum(zones_inventories < 0, axis=1)
+            valid &= ~self._uncovered_negatives(
+                self.current_min,
+                self.current_min_default,
+                rows,
+                negative,
+                zones=current,
+                n_negatives=negative_per_zone[zone_slot],
+            )
+            valid &= ~self._uncovered_negatives(
+                self.destination_min,
+                self.destination_min_default,
+                rows,
+                negative,
+                zones=destination,
+                n_negatives=negative_per_zone[destination],
+            )
+        return valid
+
+    def _is_valid(
+        self,
+        index: int,
+        player_inventory: np.ndarray,
+        zone_slot: int,
+        zones_inventories: np.ndarray,
+    ) -> bool:
+        rows = np.array([index], dtype=np.int64)
+        return bool(
+            self._valid_mask(player_inventory, zone_slot, zones_inventories, rows)[0]
+        )
+
+    def _row_entries(
+        self,
+        entries: SparseOperation,
+        rows: np.ndarray,
+        zones: Optional[np.ndarray] = None,
+        rows_entries: Optional[Dict[SparseOperation, Tuple[np.ndarray, ...]]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Position in rows, slot and value of entries of the given rows.
+
+        If zones are given, slots are flattened zones inventories slots
+        of the zone given for each row.
+        Entries already gathered for those rows can be given in `rows_entries`.
+        """
+        if rows_entries is not None:
+            _indptr, slots, values, positions = rows_entries[entries]
+        else:
+            positions, indexes = entries.gather(rows)
+            slots, values = entries.slots[indexes], entries.values[indexes]
+        if zones is not None:
+            slots = zones[positions] * self.n_zones_items + slots
+        return positions, slots, values
+
+    @staticmethod
+    def _row_bounds(
+        entries: SparseOperation, index: int, slots: np.ndarray, default: int
+    ) -> np.ndarray:
+        """Bounds of a transformation on the given slots, default where unlisted."""
+        row = entries.row(index)
+        bounds = np.full(slots.shape[0], default, dtype=np.int64)
+        listed = np.isin(slots, entries.slots[row])
+        if np.any(listed):
+            bound_of_slot = dict(zip(entries.slots[row], entries.values[row]))
+            bounds[listed] = [bound_of_slot[slot] for slot in slots[listed]]
+        return bounds
+
+    def _uncovered_negatives(
+        self,
+        entries: SparseOperation,
+        has_default: np.ndarray,
+        rows: np.ndarray,
+        negative: np.ndarray,
+        zones: Optional[np.ndarray] = None,
+        n_negatives: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Rows whose default minimum of 0 applies to some negative slot.
+
+        Entries replace the default, they are checked separately.
+        """
+        if n_negatives is None:
+            n_negatives = np.sum(negative)
+        positions, slots, _values = self._row_entries(entries, rows, zones)
+        n_covered = np.bincount(positions[negative[slots]], minlength=rows.shape[0])
+        return has_default[rows] & (n_covered < n_negatives)
+
+    def affected_transformations(self, index: int, previous_zone: int) -> np.ndarray:
+        """Transformations whose validity may change by applying the given one.
+
+        Args:
+            index: Index of the applied transformation.
+            previous_zone: Slot of the zone where the transformation was applied.
+
+        Returns:
+            Indexes of transformations that need to be checked again (may repeat).
+        """
+        dependents = self.dependents.row(index)
+        if self.destination[index] == NO_SLOT or previous_zone == NO_SLOT:
+            return dependents
+        return np.concatenate((dependents, self.zone_readers.row(previous_zone)))
+
+
+_OPERATIONS = {
+    "player_min": (InventoryOwner.PLAYER, InventoryOperation.MIN),
+    "player_max": (InventoryOwner.PLAYER, InventoryOperation.MAX),
+    "current_min": (InventoryOwner.CURRENT, InventoryOperation.MIN),
+    "current_max": (InventoryOwner.CURRENT, InventoryOperation.MAX),
+    "destination_min": (InventoryOwner.DESTINATION, InventoryOperation.MIN),
+    "destination_max": (InventoryOwner.DESTINATION, InventoryOperation.MAX),
+    "zones_min": (InventoryOwner.ZONES, InventoryOperation.MIN),
+    "zones_max": (InventoryOwner.ZONES, InventoryOperation.MAX),
+    "player_apply": (InventoryOwner.PLAYER, InventoryOperation.APPLY),
+    "current_apply": (InventoryOwner.CURRENT, InventoryOperation.APPLY),
+    "destination_apply": (InventoryOwner.DESTINATION, InventoryOperation.APPLY),
+    "zones_apply": (InventoryOwner.ZONES, InventoryOperation.APPLY),
+}
+"""Owner and operation of each compiled operation."""
+
+
+def compile_world(world: "World") -> CompiledWorld:
+    """Compile every transformation of a world into a `CompiledWorld`.
+
+    Args:
+        world: World of the transformations to compile.
+    """
+    n_transformations = len(world.transformations)
+    transformations_operations = [
+        world.transformation_operations(index) for index in range(n_transformations)
+    ]
+
+    zone = np.full(n_transformations, NO_SLOT, dtype=np.int64)
+    destination = np.full(n_transformations, NO_SLOT, dtype=np.int64)
+    for index, transfo_operations in enumerate(transformations_operations):
+        if transfo_operations.zone_slot is not None:
+            zone[index] = transfo_operations.zone_slot
+        if transfo_operations.destination_slot is not None:
+            destination[index] = transfo_operations.destination_slot
+    restricted = zone != NO_SLOT
+    zone_transformations = IndexLists(
+        zone[restricted], np.flatnonzero(restricted), world.n_zones
+    )
+
+    operations: Dict[str, SparseOperation] = {}
+    min_defaults: Dict[str, np.ndarray] = {}
+    for name, (owner, operation) in _OPERATIONS.items():
+        operations[name], has_operation = _compile(
+            transformations_operations, owner, operation
+        )
+        if operation is InventoryOperation.MIN:
+            min_defaults[f"{name}_default"] = has_operation
+    # Every zone item must be non-negative unless explicitly bounded.
+    min_defaults["zones_min_default"] = np.ones(n_transformations, dtype=bool)
+
+    dependents, zone_readers, current_readers = _dependencies(
+        operations, zone, destination, world.n_items, world.n_zones, world.n_zones_items
+    )
+    rng = np.random.default_rng(HASH_SEED)
+    arrays = {
+        "zone": zone,
+        "destination": destination,
+        "global_transformations": np.flatnonzero(~restricted),
+        **_index_lists_arrays("zone_transformations", zone_transformations),
+        **min_defaults,
+        **_index_lists_arrays("dependents", dependents),
+        **_index_lists_arrays("zone_readers", zone_readers),
+        "current_readers": current_readers,
+        "player_keys": _random_keys(rng, world.n_items),
+        "zones_keys": _random_keys(rng, world.n_zones * world.n_zones_items),
+        "zone_keys": _random_keys(rng, world.n_zones),
+    }
+    for name, operation in operations.items():
+        indptr, slots, values = operation.entries
+        arrays[f"{name}.indptr"] = indptr
+        arrays[f"{name}.slots"] = slots
+        arrays[f"{name}.values"] = values
+    sizes = {
+        "n_items": world.n_items,
+        "n_zones": world.n_zones,
+        "n_zones_items": world.n_zones_items,
+        "n_transformations": n_transformations,
+        "keeps_non_negative": int(
+            _keeps_non_negative(operations, min_defaults, world.n_zones_items)
+        ),
+    }
+    return CompiledWorld.from_arrays(arrays, sizes)
+
+
+def _dependencies(
+    operations: Dict[str, SparseOperation],
+    zone: np.ndarray,
+    destination: np.ndarray,
+    n_items: int,
+    n_zones: int,
+    n_zones_items: int,
+) -> Tuple[IndexLists, IndexLists, np.ndarray]:
+    """Index the transformations reading each slot to know which ones to check
+    again when a transformation writes on this slot.
+
+    This only holds while inventories stay non-negative, as the non-negative
+    default bounds are not considered as reads.
+
+    Returns:
+        The transformations whose validity may change after each transformation,
+        the transformations restricted to or moving to each zone,
+        and the transformations reading the current zone inventory.
+    """
+    transformations = np.arange(zone.shape[0])
+    player_apply = operations["player_apply"]
+    current_apply = operations["current_apply"]
+    destination_apply = operations["destination_apply"]
+    zones_apply = operations["zones_apply"]
+    n_zones_items_keys = max(1, n_zones_items)
+
+    readers, items = _bounds_reads(operations["player_min"], operations["player_max"])
+    player_readers = IndexLists(items, readers, n_items)
+
+    current_readers, current_items = _bounds_reads(
+        operations["current_min"], operations["current_max"]
+    )
+    destination_readers, destination_items = _bounds_reads(
+        operations["destination_min"], operations["destination_max"]
+    )
+    zones_readers, zones_cells = _bounds_reads(
+        operations["zones_min"], operations["zones_max"]
+    )
+    zones_items_readers = IndexLists(
+        np.concatenate(
+            (current_items, destination_items, zones_cells % n_zones_items_keys)
+        ),
+        np.concatenate((current_readers, destination_readers, zones_readers)),
+        n_zones_items,
+    )
+    current_readers = np.unique(current_readers)
+
+    restricted = zone != NO_SLOT
+    moving = destination != NO_SLOT
+    zone_readers = IndexLists(
+        np.concatenate((zone[restricted], destination[moving])),
+        np.concatenate((transformations[restricted], transformations[moving])),
+        n_zones,
+    )
+
+    dependents_keys, dependents = [], []
+    for index in transformations:
+        index_dependents = [
+            player_readers.row(item)
+            for item in player_apply.slots[player_apply.row(index)]
+        ]
+        written_zones_items = np.concatenate(
+            (
+                current_apply.slots[current_apply.row(index)],
+                destination_apply.slots[destination_apply.row(index)],
+                zones_apply.slots[zones_apply.row(index)] % n_zones_items_keys,
+            )
+        )
+        index_dependents += [
+            zones_items_readers.row(zone_item) for zone_item in written_zones_items
+        ]
+        if destination[index] != NO_SLOT:
+            index_dependents.append(zone_readers.row(destination[index]))
+            index_dependents.append(current_readers)
+        index_dependents = np.unique(_concatenate(index_dependents, dtype=np.int64))
+        dependents_keys.append(np.full_like(index_dependents, index))
+        dependents.append(index_dependents)
+    dependents = IndexLists(
+        _concatenate(dependents_keys, dtype=np.int64),
+        _concatenate(dependents, dtype=np.int64),
+        zone.shape[0],
+    )
+    return dependents, zone_readers, current_readers
+
+
+def _keeps_non_negative(
+    operations: Dict[str, SparseOperation],
+    min_defaults: Dict[str, np.ndarray],
+    n_zones_items: int,
+) -> bool:
+    """Whether valid transformations can never make an inventory negative."""
+    player_min = _entries_dict(operations["player_min"])
+    player = operations["player_apply"]
+    for row, slot, value in zip(player.rows, player.slots, player.values):
+        min_bound = _min_bound(
+            player_min, min_defaults["player_min_default"], row, slot
+        )
+        if value < 0 and min_bound + value < 0:
+            return False
+
+    n_zones_items = max(1, n_zones_items)
+    removed_zones_items = {}
+    removals = []
+    for owner in ("current", "destination", "zones"):
+        operation = operations[f"{owner}_apply"]
+        explicit_bounds = _entries_dict(operations[f"{owner}_min"])
+        has_default = min_defaults[f"{owner}_min_default"]
+        for row, slot, value in zip(operation.rows, operation.slots, operation.values):
+            if value >= 0:
+                continue
+            zone_item = slot % n_zones_items
+            min_bound = _min_bound(explicit_bounds, has_default, row, slot)
+            removals.append((row, zone_item, min_bound))
+            removed = removed_zones_items.get((row, zone_item), 0)
+            removed_zones_items[(row, zone_item)] = removed - int(value)
+
+    # Removals of several owners may target the same zone, so all are summed.
+    for row, zone_item, min_bound in removals:
+        if min_bound - removed_zones_items[(row, zone_item)] < 0:
+            return False
+    return True
+
+
+def _index_lists_arrays(name: str, index_lists: IndexLists) -> Dict[str, np.ndarray]:
+    return {
+        f"{name}.indptr": index_lists.indptr,
+        f"{name}.indexes": index_lists.indexes,
+    }
+
+
+def _aligned(size: int) -> int:
+    return -(-size // BUFFER_ALIGNMENT) * BUFFER_ALIGNMENT
+
+
+def _add_and_hash(
+    inventories: np.ndarray,
+    states: np.ndarray,
+    slots: np.ndarray,
+    values: np.ndarray,
+    keys: np.ndarray,
+    hashes: Optional[np.ndarray],
+) -> None:
+    """Add values to the given slots of states and update their hashes if given."""
+    if hashes is None:
+        _add_to_inventory(inventories, (states, slots), values)
+        return
+    # Amounts may saturate, so hashes are updated from actual changes.
+    before = inventories[states, slots].astype(np.uint64)
+    _add_to_inventory(inventories, (states, slots), values)
+    after = inventories[states, slots].astype(np.uint64)
+    np.add.at(hashes, states, keys[slots] * after - keys[slots] * before)
+
+
+def _repetitions(
+    values: np.ndarray, changes: np.ndarray, lower: np.ndarray, upper: np.ndarray
+) -> int:
+    """Number of times changes can be added to values staying within bounds,
+    knowing that values are within bounds.
+
+    `MAX_SENTINEL` if there is no limit.
+    """
+    count = MAX_SENTINEL
+    decreasing = changes < 0
+    if np.any(decreasing):
+        margin = values[decreasing] - lower[decreasing]
+        count = min(count, int(np.min(margin // -changes[decreasing])) + 1)
+    increasing = changes > 0
+    if np.any(increasing):
+        margin = upper[increasing] - values[increasing]
+        count = min(count, int(np.min(margin // changes[increasing])) + 1)
+    return count
+
+
+def _random_keys(rng: np.random.Generator, n_keys: int) -> np.ndarray:
+    return rng.integers(0, HASH_MASK, size=n_keys, dtype=np.uint64, endpoint=True)
+
+
+def zone_slot_of(position: np.ndarray) -> int:
+    """Slot of the zone of a one-hot position, `NO_SLOT` if there is none."""
+    zone_slots = position.nonzero()[0]
+    if zone_slots.shape[0] == 0:
+        return NO_SLOT
+    return int(zone_slots[0])
+
+
+def _compile(
+    transformations_operations: List["TransformationOperations"],
+    owner: InventoryOwner,
+    operation: InventoryOperation,
+) -> Tuple[SparseOperation, np.ndarray]:
+    """Stack an operation of all transformations.
+
+    Returns:
+        The sparse operation and whether each transformation has this operation.
+    """
+    rows_slots, rows_values = [], []
+    has_operation = np.zeros(len(transformations_operations), dtype=bool)
+    for index, operations in enumerate(transformations_operations):
+        slots, values = operations.operation_entries(owner, operation)
+        rows_slots.append(slots)
+        rows_values.append(values)
+        has_operation[index] = operation in operations.inventory_operations.get(
+            owner, {}
+        )
+    return SparseOperation(rows_slots, rows_values), has_operation
+
+
+def _bounds_reads(
+    min_entries: SparseOperation, max_entries: SparseOperation
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows and slots of bounds that can fail on non-negative inventories."""
+    positive = min_entries.values > 0
+    rows = np.concatenate((min_entries.rows[positive], max_entries.rows))
+    slots = np.concatenate((min_entries.slots[positive], max_entries.slots))
+    return rows, slots
+
+
+def _entries_dict(entries: SparseOperation) -> Dict[Tuple[int, int], int]:
+    return {
+        (row, slot): int(value)
+        for row, slot, value in zip(entries.rows, entries.slots, entries.values)
+    }
+
+
+def _min_bound(
+    explicit_bounds: Dict[Tuple[int, int], int],
+    has_default: np.ndarray,
+    row: int,
+    slot: int,
+) -> int:
+    default = 0 if has_default[row] else int(MIN_SENTINEL)
+    return explicit_bounds.get((row, slot), default)
+
+
+def _flat_zones_inventories(zones_inventories: np.ndarray) -> np.ndarray:
+    n_states, n_zones, n_zones_items = zones_inventories.shape
+    return zones_inventories.reshape(n_states, n_zones * n_zones_items)
+
+
+def _negative_states(
+    player_inventories: np.ndarray, zones_inventories: np.ndarray
+) -> np.ndarray:
+    negative = np.any(player_inventories < 0, axis=1)
+    negative |= np.any(zones_inventories < 0, axis=(1, 2))
+    return np.flatnonzero(negative)
+
+
+def _rows_entries(
+    entries: SparseOperation, rows: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Entries of the given rows as row pointers, slots, values
+    and the position in rows of each entry."""
+    if rows.shape[0] == entries.indptr.shape[0] - 1 and np.all(rows[1:] > rows[:-1]):
+        # Every row in order.
+        return entries.indptr, entries.slots, entries.values, entries.rows
+    positions, indexes = entries.gather(rows)
+    indptr = np.zeros(rows.shape[0] + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(positions, minlength=rows.shape[0]))
+    return indptr, entries.slots[indexes], entries.values[indexes], positions
+
+
+def _any_per_row(violations: np.ndarray, indptr: np.ndarray) -> np.ndarray:
+    """Whether any violation occurs in each row of entries, for each state."""
+    cumulated = np.zeros((violations.shape[0], violations.shape[1] + 1), np.int64)
+    np.cumsum(violations, axis=1, out=cumulated[:, 1:])
+    return cumulated[:, indptr[1:]] > cumulated[:, indptr[:-1]]
+
+
+def _concatenate(arrays: List[np.ndarray], dtype: type) -> np.ndarray:
+    if not arrays:
+        return np.array([], dtype=dtype)
+    return np.concatenate(arrays).astype(dtype)
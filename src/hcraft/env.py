@@ -271,7 +271,9 @@ That's it for this small customized env if you want more, be sure to check Trans
 """
 
 import collections
-from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+from dataclasses import dataclass
+from enum import Enum
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 
@@ -285,12 +287,48 @@ from hcraft.solving_behaviors import (
     task_to_behavior_name,
 )
 from hcraft.planning import HcraftPlanningProblem
-from hcraft.state import HcraftState
+from hcraft.state import HcraftState, HcraftStateSnapshot
 
 if TYPE_CHECKING:
+    from numpy.typing import DTypeLike
+
     from hcraft.task import Task
     from hcraft.world import World
 
+
+@dataclass
+class HcraftEnvState:
+    """Episode state of an HcraftEnv. (See `HcraftEnv.get_state`)"""
+
+    state: HcraftStateSnapshot
+    tasks_terminated: np.ndarray
+    current_step: int
+    current_score: float
+    cumulated_score: float
+    tasks_successes: np.ndarray
+    """Whether each task succeeded during the current episode."""
+    terminal_groups_successes: np.ndarray
+    """Whether each terminal group succeeded during the current episode."""
+
+
+class InfoLevel(Enum):
+    """Amount of infos given by `HcraftEnv.step` and `HcraftEnv.reset`."""
+
+    NONE = "none"
+    """No infos, except those specific to `HcraftEnv.step_n` and `HcraftEnv.step_sequence`."""
+    MINIMAL = "minimal"
+    """Only the action mask and scores.
+
+    The action mask is the read-only array shared with `HcraftEnv.action_masks`
+    until the state changes, it must be copied to be modified.
+    """
+    FULL = "full"
+    """Also tasks and terminal groups termination and success rates.
+
+    The action mask is a copy owned by the infos.
+    """
+
+
 # Gym is an optional dependency.
 try:
     import gymnasium as gym
@@ -319,6 +357,8 @@ class HcraftEnv(Env):
         render_window: Optional[HcraftWindow] = None,
         name: str = "HierarchyCraft",
         max_step: Optional[int] = None,
+        inventory_dtype: Optional["DTypeLike"] = None,
+        info_level: Union[InfoLevel, str] = InfoLevel.FULL,
     ) -> None:
         """
         Args:
@@ -331,15 +371,25 @@ class HcraftEnv(Env):
             name: Name of the environement. Defaults to 'HierarchyCraft'.
             max_step: (Optional[int], optional): Maximum number of steps before episode truncation.
                 If None, never truncates the episode. Defaults to None.
+            inventory_dtype: Integer dtype of inventories, like uint8 or int16
+                to save memory, used on a copy of the world.
+                Defaults to None, hence the world's inventory dtype.
+            info_level: Amount of infos given at each step, one of "none",
+                "minimal" or "full". Defaults to "full".
         """
+        if inventory_dtype is not None:
+            world = world.with_inventory_dtype(inventory_dtype)
         self.world = world
         self.invalid_reward = invalid_reward
         self.max_step = max_step
         self.name = name
+        self.info_level = InfoLevel(info_level)
         self._all_behaviors = None
 
         self.render_window = render_window
         self.render_mode = "rgb_array"
+        self._observation_space: Optional[Tuple[tuple, BoxSpace]] = None
+        self._action_space: Optional[Tuple[tuple, DiscreteSpace]] = None
 
         self.state = HcraftState(self.world)
         self.current_step = 0
@@ -365,33 +415,120 @@ class HcraftEnv(Env):
 
     @property
     def observation_space(self) -> Union[BoxSpace, TupleSpace]:
-        """Observation space for the Agent."""
-        obs_space = BoxSpace(
-            low=np.array(
-                [0 for _ in range(self.world.n_items)]
-                + [0 for _ in range(self.world.n_zones)]
-                + [0 for _ in range(self.world.n_zones_items)]
-            ),
-            high=np.array(
-                [np.inf for _ in range(self.world.n_items)]
-                + [1 for _ in range(self.world.n_zones)]
-                + [np.inf for _ in range(self.world.n_zones_items)]
-            ),
-        )
+        """Observation space for the Agent.
 
-        return obs_space
+        Inventories are bounded by the maximum of the world's inventory dtype.
+        Built once, and only again if the world changes.
+        """
+        world_key = self._world_key()
+        if self._observation_space is None or self._observation_space[0] != world_key:
+            world = self.world
+            dtype = world.inventory_dtype
+            n_observations = world.n_items + world.n_zones + world.n_zones_items
+            high = np.full(n_observations, np.iinfo(dtype).max, dtype=dtype)
+            high[world.n_items : world.n_items + world.n_zones] = 1
+            obs_space = BoxSpace(
+                low=np.zeros(n_observations, dtype=dtype),
+                high=high,
+                shape=(n_observations,),
+                dtype=dtype,
+            )
+            self._observation_space = (world_key, obs_space)
+        return self._observation_space[1]
 
     @property
     def action_space(self) -> DiscreteSpace:
         """Action space for the Agent.
 
         Actions are expected to often be invalid.
+        Built once, and only again if the world changes.
         """
-        return DiscreteSpace(len(self.world.transformations))
+        world_key = self._world_key()
+        if self._action_space is None or self._action_space[0] != world_key:
+            self._action_space = (
+                world_key,
+                DiscreteSpace(len(self.world.transformations)),
+            )
+        return self._action_space[1]
+
+    def _world_key(self) -> tuple:
+        """What spaces depend on, to know when the world changed."""
+        world = self.world
+        return (
+            id(world),
+            world.n_items,
+            world.n_zones,
+            world.n_zones_items,
+            len(world.transformations),
+            world.inventory_dtype,
+        )
 
     def action_masks(self) -> np.ndarray:
-        """Return boolean mask of valid actions."""
-        return np.array([t.is_valid(self.state) for t in self.world.transformations])
+        """Return boolean mask of valid actions.
+
+        The mask is read-only and shared by every call until the state changes,
+        including when the state arrays are modified directly.
+        It must be copied, for example with `env.action_masks().copy()`,
+        before being modified in place. (See `HcraftState.action_mask`)
+        """
+        return self.state.action_mask()
+
+    def get_state(self, out: Optional["HcraftEnvState"] = None) -> "HcraftEnvState":
+        """Copy the episode state to branch from it later with `HcraftEnv.set_state`.
+
+        Only the state arrays, tasks terminations and episode counters are copied,
+        the world, purpose and render window are shared.
+
+        Args:
+            out: Environment state of the same environment to copy into,
+                avoiding any allocation. Defaults to None, hence a new one.
+        """
+        if out is None:
+            return HcraftEnvState(
+                state=self.state.snapshot(),
+                tasks_terminated=np.array(
+                    [task.terminated for task in self.purpose.tasks], dtype=bool
+                ),
+                current_step=self.current_step,
+                current_score=self.current_score,
+                cumulated_score=self.cumulated_score,
+                tasks_successes=self._episode_successes(self.task_successes),
+                terminal_groups_successes=self._episode_successes(
+                    self.terminal_successes
+                ),
+            )
+        self.state.snapshot(out=out.state)
+        for task_index, task in enumerate(self.purpose.tasks):
+            out.tasks_terminated[task_index] = task.terminated
+        out.current_step = self.current_step
+        out.current_score = self.current_score
+        out.cumulated_score = self.cumulated_score
+        out.tasks_successes = self._episode_successes(self.task_successes)
+        out.terminal_groups_successes = self._episode_successes(self.terminal_successes)
+        return out
+
+    def set_state(self, env_state: "HcraftEnvState") -> None:
+        """Restore an episode state copied with `HcraftEnv.get_state`."""
+        self.state.restore(env_state.state)
+        for task, terminated in zip(self.purpose.tasks, env_state.tasks_terminated):
+            task.terminated = bool(terminated)
+        self.current_step = env_state.current_step
+        self.current_score = env_state.current_score
+        self.cumulated_score = env_state.cumulated_score
+        for counter, successes in (
+            (self.task_successes, env_state.tasks_successes),
+            (self.terminal_successes, env_state.terminal_groups_successes),
+        ):
+            if counter is None:
+                continue
+            if self.episodes > 0:
+                counter.set_episode_successes(self.episodes, successes)
+            counter.invalidate()
+
+    def _episode_successes(self, counter: Optional[SuccessCounter]) -> np.ndarray:
+        if counter is None or self.episodes == 0:
+            return np.zeros(0, dtype=bool)
+        return counter.episode_successes(self.episodes)
 
     def step(
         self, action: Union[int, str, np.ndarray]
@@ -404,44 +541,140 @@ class HcraftEnv(Env):
 
         """
 
-        if isinstance(action, np.ndarray):
-            if not action.size == 1:
-                raise TypeError(
-                    "Actions should be integers corresponding the a transformation index"
-                    f", got array with multiple elements:\n{action}."
-                )
-            action = action.flatten()[0]
-        try:
-            action = int(action)
-        except (TypeError, ValueError) as e:
-            raise TypeError(
-                "Actions should be integers corresponding the a transformation index."
-            ) from e
+        action = _action_index(action)
+        self.task_successes.step_reset()
+        self.terminal_successes.step_reset()
 
-        self.current_step += 1
+        reward = self._step_reward(action)
+        terminated = self.purpose.is_terminal(self.state)
+
+        self.task_successes.update(self.episodes)
+        self.terminal_successes.update(self.episodes)
+        return (
+            self.state.observation.copy(),
+            reward,
+            terminated,
+            self.truncated,
+            self.infos(),
+        )
+
+    def step_sequence(
+        self,
+        actions: Sequence[Union[int, str, np.ndarray]],
+        per_step_rewards: bool = False,
+        step_infos: bool = False,
+    ) -> Tuple[np.ndarray, Union[float, np.ndarray], bool, bool, dict]:
+        """Perform one step for each action of a sequence in a single call.
 
+        Steps stop as soon as the episode terminates or is truncated.
+        Infos are only built once after the last step, unless `step_infos`.
+
+        Args:
+            actions: Sequence of transformation indexes, for example a plan.
+            per_step_rewards: If True, return the reward of each step performed
+                instead of their sum.
+            step_infos: If True, also give the infos of each step in infos
+                as "step_infos".
+
+        Returns:
+            The same as `step` after the last step performed. Infos also give
+            the number of steps performed as "n_steps" and the index of the action
+            that ended the episode as "end_index", None if the episode did not end.
+        """
         self.task_successes.step_reset()
         self.terminal_successes.step_reset()
 
-        success = self.state.apply(action)
-        if success:
-            reward = self.purpose.reward(self.state)
-        else:
-            reward = self.invalid_reward
+        rewards = []
+        all_step_infos = []
+        terminated = truncated = False
+        end_index = None
+        for index, action in enumerate(actions):
+            rewards.append(self._step_reward(_action_index(action)))
+            terminated = self.purpose.is_terminal(self.state)
+            truncated = self.truncated
+            if step_infos:
+                self.task_successes.update(self.episodes)
+                self.terminal_successes.update(self.episodes)
+                all_step_infos.append(self.infos())
+            if terminated or truncated:
+                end_index = index
+                break
 
-        terminated = self.purpose.is_terminal(self.state)
+        self.task_successes.update(self.episodes)
+        self.terminal_successes.update(self.episodes)
+        infos = self.infos()
+        infos["n_steps"] = len(rewards)
+        infos["end_index"] = end_index
+        if step_infos:
+            infos["step_infos"] = all_step_infos
+        reward = np.array(rewards) if per_step_rewards else float(sum(rewards))
+        return self.state.observation.copy(), reward, terminated, truncated, infos
+
+    def step_n(
+        self, action: Union[int, str, np.ndarray], k: int
+    ) -> Tuple[np.ndarray, float, bool, bool, dict]:
+        """Perform up to k steps in a row with the same transformation at once.
+
+        This is equivalent to calling `step` with the same action while it stays
+        valid, up to k times, and stopping as soon as the episode terminates
+        or is truncated. Inventories are updated once for all applications.
+        If the transformation cannot be performed, this is the same as one `step`.
+
+        Returns:
+            The same as `step` with the sum of rewards of all steps performed,
+            their number is given in infos as "n_steps".
+        """
+        action = _action_index(action)
+        if self.max_step is not None:
+            k = min(k, self.max_step - self.current_step)
+        compiled = self.world.compiled_transformations
+        n_steps = compiled.max_applications(
+            action,
+            self.state.player_inventory,
+            self.state.zone_slot,
+            self.state.zones_inventories,
+        )
+        n_steps = min(n_steps, k)
+        if n_steps <= 1:
+            observation, reward, terminated, truncated, infos = self.step(action)
+            infos["n_steps"] = 1
+            return observation, reward, terminated, truncated, infos
+
+        self.task_successes.step_reset()
+        self.terminal_successes.step_reset()
+
+        changes = compiled.written_changes(action, self.state.zone_slot)
+        reward = 0.0
+        terminated = False
+        performed = 0
+        while performed < n_steps and not terminated:
+            remaining = n_steps - performed
+            # Applications before a task becomes terminal only give timestep rewards.
+            n_applications = self.purpose.first_terminal_application(
+                self.state, changes, remaining
+            )
+            if n_applications is None:
+                n_applications = remaining
+            self.state.apply_n(action, n_applications)
+            performed += n_applications
+            reward += (n_applications - 1) * self.purpose.timestep_reward
+            reward += self.purpose.reward(self.state)
+            terminated = self.purpose.is_terminal(self.state)
+        self.current_step += performed
 
         self.task_successes.update(self.episodes)
         self.terminal_successes.update(self.episodes)
 
         self.current_score += reward
         self.cumulated_score += reward
+        infos = self.infos()
+        infos["n_steps"] = performed
         return (
-            self.state.observation,
+            self.state.observation.copy(),
             reward,
             terminated,
             self.truncated,
-            self.infos(),
+            infos,
         )
 
     def render(self, mode: Optional[str] = None, **_kwargs) -> Union[str, np.ndarray]:
@@ -481,7 +714,7 @@ class HcraftEnv(Env):
 
         self.state.reset()
         self.purpose.reset()
-        return self.state.observation, self.infos()
+        return self.state.observation.copy(), self.infos()
 
     def close(self):
         """Closes the environment."""
@@ -555,21 +788,35 @@ class HcraftEnv(Env):
         """
         return HcraftPlanningProblem(self.state, self.name, self.purpose, **kwargs)
 
+    def _step_reward(self, action: int) -> float:
+        """Apply the action for one step and return its reward."""
+        self.current_step += 1
+        if self.state.apply(action):
+            reward = self.purpose.reward(self.state)
+        else:
+            reward = self.invalid_reward
+        self.current_score += reward
+        self.cumulated_score += reward
+        return reward
+
     def infos(self) -> dict:
+        """Infos of the current step, depending on `info_level`.
+
+        Tasks and terminal groups infos are only computed again
+        when one of them terminated or a new episode started.
+        """
+        if self.info_level is InfoLevel.NONE:
+            return {}
         infos = {
             "action_is_legal": self.action_masks(),
             "score": self.current_score,
             "score_average": self.cumulated_score / self.episodes,
         }
-        infos.update(self._tasks_infos())
-        return infos
-
-    def _tasks_infos(self):
-        infos = {}
-        infos.update(self.task_successes.done_infos)
-        infos.update(self.task_successes.rates_infos)
-        infos.update(self.terminal_successes.done_infos)
-        infos.update(self.terminal_successes.rates_infos)
+        if self.info_level is InfoLevel.MINIMAL:
+            return infos
+        infos["action_is_legal"] = infos["action_is_legal"].copy()
+        infos.update(self.task_successes.infos())
+        infos.update(self.terminal_successes.infos())
         return infos
 
     def _render_rgb_array(self) -> np.ndarray:
@@ -584,3 +831,19 @@ class HcraftEnv(Env):
         fps = self.metadata.get("video.frames_per_second")
         self.render_window.update_rendering(fps=fps)
         return surface_to_rgb_array(self.render_window.screen)
+
+
+def _action_index(action: Union[int, str, np.ndarray]) -> int:
+    if isinstance(action, np.ndarray):
+        if not action.size == 1:
+            raise TypeError(
+                "Actions should be integers corresponding the a transformation index"
+                f", got array with multiple elements:\n{action}."
+            )
+        action = action.flatten()[0]
+    try:
+        return int(action)
+    except (TypeError, ValueError) as e:
+        raise TypeError(
+            "Actions should be integers corresponding the a transformation index."
+        ) from e
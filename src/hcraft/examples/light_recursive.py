@@ -31,9 +31,14 @@ from typing import List
 try:
     import gymnasium as gym
 
+    from hcraft.vector_env import vector_entry_point
+
     gym.register(
         id="LightRecursiveHcraft-v1",
         entry_point="hcraft.examples.light_recursive:LightRecursiveHcraftEnv",
+        vector_entry_point=vector_entry_point(
+            "hcraft.examples.light_recursive:LightRecursiveHcraftEnv"
+        ),
     )
 
 except ImportError:
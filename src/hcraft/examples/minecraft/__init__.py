@@ -24,12 +24,15 @@ __all__ = ["MineHcraftEnv"]
 try:
     import gymnasium as gym
 
+    from hcraft.vector_env import vector_entry_point
+
     ENV_PATH = "hcraft.examples.minecraft.env:MineHcraftEnv"
 
     # Simple MineHcraft with no reward, only penalty on illegal actions
     gym.register(
         id="MineHcraft-NoReward-v1",
         entry_point=ENV_PATH,
+        vector_entry_point=vector_entry_point(ENV_PATH),
         kwargs={"purpose": None},
     )
     MINEHCRAFT_GYM_ENVS.append("MineHcraft-NoReward-v1")
@@ -38,6 +41,7 @@ try:
     gym.register(
         id="MineHcraft-v1",
         entry_point=ENV_PATH,
+        vector_entry_point=vector_entry_point(ENV_PATH),
         kwargs={"purpose": "all"},
     )
     MINEHCRAFT_GYM_ENVS.append("MineHcraft-v1")
@@ -64,6 +68,7 @@ try:
         gym.register(
             id=gym_name,
             entry_point=ENV_PATH,
+            vector_entry_point=vector_entry_point(ENV_PATH),
             kwargs={"purpose": purpose},
         )
         MINEHCRAFT_GYM_ENVS.append(gym_name)
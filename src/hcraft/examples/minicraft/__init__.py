@@ -79,13 +79,19 @@ MINICRAFT_GYM_ENVS = []
 try:
     import gymnasium as gym
 
+    from hcraft.vector_env import vector_entry_point
+
     ENV_PATH = "hcraft.examples.minicraft"
 
     for env_name, env_class in MINICRAFT_NAME_TO_ENV.items():
         submodule = Path(inspect.getfile(env_class)).name.split(".")[0]
         env_path = f"{ENV_PATH}.{submodule}:{env_class.__name__}"
         gym_name = f"{env_name}-v1"
-        gym.register(id=gym_name, entry_point=env_path)
+        gym.register(
+            id=gym_name,
+            entry_point=env_path,
+            vector_entry_point=vector_entry_point(env_path),
+        )
         MINICRAFT_GYM_ENVS.append(gym_name)
 
 
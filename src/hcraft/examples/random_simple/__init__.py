@@ -6,9 +6,14 @@ __all__ = ["RandomHcraftEnv"]
 try:
     import gymnasium as gym
 
+    from hcraft.vector_env import vector_entry_point
+
     gym.register(
         id="RandomHcraft-v1",
         entry_point="hcraft.examples.random_simple.env:RandomHcraftEnv",
+        vector_entry_point=vector_entry_point(
+            "hcraft.examples.random_simple.env:RandomHcraftEnv"
+        ),
     )
 except ImportError:
     pass
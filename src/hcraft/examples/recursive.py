@@ -31,9 +31,14 @@ from hcraft.world import world_from_transformations
 try:
     import gymnasium as gym
 
+    from hcraft.vector_env import vector_entry_point
+
     gym.register(
         id="RecursiveHcraft-v1",
         entry_point="hcraft.examples.recursive:RecursiveHcraftEnv",
+        vector_entry_point=vector_entry_point(
+            "hcraft.examples.recursive:RecursiveHcraftEnv"
+        ),
     )
 
 except ImportError:
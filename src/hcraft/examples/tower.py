@@ -43,9 +43,12 @@ from hcraft.task import GetItemTask
 try:
     import gymnasium as gym
 
+    from hcraft.vector_env import vector_entry_point
+
     gym.register(
         id="TowerHcraft-v1",
         entry_point="hcraft.examples.tower:TowerHcraftEnv",
+        vector_entry_point=vector_entry_point("hcraft.examples.tower:TowerHcraftEnv"),
     )
 
 except ImportError:
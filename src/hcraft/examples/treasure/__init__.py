@@ -16,9 +16,14 @@ __all__ = ["TreasureEnv"]
 try:
     import gymnasium as gym
 
+    from hcraft.vector_env import vector_entry_point
+
     gym.register(
         id="Treasure-v1",
         entry_point="hcraft.examples.treasure.env:TreasureEnv",
+        vector_entry_point=vector_entry_point(
+            "hcraft.examples.treasure.env:TreasureEnv"
+        ),
     )
 
 
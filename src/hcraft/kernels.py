@@ -0,0 +1,372 @@
+"""# Step kernels
+
+Fused loops over the arrays of `hcraft.compiled.CompiledTransformations`
+checking the validity of transformations, applying them, and updating
+hashes and discoveries of states in a single pass.
+
+They are compiled with [numba](https://numba.pydata.org/) when it is installed:
+
+```bash
+pip install numba
+```
+
+States then use them instead of the NumPy operations of `hcraft.compiled`,
+which stay the fallback when numba is missing.
+(See `CompiledTransformations.use_kernels`)
+Both give exactly the same states, hashes and discoveries.
+
+"""
+
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+try:
+    import numba
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+NO_SLOT = -1
+"""Same as `hcraft.compiled.NO_SLOT`."""
+
+SparseEntries = Tuple[np.ndarray, np.ndarray, np.ndarray]
+"""Row pointers, slots and values of a `hcraft.compiled.SparseOperation`."""
+
+
+class KernelWorld(NamedTuple):
+    """Arrays of compiled transformations given to kernels.
+
+    (See `CompiledTransformations.kernel_world`)
+    """
+
+    zone: np.ndarray
+    destination: np.ndarray
+    player_min: SparseEntries
+    player_max: SparseEntries
+    current_min: SparseEntries
+    current_max: SparseEntries
+    destination_min: SparseEntries
+    destination_max: SparseEntries
+    zones_min: SparseEntries
+    zones_max: SparseEntries
+    player_min_default: np.ndarray
+    current_min_default: np.ndarray
+    destination_min_default: np.ndarray
+    player_apply: SparseEntries
+    current_apply: SparseEntries
+    destination_apply: SparseEntries
+    zones_apply: SparseEntries
+    player_keys: np.ndarray
+    zones_keys: np.ndarray
+    zone_keys: np.ndarray
+    n_zones_items: int
+
+
+def _jit(function):
+    if NUMBA_AVAILABLE:
+        return numba.njit(cache=True, nogil=True)(function)
+    return function
+
+
+def batched_step(
+    world: KernelWorld,
+    actions: np.ndarray,
+    mask: np.ndarray,
+    player_inventories: np.ndarray,
+    zone_slots: np.ndarray,
+    zones_inventories: np.ndarray,
+    hashes: np.ndarray,
+    discovered: np.ndarray,
+    packed: bool,
+    discoveries_offsets: np.ndarray,
+) -> np.ndarray:
+    """Apply in place the given transformation on each state of a batch
+    where it is valid.
+
+    Args:
+        world: Compiled transformations arrays.
+        actions: Index of the transformation to apply for each state of shape (N,).
+        mask: Boolean mask of the states to update of shape (N,).
+        player_inventories: Player inventories of shape (N, n_items).
+        zone_slots: Slot of the current zone of each state of shape (N,).
+        zones_inventories: Flattened zones inventories of shape
+            (N, n_zones * n_zones_items).
+        hashes: Hashes of the states of shape (N,).
+        discovered: Discoveries flags of each state, as packed bits if `packed`.
+        packed: Whether discoveries are packed bits or one byte per flag.
+        discoveries_offsets: First flag of items, zones, zones items
+            and transformations.
+
+    Returns:
+        Boolean array of shape (N,), True where the transformation was applied.
+    """
+    dtype = player_inventories.dtype
+    saturate = dtype.itemsize < 4
+    bounds = np.iinfo(dtype)
+    success = np.zeros(actions.shape[0], dtype=np.bool_)
+    arguments = (
+        world,
+        actions,
+        mask,
+        player_inventories,
+        zone_slots,
+        zones_inventories,
+        hashes,
+        discovered,
+        packed,
+        discoveries_offsets,
+        int(bounds.min),
+        int(bounds.max),
+        saturate,
+        success,
+    )
+    if NUMBA_AVAILABLE:
+        _batched_step(*arguments)
+    else:
+        # Hashes are meant to wrap around modulo 2^64.
+        with np.errstate(over="ignore"):
+            _batched_step(*arguments)
+    return success
+
+
+@_jit
+def _batched_step(
+    world,
+    actions,
+    mask,
+    player_inventories,
+    zone_slots,
+    zones_inventories,
+    hashes,
+    discovered,
+    packed,
+    discoveries_offsets,
+    lowest,
+    highest,
+    saturate,
+    success,
+):
+    n_zones_items = world.n_zones_items
+    for state in range(actions.shape[0]):
+        if not mask[state]:
+            continue
+        action = actions[state]
+        player = player_inventories[state]
+        zones = zones_inventories[state]
+        zone_slot = zone_slots[state]
+        if not _is_valid(world, action, player, zone_slot, zones):
+            continue
+        success[state] = True
+        destination = world.destination[action]
+        current = zone_slot * n_zones_items
+
+        bounds = (lowest, highest, saturate)
+        _apply_entries(
+            world.player_apply,
+            action,
+            player,
+            0,
+            world.player_keys,
+            hashes,
+            state,
+            bounds,
+        )
+        _apply_entries(
+            world.current_apply,
+            action,
+            zones,
+            current,
+            world.zones_keys,
+            hashes,
+            state,
+            bounds,
+        )
+        if destination != NO_SLOT:
+            _apply_entries(
+                world.destination_apply,
+                action,
+                zones,
+                destination * n_zones_items,
+                world.zones_keys,
+                hashes,
+                state,
+                bounds,
+            )
+        _apply_entries(
+            world.zones_apply, action, zones, 0, world.zones_keys, hashes, state, bounds
+        )
+
+        # Discoveries are checked once all changes are applied.
+        _discover(discovered, state, discoveries_offsets[3] + action, packed)
+        indptr, slots, _ = world.player_apply
+        for entry in range(indptr[action], indptr[action + 1]):
+            if player[slots[entry]] > 0:
+                flag = discoveries_offsets[0] + slots[entry]
+                _discover(discovered, state, flag, packed)
+        if destination != NO_SLOT:
+            hashes[state] += world.zone_keys[destination]
+            hashes[state] -= world.zone_keys[zone_slot]
+            zone_slots[state] = destination
+            flag = discoveries_offsets[1] + destination
+            _discover(discovered, state, flag, packed)
+            for slot in range(n_zones_items):
+                if zones[destination * n_zones_items + slot] > 0:
+                    flag = discoveries_offsets[2] + slot
+                    _discover(discovered, state, flag, packed)
+            continue
+        _discover_current_cells(
+            world.current_apply,
+            action,
+            zones,
+            current,
+            zone_slot,
+            n_zones_items,
+            discovered,
+            state,
+            discoveries_offsets[2],
+            packed,
+        )
+        _discover_current_cells(
+            world.zones_apply,
+            action,
+            zones,
+            0,
+            zone_slot,
+            n_zones_items,
+            discovered,
+            state,
+            discoveries_offsets[2],
+            packed,
+        )
+
+
+@_jit
+def _apply_entries(operation, row, inventory, base, keys, hashes, state, bounds):
+    """Add the entries of a row to the inventory, updating the hash of the state."""
+    lowest, highest, saturate = bounds
+    indptr, slots, values = operation
+    for entry in range(indptr[row], indptr[row + 1]):
+        slot = base + slots[entry]
+        before = inventory[slot]
+        amount = np.int64(before) + values[entry]
+        if saturate:
+            amount = min(max(amount, lowest), highest)
+        inventory[slot] = amount
+        hashes[state] += keys[slot] * np.uint64(inventory[slot])
+        hashes[state] -= keys[slot] * np.uint64(before)
+
+
+@_jit
+def _discover_current_cells(
+    operation,
+    row,
+    zones,
+    base,
+    zone_slot,
+    n_zones_items,
+    discovered,
+    state,
+    offset,
+    packed,
+):
+    """Discover the items of the current zone written by the entries of a row."""
+    indptr, slots, _ = operation
+    for entry in range(indptr[row], indptr[row + 1]):
+        cell = base + slots[entry]
+        if cell // n_zones_items == zone_slot and zones[cell] > 0:
+            slot = cell - zone_slot * n_zones_items
+            _discover(discovered, state, offset + slot, packed)
+
+
+@_jit
+def _discover(discovered, state, flag, packed):
+    if packed:
+        discovered[state, flag >> 3] |= np.uint8(1 << (flag & 7))
+    else:
+        discovered[state, flag] = 1
+
+
+@_jit
+def _is_valid(world, action, player, zone_slot, zones):
+    zone = world.zone[action]
+    destination = world.destination[action]
+    if zone != NO_SLOT and zone != zone_slot:
+        return False
+    if destination != NO_SLOT and destination == zone_slot:
+        return False
+    if _any_below(world.player_min, action, player, 0):
+        return False
+    if _any_above(world.player_max, action, player, 0):
+        return False
+    if world.player_min_default[action] and _uncovered_negative(
+        world.player_min, action, player, 0, player.shape[0]
+    ):
+        return False
+    if zones.shape[0] == 0:
+        return True
+
+    n_zones_items = world.n_zones_items
+    current = zone_slot * n_zones_items
+    destination_base = destination * n_zones_items
+    if _any_below(world.current_min, action, zones, current):
+        return False
+    if _any_above(world.current_max, action, zones, current):
+        return False
+    if _any_below(world.destination_min, action, zones, destination_base):
+        return False
+    if _any_above(world.destination_max, action, zones, destination_base):
+        return False
+    if _any_below(world.zones_min, action, zones, 0):
+        return False
+    if _any_above(world.zones_max, action, zones, 0):
+        return False
+    # Every zone item must be non-negative unless explicitly bounded.
+    if _uncovered_negative(world.zones_min, action, zones, 0, zones.shape[0]):
+        return False
+    if world.current_min_default[action] and _uncovered_negative(
+        world.current_min, action, zones, current, n_zones_items
+    ):
+        return False
+    if world.destination_min_default[action] and _uncovered_negative(
+        world.destination_min, action, zones, destination_base, n_zones_items
+    ):
+        return False
+    return True
+
+
+@_jit
+def _any_below(operation, row, inventory, base):
+    indptr, slots, values = operation
+    for entry in range(indptr[row], indptr[row + 1]):
+        if inventory[base + slots[entry]] < values[entry]:
+            return True
+    return False
+
+
+@_jit
+def _any_above(operation, row, inventory, base):
+    indptr, slots, values = operation
+    for entry in range(indptr[row], indptr[row + 1]):
+        if inventory[base + slots[entry]] > values[entry]:
+            return True
+    return False
+
+
+@_jit
+def _uncovered_negative(operation, row, inventory, base, n_slots):
+    """Whether a slot of the inventory is negative without an entry in the row."""
+    indptr, slots, _ = operation
+    for slot in range(n_slots):
+        if inventory[base + slot] >= 0:
+            continue
+        covered = False
+        for entry in range(indptr[row], indptr[row + 1]):
+            if slots[entry] == slot:
+                covered = True
+                break
+        if not covered:
+            return True
+    return False
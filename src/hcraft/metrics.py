@@ -1,4 +1,6 @@
-from typing import Dict, List, Union
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
 
 from hcraft.purpose import Task, TerminalGroup
 
@@ -12,6 +14,8 @@ class SuccessCounter:
         self.successes: Dict[Union[Task, TerminalGroup], Dict[int, bool]] = {
             element: {} for element in self.elements
         }
+        self._infos_names: Optional[List[str]] = None
+        self._infos: Optional[Dict[str, Any]] = None
 
     def step_reset(self):
         """Set the state of elements."""
@@ -23,6 +27,7 @@ class SuccessCounter:
             self.successes[element][episode] = False
             if len(self.successes[element]) > 10:
                 self.successes[element].pop(episode - 10)
+        self._infos = None
 
     def update(self, episode: int):
         """Update the success state of the given element for the given episode."""
@@ -30,6 +35,23 @@ class SuccessCounter:
             # Just terminated
             if element.terminated != self.step_states[element]:
                 self.successes[element][episode] = True
+                self._infos = None
+
+    def episode_successes(self, episode: int) -> np.ndarray:
+        """Whether each element succeeded during the given episode."""
+        return np.array(
+            [self.successes[element][episode] for element in self.elements], dtype=bool
+        )
+
+    def set_episode_successes(self, episode: int, successes: np.ndarray):
+        """Set back successes of the given episode from `episode_successes`."""
+        for element, success in zip(self.elements, successes):
+            self.successes[element][episode] = bool(success)
+        self._infos = None
+
+    def invalidate(self):
+        """Forget the last infos values, when elements were modified outside steps."""
+        self._infos = None
 
     @property
     def done_infos(self) -> Dict[str, bool]:
@@ -45,6 +67,23 @@ class SuccessCounter:
             for element in self.elements
         }
 
+    def infos(self) -> Dict[str, Any]:
+        """Done flags and success rates of each element.
+
+        They are only computed again after an element terminated or a new episode,
+        and their keys are only formatted once.
+        The returned dictionary is shared and should be copied to be kept.
+        """
+        if self._infos_names is None:
+            names = [self._name(element) for element in self.elements]
+            self._infos_names = [self._is_done_str(name) for name in names]
+            self._infos_names += [self._success_str(name) for name in names]
+        if self._infos is None:
+            values = [element.terminated for element in self.elements]
+            values += [self._rate(element) for element in self.elements]
+            self._infos = dict(zip(self._infos_names, values))
+        return self._infos
+
     @staticmethod
     def _success_str(name: str):
         return f"{name} success rate"
@@ -42,6 +42,13 @@ else:
 
 ```
 
+A whole plan can also be executed in a single call:
+
+```python
+actions = planning_problem.actions_from_plan(env.state)
+_observation, _reward, terminated, truncated, _info = env.step_sequence(actions)
+```
+
 ## HierarchyCraft as PDDL2.1 domain & problem
 
 The Unified Planning Framework itself allows to write planning problems in the PDDL2.1 language,
@@ -183,6 +190,26 @@ class HcraftPlanningProblem:
         action = int(plan_action_name.split("_")[0])
         return action
 
+    def actions_from_plan(self, state: "HcraftState") -> List[int]:
+        """Get all the remaining gym actions of the plan from a given state.
+
+        If no plan exists, first update and solve the planning problem.
+        The plan is then consumed entirely, so that it can be executed at once
+        with `hcraft.env.HcraftEnv.step_sequence`.
+
+        Args:
+            state (HcraftState): Current state of the hcraft environement.
+
+        Returns:
+            List[int]: Actions to take according to the plan.
+        """
+        if self.plan is None:
+            self.update_problem_to_state(self.upf_problem, state)
+            self.solve()
+        plan_actions_names = [str(plan_action) for plan_action in self.plan.actions]
+        self.plan = None
+        return [int(name.split("_")[0]) for name in plan_actions_names]
+
     def update_problem_to_state(self, upf_problem: "Problem", state: "HcraftState"):
         """Update the planning problem initial state to the given state.
 
@@ -96,18 +96,20 @@ Just like this last task, reward shaping subtasks are always optional.
 
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import TYPE_CHECKING, Dict, List, Optional, Set, Union
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple, Union
 
 import networkx as nx
 import numpy as np
 
 from hcraft.requirements import RequirementNode, req_node_name
-from hcraft.task import GetItemTask, GoToZoneTask, PlaceItemTask, Task
+from hcraft.task import CompiledTasks, GetItemTask, GoToZoneTask, PlaceItemTask, Task
 from hcraft.elements import Item, Zone
 
 
 if TYPE_CHECKING:
+    from hcraft.compiled import WrittenChanges
     from hcraft.env import HcraftEnv, HcraftState
+    from hcraft.state import BatchedHcraftState
     from hcraft.world import World
 
 
@@ -190,6 +192,12 @@ class Purpose:
             self.add_task(task, reward_shaping=default_reward_shaping)
 
         self._best_terminal_group = None
+        self._compiled_tasks: Optional[CompiledTasks] = None
+        self._other_tasks: List[Tuple[int, Task]] = []
+        self._terminal_groups_tasks = np.zeros((0, 0), dtype=bool)
+        self._affected_columns: Dict[Tuple[int, int], np.ndarray] = {}
+        self._evaluated_version: Optional[int] = None
+        self._evaluated_terminated = np.zeros(0, dtype=bool)
 
     def add_task(
         self,
@@ -248,6 +256,7 @@ class Purpose:
         # Build all tasks
         for task in self.tasks:
             task.build(env.world)
+        self._compile(env.world)
 
         self.built = True
 
@@ -258,7 +267,13 @@ class Purpose:
         reward = self.timestep_reward
         if not self.tasks:
             return reward
-        for task in self.tasks:
+        if not self._is_compiled():
+            for task in self.tasks:
+                reward += task.reward(state)
+            return reward
+        columns, achieved = self._achievements(state, self._tasks_terminated())
+        reward += float(np.sum(self._compiled_tasks.rewards[columns[achieved]]))
+        for _index, task in self._other_tasks:
             reward += task.reward(state)
         return reward
 
@@ -268,17 +283,130 @@ class Purpose:
         """
         if not self.tasks:
             return False
-        for task in self.tasks:
-            task.is_terminal(state)
-        for terminal_group in self.terminal_groups:
-            if terminal_group.terminated:
-                return True
-        return False
+        if not self._is_compiled():
+            for task in self.tasks:
+                task.is_terminal(state)
+            return self.terminated
+        terminated = self._tasks_terminated()
+        columns, achieved = self._achievements(state, terminated)
+        for index in self._compiled_tasks.tasks_indexes[columns[achieved]]:
+            self.tasks[index].terminated = True
+            terminated[index] = True
+        for index, task in self._other_tasks:
+            terminated[index] = task.is_terminal(state)
+        self._evaluated_version = state.version
+        self._evaluated_terminated = terminated
+        return bool(self._any_group_terminated(terminated[np.newaxis])[0])
+
+    def first_terminal_application(
+        self, state: "HcraftState", changes: "WrittenChanges", n: int
+    ) -> Optional[int]:
+        """
+        Returns after how many applications of a transformation, up to n,
+        a task becomes terminal. None if no task becomes terminal within n.
+
+        Until then, each application only gives the `timestep_reward`.
+        (See `Task.first_terminal_application`)
+        """
+        firsts = [
+            task.first_terminal_application(state, changes, n) for task in self.tasks
+        ]
+        return min((first for first in firsts if first is not None), default=None)
+
+    def batched_step(
+        self, states: "BatchedHcraftState", tasks_terminated: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the purpose rewards and terminations of each state of a batch.
+
+        This is the batched equivalent of calling `reward` then `is_terminal`,
+        but tasks terminations are given for each state instead of stored in tasks.
+
+        Args:
+            states: Batch of states.
+            tasks_terminated: Boolean array of shape (N, n_tasks) telling which tasks
+                are terminated for each state. It is updated in place.
+        """
+        rewards = np.full(states.n_states, self.timestep_reward, dtype=np.float64)
+        terminated = np.zeros(states.n_states, dtype=bool)
+        if not self.tasks:
+            return rewards, terminated
+        if not self._is_compiled():
+            for task_index, task in enumerate(self.tasks):
+                rewards += task.batched_reward(states, tasks_terminated[:, task_index])
+            for task_index, task in enumerate(self.tasks):
+                tasks_terminated[:, task_index] |= task.batched_is_terminal(states)
+            for terminal_group in self.terminal_groups:
+                group_tasks = [self.tasks.index(task) for task in terminal_group.tasks]
+                terminated |= np.all(tasks_terminated[:, group_tasks], axis=1)
+            return rewards, terminated
+        compiled = self._compiled_tasks
+        achieved = compiled.batched_achieved(states)
+        newly_achieved = achieved & ~tasks_terminated[:, compiled.tasks_indexes]
+        rewards += newly_achieved @ compiled.rewards
+        for index, task in self._other_tasks:
+            rewards += task.batched_reward(states, tasks_terminated[:, index])
+        tasks_terminated[:, compiled.tasks_indexes] |= achieved
+        for index, task in self._other_tasks:
+            tasks_terminated[:, index] |= task.batched_is_terminal(states)
+        return rewards, self._any_group_terminated(tasks_terminated)
+
+    def _achievements(
+        self, state: "HcraftState", terminated: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Columns of the compiled tasks to check and whether they are achieved.
+
+        Terminated tasks are never checked again. If the purpose evaluated
+        the state just before its last transformation, only the tasks reading
+        slots written by this transformation can have been achieved since.
+        (See `HcraftState.last_transformation`)
+        """
+        compiled = self._compiled_tasks
+        unfinished = ~terminated[compiled.tasks_indexes]
+        columns = self._last_transformation_columns(state, terminated)
+        if columns is None:
+            columns = np.flatnonzero(unfinished)
+        else:
+            columns = columns[unfinished[columns]]
+        return columns, compiled.achieved(state, columns)
+
+    def _last_transformation_columns(
+        self, state: "HcraftState", terminated: np.ndarray
+    ) -> Optional[np.ndarray]:
+        applied = state.last_transformation
+        if applied is None or self._evaluated_version not in (
+            applied.previous_version,
+            state.version,
+        ):
+            return None
+        if np.any(self._evaluated_terminated & ~terminated):
+            # Tasks were reset since, they could be achieved anywhere.
+            return None
+        key = (applied.action, applied.previous_zone)
+        if key not in self._affected_columns:
+            compiled_transformations = state.world.compiled_transformations
+            player_slots, _, zones_slots, _ = compiled_transformations.written_changes(
+                *key
+            )
+            self._affected_columns[key] = self._compiled_tasks.affected_columns(
+                player_slots,
+                zones_slots,
+                int(compiled_transformations.destination[applied.action]),
+            )
+        return self._affected_columns[key]
+
+    def _any_group_terminated(self, tasks_terminated: np.ndarray) -> np.ndarray:
+        """Whether all tasks of any terminal group are terminated, for each row."""
+        groups_terminated = np.all(
+            tasks_terminated[:, np.newaxis] | ~self._terminal_groups_tasks, axis=2
+        )
+        return np.any(groups_terminated, axis=1)
 
     def reset(self) -> None:
         """Reset the purpose."""
         for task in self.tasks:
             task.reset()
+        self._evaluated_version = None
 
     @property
     def optional_tasks(self) -> List[Task]:
@@ -312,6 +440,36 @@ class Purpose:
         self._best_terminal_group = best_terminal_group
         return best_terminal_group
 
+    def _compile(self, world: "World") -> None:
+        """Stack built tasks into `CompiledTasks` and terminal groups into a mask."""
+        self._compiled_tasks = CompiledTasks(self.tasks, world)
+        compiled_indexes = set(self._compiled_tasks.tasks_indexes.tolist())
+        self._other_tasks = [
+            (index, task)
+            for index, task in enumerate(self.tasks)
+            if index not in compiled_indexes
+        ]
+        self._affected_columns = {}
+        self._evaluated_version = None
+        self._terminal_groups_tasks = np.zeros(
+            (len(self.terminal_groups), len(self.tasks)), dtype=bool
+        )
+        for group_index, terminal_group in enumerate(self.terminal_groups):
+            for task in terminal_group.tasks:
+                self._terminal_groups_tasks[group_index, self.tasks.index(task)] = True
+
+    def _is_compiled(self) -> bool:
+        return (
+            self._compiled_tasks is not None
+            and self._terminal_groups_tasks.shape
+            == (len(self.terminal_groups), len(self.tasks))
+        )
+
+    def _tasks_terminated(self) -> np.ndarray:
+        return np.fromiter(
+            (task.terminated for task in self.tasks), dtype=bool, count=len(self.tasks)
+        )
+
     def _terminal_group_from_name(self, name: str) -> Optional[TerminalGroup]:
         if name not in self.terminal_groups:
             return None
@@ -258,7 +258,7 @@ class TransformationsWidget(Menu):
         self, button: "Button", env: "HcraftEnv", action_is_legal: np.ndarray
     ):
         transfo = self.button_id_to_transfo[button.get_id()]
-        action = env.world.transformations.index(transfo)
+        action = env.world.slot_from_transformation(transfo)
         discovered = env.state.discovered_transformations[action]
         legal = action_is_legal[action]
         old_display = self.old_display.get(button.get_id(), None)
@@ -1,12 +1,45 @@
-from typing import TYPE_CHECKING, Dict, Optional
+from dataclasses import dataclass
+from itertools import count
+from typing import TYPE_CHECKING, Dict, NamedTuple, Optional, Tuple
 
 import numpy as np
 
-from hcraft.transformation import InventoryOwner
+from hcraft import kernels
+from hcraft.compiled import HASH_MASK, NO_SLOT, zone_slot_of
+from hcraft.elements import Zone
+from hcraft.transformation import InventoryOwner, _add_to_inventory
 
 if TYPE_CHECKING:
     from hcraft.world import World
-    from hcraft.elements import Zone, Item
+    from hcraft.elements import Item
+
+
+_VERSIONS = count(1)
+"""Versions of states, unique among all states."""
+
+
+class AppliedTransformation(NamedTuple):
+    """Transformation that changed a state. (See `HcraftState.last_transformation`)"""
+
+    previous_version: int
+    """Version of the state before applying the transformation."""
+    action: int
+    """Index of the applied transformation."""
+    previous_zone: int
+    """Slot of the zone where the transformation was applied."""
+
+
+@dataclass
+class HcraftStateSnapshot:
+    """Copy of the arrays defining an HcraftState. (See `HcraftState.snapshot`)"""
+
+    buffer: np.ndarray
+    zones_inventories: np.ndarray
+    discovered: np.ndarray
+    legal_actions: np.ndarray
+    zone_slot: int
+    incremental_legal_actions: bool
+    hash: int
 
 
 class HcraftState:
@@ -20,6 +53,12 @@ class HcraftState:
     The mapping of items, zones, and zones items to their respective indexes is done through
     the given World. (See `hcraft.world`)
 
+    The player's inventory and position are views of a single contiguous buffer
+    that also holds the inventory of the current zone, so that the observation
+    is a view of this buffer. They must be modified in place.
+    Discovered items, zones, zones items and transformations are also views of
+    a single array of flags, only updated at the slots written by transformations.
+
     ![hcraft state](../../docs/images/hcraft_state.png)
 
     """
@@ -29,14 +68,42 @@ class HcraftState:
         Args:
             world: World to build the state for.
         """
-        self.player_inventory = np.array([], dtype=np.int32)
-        self.position = np.array([], dtype=np.int32)
-        self.zones_inventories = np.array([], dtype=np.int32)
-
-        self.discovered_items = np.array([], dtype=np.ubyte)
-        self.discovered_zones = np.array([], dtype=np.ubyte)
-        self.discovered_zones_items = np.array([], dtype=np.ubyte)
-        self.discovered_transformations = np.array([], dtype=np.ubyte)
+        n_items, n_zones = world.n_items, world.n_zones
+        n_observed_zones_items = world.n_zones_items if n_zones > 0 else 0
+        dtype = world.inventory_dtype
+        self._buffer = np.zeros(n_items + n_zones + n_observed_zones_items, dtype)
+        self.player_inventory = self._buffer[:n_items]
+        self.position = self._buffer[n_items : n_items + n_zones]
+        self._current_zone_observation = self._buffer[n_items + n_zones :]
+        self._observation = self._buffer.view()
+        self._observation.flags.writeable = False
+        self.zones_inventories = np.zeros((n_zones, world.n_zones_items), dtype)
+        self._seen_buffer = np.zeros(n_items + n_zones, dtype)
+        self._seen_zones_inventories = np.zeros_like(self.zones_inventories)
+        self._written_buffer = np.zeros(self._seen_buffer.shape, bool)
+        self._written_zones_inventories = np.zeros(self.zones_inventories.shape, bool)
+
+        n_transformations = len(world.transformations)
+        self._discovered = np.zeros(
+            n_items + n_zones + world.n_zones_items + n_transformations, np.ubyte
+        )
+        self._discoveries_offsets = np.cumsum(
+            (0, n_items, n_zones, world.n_zones_items)
+        )
+        (
+            self.discovered_items,
+            self.discovered_zones,
+            self.discovered_zones_items,
+            self.discovered_transformations,
+        ) = np.split(self._discovered, self._discoveries_offsets[1:])
+
+        self._zone_slot = NO_SLOT
+        self._hash = 0
+        self._legal_actions = np.array([], dtype=bool)
+        self._incremental_legal_actions = False
+        self._version = next(_VERSIONS)
+        self._action_mask: Optional[Tuple[int, np.ndarray]] = None
+        self._last_transformation: Optional[Tuple[int, AppliedTransformation]] = None
 
         self.world = world
         self.reset()
@@ -46,7 +113,7 @@ class HcraftState:
         """Inventory of the zone where the player is."""
         if self.position.shape[0] == 0:
             return np.array([])  # No Zone
-        return self.zones_inventories[self._current_zone_slot, :][0]
+        return self.zones_inventories[self.zone_slot]
 
     @property
     def observation(self) -> np.ndarray:
@@ -56,14 +123,14 @@ class HcraftState:
 
         ![hcraft state](../../docs/images/hcraft_observation.png)
 
+        The observation is a read-only view of the state buffer,
+        thus it changes with the state and should be copied to be kept.
+
         """
-        return np.concatenate(
-            (
-                self.player_inventory,
-                self.position,
-                self.current_zone_inventory,
-            )
-        )
+        if self._current_zone_observation.shape[0] > 0:
+            current_zone = self.zones_inventories[self.zone_slot]
+            np.copyto(self._current_zone_observation, current_zone)
+        return self._observation
 
     def amount_of(self, item: "Item", owner: Optional["Zone"] = "player") -> int:
         """Current amount of the given item owned by owner.
@@ -76,12 +143,12 @@ class HcraftState:
             int: Amount of the item in the owner's inventory.
         """
 
-        if owner in self.world.zones:
-            zone_index = self.world.zones.index(owner)
-            zone_item_index = self.world.zones_items.index(item)
+        if isinstance(owner, Zone):
+            zone_index = self.world.slot_from_zone(owner)
+            zone_item_index = self.world.slot_from_zoneitem(item)
             return int(self.zones_inventories[zone_index, zone_item_index])
 
-        item_index = self.world.items.index(item)
+        item_index = self.world.slot_from_item(item)
         return int(self.player_inventory[item_index])
 
     def has_discovered(self, zone: "Zone") -> bool:
@@ -93,7 +160,7 @@ class HcraftState:
         Returns:
             bool: True if the zone was discovered.
         """
-        zone_index = self.world.zones.index(zone)
+        zone_index = self.world.slot_from_zone(zone)
         return bool(self.discovered_zones[zone_index])
 
     @property
@@ -101,11 +168,133 @@ class HcraftState:
         """Current position of the player."""
         if self.world.n_zones == 0:
             return None
-        return self.world.zones[self._current_zone_slot[0]]
+        return self.world.zones[self.zone_slot]
 
     @property
-    def _current_zone_slot(self) -> int:
-        return self.position.nonzero()[0]
+    def zone_slot(self) -> int:
+        """Slot of the zone where the player is, `NO_SLOT` if there is no zone.
+
+        The current zone is tracked as an integer,
+        the one-hot `position` is only written when the player moves.
+
+        """
+        zone_slot = self._zone_slot
+        if zone_slot == NO_SLOT or self.position[zone_slot] != 1:
+            # The position was modified outside of apply.
+            zone_slot = self._zone_slot = zone_slot_of(self.position)
+        return zone_slot
+
+    @property
+    def hash(self) -> int:
+        """Hash of the state, equal for equal states whatever the path to reach them.
+
+        It is updated incrementally when applying transformations,
+        and computed again from the whole state after the state arrays
+        were modified directly. (See `hcraft.compiled` for more details)
+
+        """
+        self._sync_direct_writes()
+        return self._hash
+
+    def refresh_hash(self) -> None:
+        """Compute the state hash again from all slots of the state.
+
+        Legal actions are then also computed again from the whole state
+        at the next `apply`, as they may not follow the modified slots.
+        """
+        self._hash = self.world.compiled_transformations.state_hash(
+            self.player_inventory, self.zone_slot, self.zones_inventories
+        )
+        self._incremental_legal_actions = False
+        self._version = next(_VERSIONS)
+        self._mark_seen()
+
+    def _sync_direct_writes(self) -> None:
+        """Compute again what follows the state if its arrays were modified directly.
+
+        Incremental updates only follow the slots written by `apply`,
+        hence anything written outside of it must be looked for first.
+        """
+        written_buffer = np.not_equal(
+            self._seen_buffer,
+            self._buffer[: self._seen_buffer.shape[0]],
+            out=self._written_buffer,
+        )
+        written_zones_inventories = np.not_equal(
+            self._seen_zones_inventories,
+            self.zones_inventories,
+            out=self._written_zones_inventories,
+        )
+        if not written_buffer.any() and not written_zones_inventories.any():
+            return
+        self.refresh_hash()
+        self._update_legal_actions()
+
+    def _mark_seen(self) -> None:
+        """Remember the state arrays as written by the state itself."""
+        np.copyto(self._seen_buffer, self._buffer[: self._seen_buffer.shape[0]])
+        np.copyto(self._seen_zones_inventories, self.zones_inventories)
+
+    @property
+    def legal_actions(self) -> np.ndarray:
+        """Boolean mask of the transformations that are valid in the current state.
+
+        This mask is maintained incrementally when applying transformations,
+        thus it is a read-only view that should be copied to be kept.
+
+        """
+        self._sync_direct_writes()
+        legal_actions = self._legal_actions.view()
+        legal_actions.flags.writeable = False
+        return legal_actions
+
+    @property
+    def version(self) -> int:
+        """Version of the state, changed by `apply`, `reset`, `restore` and `refresh_hash`.
+
+        Versions are unique among all states, so that a version tells
+        both which state and which step of this state it is.
+        Modifying the state arrays directly also changes the version.
+
+        """
+        self._sync_direct_writes()
+        return self._version
+
+    @property
+    def last_transformation(self) -> Optional[AppliedTransformation]:
+        """Transformation that changed the state into its current version.
+
+        The state then only differs from its previous version at the slots written
+        by this transformation, hence things only depending on other slots
+        did not change. (See `CompiledTransformations.written_changes`)
+
+        None if the state was last changed otherwise, including by writing
+        its arrays directly, or if inventories may be negative, as slots written
+        could then change the validity of transformations and the achievement
+        of tasks using other slots.
+
+        """
+        self._sync_direct_writes()
+        if self._last_transformation is None:
+            return None
+        version, applied = self._last_transformation
+        if version != self._version:
+            return None
+        return applied
+
+    def action_mask(self) -> np.ndarray:
+        """Read-only copy of `HcraftState.legal_actions` that can be kept.
+
+        The copy is made at most once per `HcraftState.version`,
+        so every consumer of the mask of a state shares the same array.
+
+        """
+        self._sync_direct_writes()
+        if self._action_mask is None or self._action_mask[0] != self._version:
+            action_mask = self._legal_actions.copy()
+            action_mask.flags.writeable = False
+            self._action_mask = (self._version, action_mask)
+        return self._action_mask[1]
 
     @property
     def player_inventory_dict(self) -> Dict["Item", int]:
@@ -119,7 +308,7 @@ class HcraftState:
         for zone_slot, zone_inv in enumerate(self.zones_inventories):
             zone = self.world.zones[zone_slot]
             zone_inv = self._inv_as_dict(zone_inv, self.world.zones_items)
-            if zone_slot == self._current_zone_slot or zone_inv:
+            if zone_slot == self.zone_slot or zone_inv:
                 zones_invs[zone] = zone_inv
         return zones_invs
 
@@ -132,58 +321,233 @@ class HcraftState:
         Returns:
             bool: True if the transformation was applied succesfuly. False otherwise.
         """
-        choosen_transformation = self.world.transformations[action]
-        if not choosen_transformation.is_valid(self):
-            return False
-        choosen_transformation.apply(
-            self.player_inventory,
-            self.position,
-            self.zones_inventories,
+        return self.apply_n(action, 1) == 1
+
+    def apply_n(self, action: int, k: int) -> int:
+        """Apply the given action up to k times in a row to update the state.
+
+        The action is applied as many times as it stays valid, up to k,
+        in a single update of the inventories.
+
+        Args:
+            action: Index of the transformation to apply.
+            k: Maximum number of applications.
+
+        Returns:
+            Number of times the transformation was applied.
+        """
+        self._sync_direct_writes()
+        compiled = self.world.compiled_transformations
+        previous_zone = self.zone_slot
+        use_kernel = k == 1 and compiled.use_kernels
+        if use_kernel:
+            n_applications = self._apply_with_kernel(action, previous_zone)
+        elif k == 1:
+            n_applications = int(compiled.is_valid(action, self))
+        else:
+            n_applications = compiled.max_applications(
+                action, self.player_inventory, previous_zone, self.zones_inventories
+            )
+        if (n_applications > 0) != self._legal_actions[action]:
+            # The state was modified outside of apply, the mask cannot be trusted.
+            self._incremental_legal_actions = False
+        n_applications = min(n_applications, k)
+        if n_applications < 1:
+            if not self._incremental_legal_actions:
+                # The state is unchanged, but the mask might not match it.
+                self._update_legal_actions()
+                self._version = next(_VERSIONS)
+            return 0
+        previous_version, self._version = self._version, next(_VERSIONS)
+        if self._incremental_legal_actions:
+            applied = AppliedTransformation(previous_version, action, previous_zone)
+            self._last_transformation = (self._version, applied)
+        if use_kernel:
+            self._update_legal_actions(action, previous_zone)
+            self._mark_seen()
+            return n_applications
+        player_slots, player_changes, zones_slots, zones_changes = (
+            compiled.written_changes(action, previous_zone)
+        )
+        flat_zones_inventories = self.zones_inventories.reshape(-1)
+        previous_hash = compiled.slots_hash(
+            player_slots,
+            self.player_inventory[player_slots],
+            zones_slots,
+            flat_zones_inventories[zones_slots],
+            previous_zone,
+        )
+        _add_to_inventory(
+            self.player_inventory, player_slots, n_applications * player_changes
+        )
+        _add_to_inventory(
+            flat_zones_inventories, zones_slots, n_applications * zones_changes
         )
-        self._update_discoveries(action)
-        return True
+        destination = int(compiled.destination[action])
+        if destination != NO_SLOT:
+            if previous_zone != NO_SLOT:
+                self.position[previous_zone] = 0
+            self.position[destination] = 1
+            self._zone_slot = destination
+        new_hash = compiled.slots_hash(
+            player_slots,
+            self.player_inventory[player_slots],
+            zones_slots,
+            flat_zones_inventories[zones_slots],
+            self._zone_slot,
+        )
+        self._hash = (self._hash - previous_hash + new_hash) & HASH_MASK
+        self._update_discoveries(
+            action,
+            player_slots,
+            zones_slots,
+            moved=destination != NO_SLOT,
+        )
+        self._update_legal_actions(action, previous_zone)
+        self._mark_seen()
+        return n_applications
+
+    def _apply_with_kernel(self, action: int, previous_zone: int) -> int:
+        """Apply the action once if valid with `hcraft.kernels`."""
+        zone_slot = np.array([previous_zone], dtype=np.int64)
+        hashes = np.array([self._hash], dtype=np.uint64)
+        success = kernels.batched_step(
+            self.world.compiled_transformations.kernel_world,
+            np.array([action], dtype=np.int64),
+            np.ones(1, dtype=bool),
+            self.player_inventory.reshape(1, -1),
+            zone_slot,
+            self.zones_inventories.reshape(1, -1),
+            hashes,
+            self._discovered.reshape(1, -1),
+            False,
+            self._discoveries_offsets,
+        )
+        if not success[0]:
+            return 0
+        self._hash = int(hashes[0])
+        if zone_slot[0] != previous_zone:
+            if previous_zone != NO_SLOT:
+                self.position[previous_zone] = 0
+            self.position[zone_slot[0]] = 1
+            self._zone_slot = int(zone_slot[0])
+        return 1
 
     def reset(self) -> None:
         """Reset the state to it's initial value."""
-        self.player_inventory = np.zeros(self.world.n_items, dtype=np.int32)
+        self.player_inventory[...] = 0
         for stack in self.world.start_items:
-            item_slot = self.world.items.index(stack.item)
+            item_slot = self.world.slot_from_item(stack.item)
             self.player_inventory[item_slot] = stack.quantity
 
-        self.position = np.zeros(self.world.n_zones, dtype=np.int32)
+        self.position[...] = 0
         start_slot = 0  # Start in first Zone by default
         if self.world.start_zone is not None:
             start_slot = self.world.slot_from_zone(self.world.start_zone)
+        self._zone_slot = NO_SLOT
         if self.position.shape[0] > 0:
             self.position[start_slot] = 1
+            self._zone_slot = start_slot
 
-        self.zones_inventories = np.zeros(
-            (self.world.n_zones, self.world.n_zones_items), dtype=np.int32
-        )
+        self.zones_inventories[...] = 0
         for zone, zone_stacks in self.world.start_zones_items.items():
             zone_slot = self.world.slot_from_zone(zone)
             for stack in zone_stacks:
-                item_slot = self.world.zones_items.index(stack.item)
+                item_slot = self.world.slot_from_zoneitem(stack.item)
                 self.zones_inventories[zone_slot, item_slot] = stack.quantity
 
-        self.discovered_items = np.zeros(self.world.n_items, dtype=np.ubyte)
-        self.discovered_zones_items = np.zeros(self.world.n_zones_items, dtype=np.ubyte)
-        self.discovered_zones = np.zeros(self.world.n_zones, dtype=np.ubyte)
-        self.discovered_transformations = np.zeros(
-            len(self.world.transformations), dtype=np.ubyte
-        )
+        self._discovered[...] = 0
         self._update_discoveries()
+        self.refresh_hash()
+        self._update_legal_actions()
 
-    def _update_discoveries(self, action: Optional[int] = None) -> None:
-        self.discovered_items = np.bitwise_or(
-            self.discovered_items, self.player_inventory > 0
-        )
-        self.discovered_zones_items = np.bitwise_or(
-            self.discovered_zones_items, self.current_zone_inventory > 0
-        )
-        self.discovered_zones = np.bitwise_or(self.discovered_zones, self.position > 0)
-        if action is not None:
-            self.discovered_transformations[action] = 1
+    def snapshot(
+        self, out: Optional[HcraftStateSnapshot] = None
+    ) -> HcraftStateSnapshot:
+        """Copy the state to be restored later with `HcraftState.restore`.
+
+        Args:
+            out: Snapshot of the same world to copy the state into,
+                avoiding any allocation. Defaults to None, hence a new snapshot.
+
+        Returns:
+            The snapshot of the state.
+        """
+        if out is None:
+            return HcraftStateSnapshot(
+                buffer=self._buffer.copy(),
+                zones_inventories=self.zones_inventories.copy(),
+                discovered=self._discovered.copy(),
+                legal_actions=self._legal_actions.copy(),
+                zone_slot=self._zone_slot,
+                incremental_legal_actions=self._incremental_legal_actions,
+                hash=self._hash,
+            )
+        np.copyto(out.buffer, self._buffer)
+        np.copyto(out.zones_inventories, self.zones_inventories)
+        np.copyto(out.discovered, self._discovered)
+        np.copyto(out.legal_actions, self._legal_actions)
+        out.zone_slot = self._zone_slot
+        out.incremental_legal_actions = self._incremental_legal_actions
+        out.hash = self._hash
+        return out
+
+    def restore(self, snapshot: HcraftStateSnapshot) -> None:
+        """Restore in place a state copied with `HcraftState.snapshot`."""
+        np.copyto(self._buffer, snapshot.buffer)
+        np.copyto(self.zones_inventories, snapshot.zones_inventories)
+        np.copyto(self._discovered, snapshot.discovered)
+        np.copyto(self._legal_actions, snapshot.legal_actions)
+        self._zone_slot = snapshot.zone_slot
+        self._incremental_legal_actions = snapshot.incremental_legal_actions
+        self._hash = snapshot.hash
+        self._version = next(_VERSIONS)
+        self._mark_seen()
+
+    def _update_legal_actions(
+        self, action: Optional[int] = None, previous_zone: int = NO_SLOT
+    ) -> None:
+        compiled = self.world.compiled_transformations
+        if action is None or not self._incremental_legal_actions:
+            self._legal_actions = compiled.valid_mask(self)
+            self._incremental_legal_actions = compiled.keeps_non_negative and (
+                self.player_inventory.size == 0 or self.player_inventory.min() >= 0
+            )
+            if self.zones_inventories.size > 0:
+                self._incremental_legal_actions &= self.zones_inventories.min() >= 0
+            return
+        affected = compiled.affected_transformations(action, previous_zone)
+        self._legal_actions[affected] = compiled.valid_mask(self, rows=affected)
+
+    def _update_discoveries(
+        self,
+        action: Optional[int] = None,
+        player_slots: Optional[np.ndarray] = None,
+        zones_slots: Optional[np.ndarray] = None,
+        moved: bool = False,
+    ) -> None:
+        """Discover what is in the state, or only the slots written by an action."""
+        if action is None:
+            self.discovered_items[self.player_inventory > 0] = 1
+            self.discovered_zones[self.position > 0] = 1
+            self.discovered_zones_items[self.current_zone_inventory > 0] = 1
+            return
+        self.discovered_transformations[action] = 1
+        found = self.player_inventory[player_slots] > 0
+        self.discovered_items[player_slots[found]] = 1
+        zone_slot = self._zone_slot
+        if zone_slot == NO_SLOT:
+            return
+        if moved:
+            self.discovered_zones[zone_slot] = 1
+            self.discovered_zones_items[self.zones_inventories[zone_slot] > 0] = 1
+            return
+        if zones_slots.shape[0] == 0:
+            return
+        zones, items = np.divmod(zones_slots, self.world.n_zones_items)
+        items = items[zones == zone_slot]
+        found = self.zones_inventories[zone_slot, items] > 0
+        self.discovered_zones_items[items[found]] = 1
 
     @staticmethod
     def _inv_as_dict(inventory_array: np.ndarray, obj_registry: list):
@@ -200,3 +564,311 @@ class HcraftState:
         }
         state_dict.update(self.zones_inventories_dict)
         return state_dict
+
+
+class BatchedHcraftState:
+    """Batch of HierarchyCraft states stored as arrays of states.
+
+    Each part of the state has a leading dimension over the N states of the batch:
+    * The players inventories: `state.player_inventories` of shape (N, n_items)
+    * The zone slot of each player: `state.positions` of shape (N,)
+    * All zones inventories: `state.zones_inventories` of shape
+    (N, n_zones, n_zones_items)
+
+    Transformations are applied to every state at once using the compiled
+    transformations of the given World. (See `hcraft.compiled`)
+    They also update the hash of each state in `state.hashes`,
+    equal to `HcraftState.hash` of the same state.
+    Discoveries of each state are stored as packed bits in `state.discovered_bits`
+    and only updated at the slots written by transformations.
+
+    Example:
+        ```python
+        import numpy as np
+        from hcraft.examples import MineHcraftEnv
+        from hcraft.state import BatchedHcraftState
+
+        world = MineHcraftEnv().world
+        states = BatchedHcraftState(world, n_states=1024)
+        actions = np.argmax(states.legal_actions, axis=1)
+        success = states.apply(actions)
+        ```
+
+    """
+
+    def __init__(self, world: "World", n_states: int) -> None:
+        """
+        Args:
+            world: World to build the states for.
+            n_states: Number of states in the batch.
+        """
+        self.world = world
+        self.n_states = n_states
+
+        initial_state = HcraftState(world)
+        self._initial_player_inventory = initial_state.player_inventory
+        self._initial_position = initial_state.zone_slot
+        self._initial_zones_inventories = initial_state.zones_inventories
+
+        dtype = world.inventory_dtype
+        self.player_inventories = np.zeros((n_states, world.n_items), dtype=dtype)
+        self.positions = np.full(n_states, NO_SLOT, dtype=np.int64)
+        self.zones_inventories = np.zeros(
+            (n_states, world.n_zones, world.n_zones_items), dtype=dtype
+        )
+
+        self._discoveries_offsets = np.cumsum(
+            (
+                0,
+                world.n_items,
+                world.n_zones,
+                world.n_zones_items,
+                len(world.transformations),
+            )
+        )
+        n_discoveries = self._discoveries_offsets[-1]
+        self.discovered_bits = np.zeros(
+            (n_states, (n_discoveries + 7) // 8), dtype=np.uint8
+        )
+        self.hashes = np.zeros(n_states, dtype=np.uint64)
+        self.reset()
+
+    @property
+    def one_hot_positions(self) -> np.ndarray:
+        """One-hot encoded positions of shape (N, n_zones)."""
+        one_hot = np.zeros(
+            (self.n_states, self.world.n_zones), dtype=self.world.inventory_dtype
+        )
+        if self.world.n_zones > 0:
+            one_hot[np.arange(self.n_states), self.positions] = 1
+        return one_hot
+
+    @property
+    def current_zones_inventories(self) -> np.ndarray:
+        """Inventories of the zone where each player is of shape (N, n_zones_items)."""
+        if self.world.n_zones == 0:
+            return np.zeros((self.n_states, 0), dtype=self.world.inventory_dtype)
+        return self.zones_inventories[np.arange(self.n_states), self.positions]
+
+    @property
+    def observations(self) -> np.ndarray:
+        """Observation of each state, the same as `HcraftState.observation`."""
+        return np.concatenate(
+            (
+                self.player_inventories,
+                self.one_hot_positions,
+                self.current_zones_inventories,
+            ),
+            axis=1,
+        )
+
+    @property
+    def legal_actions(self) -> np.ndarray:
+        """Boolean mask of valid transformations of shape (N, n_transformations)."""
+        return self.world.compiled_transformations.batched_valid_mask(
+            self.player_inventories, self.positions, self.zones_inventories
+        )
+
+    def is_valid(self, actions: np.ndarray) -> np.ndarray:
+        """Whether each action is valid in its state.
+
+        Args:
+            actions: Index of the transformation to check for each state.
+
+        Returns:
+            Boolean array of shape (N,).
+        """
+        return self.world.compiled_transformations.batched_is_valid(
+            np.asarray(actions),
+            self.player_inventories,
+            self.positions,
+            self.zones_inventories,
+        )
+
+    def apply(
+        self, actions: np.ndarray, mask: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Apply the given actions to update each state of the batch.
+
+        Invalid actions leave their state unchanged.
+
+        Args:
+            actions: Index of the transformation to apply for each state.
+            mask: Boolean mask of the states to update, others are left unchanged.
+                Defaults to all states.
+
+        Returns:
+            Boolean array of shape (N,), True where the transformation was applied.
+        """
+        actions = np.asarray(actions)
+        compiled = self.world.compiled_transformations
+        if compiled.use_kernels:
+            if mask is None:
+                mask = np.ones(self.n_states, dtype=bool)
+            return kernels.batched_step(
+                compiled.kernel_world,
+                actions.astype(np.int64),
+                np.asarray(mask, dtype=bool),
+                self.player_inventories,
+                self.positions,
+                self.zones_inventories.reshape(self.n_states, -1),
+                self.hashes,
+                self.discovered_bits,
+                True,
+                self._discoveries_offsets[:4],
+            )
+        success = self.is_valid(actions)
+        if mask is not None:
+            success &= mask
+        applied = np.flatnonzero(success)
+        if applied.shape[0] == self.n_states:
+            applied = slice(None)
+        player_inventories = self.player_inventories[applied]
+        positions = self.positions[applied]
+        zones_inventories = self.zones_inventories[applied]
+        hashes = self.hashes[applied]
+        previous_positions = positions.copy()
+        self.world.compiled_transformations.batched_apply(
+            actions[applied], player_inventories, positions, zones_inventories, hashes
+        )
+        self.player_inventories[applied] = player_inventories
+        self.positions[applied] = positions
+        self.zones_inventories[applied] = zones_inventories
+        self.hashes[applied] = hashes
+        self._update_written_discoveries(
+            np.flatnonzero(success), actions[applied], previous_positions
+        )
+        return success
+
+    def single_state(self, index: int) -> HcraftState:
+        """Copy of the state of the given index as an HcraftState.
+
+        Args:
+            index: Index of the state in the batch.
+        """
+        state = HcraftState(self.world)
+        state.player_inventory[...] = self.player_inventories[index]
+        state.position[...] = self.one_hot_positions[index]
+        state.zones_inventories[...] = self.zones_inventories[index]
+        state.discovered_items[...] = self.discovered_items[index]
+        state.discovered_zones[...] = self.discovered_zones[index]
+        state.discovered_zones_items[...] = self.discovered_zones_items[index]
+        state.discovered_transformations[...] = self.discovered_transformations[index]
+        state._update_legal_actions()
+        state.refresh_hash()
+        return state
+
+    def reset(self, mask: Optional[np.ndarray] = None) -> None:
+        """Reset states to their initial value.
+
+        Args:
+            mask: Boolean mask of the states to reset. Defaults to all states.
+        """
+        if mask is None:
+            mask = np.ones(self.n_states, dtype=bool)
+        self.player_inventories[mask] = self._initial_player_inventory
+        self.positions[mask] = self._initial_position
+        self.zones_inventories[mask] = self._initial_zones_inventories
+        self.discovered_bits[mask] = 0
+        self._update_discoveries()
+        self.refresh_hashes(mask)
+
+    def refresh_hashes(self, mask: Optional[np.ndarray] = None) -> None:
+        """Compute the hashes of states again from all their slots.
+
+        Hashes are updated incrementally when applying transformations,
+        thus this must be called after modifying the state arrays directly.
+
+        Args:
+            mask: Boolean mask of the states to refresh. Defaults to all states.
+        """
+        if mask is None:
+            mask = np.ones(self.n_states, dtype=bool)
+        self.hashes[mask] = self.world.compiled_transformations.batched_state_hash(
+            self.player_inventories[mask],
+            self.positions[mask],
+            self.zones_inventories[mask],
+        )
+
+    @property
+    def discovered_items(self) -> np.ndarray:
+        """Whether each item was discovered in each state of shape (N, n_items)."""
+        return self._unpack_discoveries(0)
+
+    @property
+    def discovered_zones(self) -> np.ndarray:
+        """Whether each zone was discovered in each state of shape (N, n_zones)."""
+        return self._unpack_discoveries(1)
+
+    @property
+    def discovered_zones_items(self) -> np.ndarray:
+        """Whether each zone item was discovered in each state
+        of shape (N, n_zones_items)."""
+        return self._unpack_discoveries(2)
+
+    @property
+    def discovered_transformations(self) -> np.ndarray:
+        """Whether each transformation was applied in each state
+        of shape (N, n_transformations)."""
+        return self._unpack_discoveries(3)
+
+    def _unpack_discoveries(self, part: int) -> np.ndarray:
+        start, stop = self._discoveries_offsets[part : part + 2]
+        flags = np.unpackbits(
+            self.discovered_bits, axis=1, count=stop, bitorder="little"
+        )
+        return flags[:, start:]
+
+    def _discover(self, states: np.ndarray, flags: np.ndarray) -> None:
+        """Set the bits of the given discoveries flags of the given states."""
+        bits = np.left_shift(1, flags & 7).astype(np.uint8)
+        np.bitwise_or.at(self.discovered_bits, (states, flags >> 3), bits)
+
+    def _update_discoveries(self) -> None:
+        """Discover everything present in every state."""
+        items_offset, zones_offset, zones_items_offset = self._discoveries_offsets[:3]
+        states, slots = np.nonzero(self.player_inventories > 0)
+        self._discover(states, items_offset + slots)
+        if self.world.n_zones == 0:
+            return
+        states = np.flatnonzero(self.positions != NO_SLOT)
+        self._discover(states, zones_offset + self.positions[states])
+        states, slots = np.nonzero(self.current_zones_inventories > 0)
+        self._discover(states, zones_items_offset + slots)
+
+    def _update_written_discoveries(
+        self, states: np.ndarray, actions: np.ndarray, previous_positions: np.ndarray
+    ) -> None:
+        """Discover what changed in the slots written by the actions applied
+        on the given states."""
+        items_offset, zones_offset, zones_items_offset, transformations_offset = (
+            self._discoveries_offsets[:4]
+        )
+        self._discover(states, transformations_offset + actions)
+        player_at, player_slots, zones_at, zones_slots = (
+            self.world.compiled_transformations.batched_written_slots(
+                actions, previous_positions
+            )
+        )
+        player_states = states[player_at]
+        found = self.player_inventories[player_states, player_slots] > 0
+        self._discover(player_states[found], items_offset + player_slots[found])
+        if self.world.n_zones == 0 or self.world.n_zones_items == 0:
+            return
+
+        positions = self.positions[states]
+        moved = positions != previous_positions
+        moved_states = states[moved]
+        self._discover(moved_states, zones_offset + positions[moved])
+        moved_at, slots = np.nonzero(
+            self.zones_inventories[moved_states, positions[moved]] > 0
+        )
+        self._discover(moved_states[moved_at], zones_items_offset + slots)
+
+        zones, slots = np.divmod(zones_slots, self.world.n_zones_items)
+        zones_states = states[zones_at]
+        found = (zones == positions[zones_at]) & ~moved[zones_at]
+        found[found] = (
+            self.zones_inventories[zones_states[found], zones[found], slots[found]] > 0
+        )
+        self._discover(zones_states[found], zones_items_offset + slots[found])
@@ -3,10 +3,13 @@ from typing import TYPE_CHECKING, List, Optional, Union
 
 import numpy as np
 
+from hcraft.compiled import NO_SLOT, IndexLists
 from hcraft.elements import Item, Stack, Zone
 
 if TYPE_CHECKING:
     from hcraft.env import HcraftState
+    from hcraft.compiled import WrittenChanges
+    from hcraft.state import BatchedHcraftState
     from hcraft.world import World
 
 
@@ -47,6 +50,59 @@ class Task:
         Returns the reward for the given state.
         """
 
+    def batched_is_terminal(self, states: "BatchedHcraftState") -> np.ndarray:
+        """
+        Returns whether the task is achieved in each state of the batch.
+
+        Unlike `is_terminal`, this does not update the task termination.
+        """
+        return np.array(
+            [
+                self._is_terminal(states.single_state(index))
+                for index in range(states.n_states)
+            ],
+            dtype=bool,
+        )
+
+    def batched_reward(
+        self, states: "BatchedHcraftState", terminated: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns the reward for each state of the batch.
+
+        Args:
+            states: Batch of states.
+            terminated: Whether the task was already terminated for each state.
+        """
+        task_terminated = self.terminated
+        rewards = np.zeros(states.n_states)
+        for index in range(states.n_states):
+            self.terminated = bool(terminated[index])
+            rewards[index] = self.reward(states.single_state(index))
+        self.terminated = task_terminated
+        return rewards
+
+    def first_terminal_application(
+        self, state: "HcraftState", changes: "WrittenChanges", n: int
+    ) -> Optional[int]:
+        """
+        Returns after how many applications of a transformation the task
+        is terminal, applying it up to n times in a row from the given state.
+
+        Tasks that cannot tell return 1, so that the transformation is applied
+        one at a time and the task evaluated after each application.
+
+        Args:
+            state: State before applying the transformation.
+            changes: Slots written by one application and their changes,
+                as given by `CompiledTransformations.written_changes`.
+            n: Maximum number of applications, none of them moving the player.
+
+        Returns:
+            Number of applications between 1 and n, or None if not within n.
+        """
+        return 1
+
     def reset(self) -> None:
         """
         Reset the task termination.
@@ -78,6 +134,19 @@ class AchievementTask(Task):
             return self._reward
         return 0.0
 
+    def first_terminal_application(
+        self, state: "HcraftState", changes: "WrittenChanges", n: int
+    ) -> Optional[int]:
+        if self.terminated:
+            return None
+        return super().first_terminal_application(state, changes, n)
+
+    def batched_reward(
+        self, states: "BatchedHcraftState", terminated: np.ndarray
+    ) -> np.ndarray:
+        achieved = ~terminated & self.batched_is_terminal(states)
+        return np.where(achieved, self._reward, 0.0)
+
 
 class GetItemTask(AchievementTask):
     """Task of getting a given quantity of an item."""
@@ -88,12 +157,27 @@ class GetItemTask(AchievementTask):
 
     def build(self, world: "World") -> None:
         super().build(world)
-        item_slot = world.items.index(self.item_stack.item)
+        item_slot = world.slot_from_item(self.item_stack.item)
         self._terminate_player_items[item_slot] = self.item_stack.quantity
 
     def _is_terminal(self, state: "HcraftState") -> bool:
         return np.all(state.player_inventory >= self._terminate_player_items)
 
+    def batched_is_terminal(self, states: "BatchedHcraftState") -> np.ndarray:
+        return np.all(states.player_inventories >= self._terminate_player_items, axis=1)
+
+    def first_terminal_application(
+        self, state: "HcraftState", changes: "WrittenChanges", n: int
+    ) -> Optional[int]:
+        if self.terminated:
+            return None
+        player_slots, player_changes, _, _ = changes
+        dense_changes = np.zeros(state.player_inventory.shape[0], dtype=np.int64)
+        dense_changes[player_slots] = player_changes
+        return _first_application(
+            state.player_inventory, dense_changes, self._terminate_player_items, n
+        )
+
     @staticmethod
     def get_name(stack: Stack):
         """Name of the task for a given Stack"""
@@ -110,12 +194,23 @@ class GoToZoneTask(AchievementTask):
 
     def build(self, world: "World"):
         super().build(world)
-        zone_slot = world.zones.index(self.zone)
+        zone_slot = world.slot_from_zone(self.zone)
         self._terminate_position[zone_slot] = 1
 
     def _is_terminal(self, state: "HcraftState") -> bool:
         return np.all(state.position == self._terminate_position)
 
+    def batched_is_terminal(self, states: "BatchedHcraftState") -> np.ndarray:
+        return states.positions == np.argmax(self._terminate_position)
+
+    def first_terminal_application(
+        self, state: "HcraftState", changes: "WrittenChanges", n: int
+    ) -> Optional[int]:
+        # The position does not change between applications.
+        if self.terminated or not self._is_terminal(state):
+            return None
+        return 1
+
     @staticmethod
     def get_name(zone: Zone):
         """Name of the task for a given Stack"""
@@ -146,7 +241,7 @@ class PlaceItemTask(AchievementTask):
             zones_slots = np.arange(self._terminate_zones_items.shape[0])
         else:
             zones_slots = np.array([world.slot_from_zone(self.zone)])
-        zone_item_slot = world.zones_items.index(self.item_stack.item)
+        zone_item_slot = world.slot_from_zoneitem(self.item_stack.item)
         self._terminate_zones_items[zones_slots, zone_item_slot] = (
             self.item_stack.quantity
         )
@@ -158,6 +253,36 @@ class PlaceItemTask(AchievementTask):
             )
         return np.all(state.zones_inventories >= self._terminate_zones_items)
 
+    def batched_is_terminal(self, states: "BatchedHcraftState") -> np.ndarray:
+        placed = states.zones_inventories >= self._terminate_zones_items
+        if self.zone is None:
+            return np.any(np.all(placed, axis=2), axis=1)
+        return np.all(placed, axis=(1, 2))
+
+    def first_terminal_application(
+        self, state: "HcraftState", changes: "WrittenChanges", n: int
+    ) -> Optional[int]:
+        if self.terminated:
+            return None
+        _, _, zones_slots, zones_changes = changes
+        dense_changes = np.zeros(state.zones_inventories.size, dtype=np.int64)
+        dense_changes[zones_slots] = zones_changes
+        dense_changes = dense_changes.reshape(state.zones_inventories.shape)
+        if self.zone is not None:
+            return _first_application(
+                state.zones_inventories.reshape(-1),
+                dense_changes.reshape(-1),
+                self._terminate_zones_items.reshape(-1),
+                n,
+            )
+        firsts = [
+            _first_application(zone_inventory, zone_changes, zone_thresholds, n)
+            for zone_inventory, zone_changes, zone_thresholds in zip(
+                state.zones_inventories, dense_changes, self._terminate_zones_items
+            )
+        ]
+        return min((first for first in firsts if first is not None), default=None)
+
     @staticmethod
     def get_name(stack: Stack, zone: Optional[Zone]):
         """Name of the task for a given Stack and list of Zone"""
@@ -166,6 +291,193 @@ class PlaceItemTask(AchievementTask):
         return f"Place{quantity_str}{stack.item.name}{zones_str}"
 
 
+class CompiledTasks:
+    """Thresholds of `GetItemTask`, `GoToZoneTask` and `PlaceItemTask` stacked
+    into matrices, to check all these achievements in a few vectorized operations.
+
+    Only tasks of exactly those types are compiled, other tasks are left out
+    and must be evaluated one by one.
+    (See `Purpose.reward` and `Purpose.is_terminal`)
+
+    Compiled tasks are also indexed by the slots they read, to only check again
+    the tasks whose slots were written by a transformation.
+    (See `CompiledTasks.affected_columns`)
+
+    """
+
+    def __init__(self, tasks: List[Task], world: "World") -> None:
+        """
+        Args:
+            tasks: Tasks already built on the given world.
+            world: World the tasks were built on.
+        """
+        get_item, go_to_zone, place_item = [], [], []
+        for index, task in enumerate(tasks):
+            if type(task) is GetItemTask:
+                get_item.append(index)
+            elif type(task) is GoToZoneTask:
+                go_to_zone.append(index)
+            elif type(task) is PlaceItemTask:
+                place_item.append(index)
+
+        self.tasks_indexes = np.array(get_item + go_to_zone + place_item, np.int64)
+        """Index of each compiled task in the given tasks, in the order of checks."""
+        self.rewards = np.array(
+            [tasks[index]._reward for index in self.tasks_indexes], dtype=np.float64
+        )
+        self.player_thresholds = np.zeros((len(get_item), world.n_items), np.int64)
+        for row, index in enumerate(get_item):
+            self.player_thresholds[row] = tasks[index]._terminate_player_items
+        self.zones_slots = np.array(
+            [np.argmax(tasks[index]._terminate_position) for index in go_to_zone],
+            dtype=np.int64,
+        )
+        self.zones_thresholds = np.zeros(
+            (len(place_item), world.n_zones, world.n_zones_items), np.int64
+        )
+        for row, index in enumerate(place_item):
+            self.zones_thresholds[row] = tasks[index]._terminate_zones_items
+        self.anywhere = np.array(
+            [tasks[index].zone is None for index in place_item], dtype=bool
+        )
+        self._first_columns = (len(get_item), len(get_item) + len(go_to_zone))
+
+        # Index of the columns of tasks reading each slot.
+        first_go_to_zone, first_place_item = self._first_columns
+        rows, slots = np.nonzero(self.player_thresholds)
+        self.player_slots_tasks = IndexLists(slots, rows, world.n_items)
+        self.zones_slots_tasks = IndexLists(
+            self.zones_slots,
+            first_go_to_zone + np.arange(len(go_to_zone)),
+            world.n_zones,
+        )
+        n_cells = world.n_zones * world.n_zones_items
+        rows, cells = np.nonzero(
+            self.zones_thresholds.reshape(len(place_item), n_cells)
+        )
+        self.zones_cells_tasks = IndexLists(cells, first_place_item + rows, n_cells)
+
+    @property
+    def n_tasks(self) -> int:
+        """Number of compiled tasks."""
+        return self.tasks_indexes.shape[0]
+
+    def affected_columns(
+        self, player_slots: np.ndarray, zones_slots: np.ndarray, destination: int
+    ) -> np.ndarray:
+        """Columns of the compiled tasks whose achievement can change
+        when writing the given slots, as long as inventories stay non-negative.
+
+        Args:
+            player_slots: Written slots of the player inventory.
+            zones_slots: Written slots of the flattened zones inventories.
+            destination: Slot of the zone where the player moved, NO_SLOT if none.
+
+        Returns:
+            Sorted columns of the affected tasks.
+        """
+        columns = [np.zeros(0, dtype=np.int64)]
+        columns += [self.player_slots_tasks.row(slot) for slot in player_slots]
+        columns += [self.zones_cells_tasks.row(slot) for slot in zones_slots]
+        if destination != NO_SLOT:
+            columns.append(self.zones_slots_tasks.row(destination))
+        return np.unique(np.concatenate(columns))
+
+    def achieved(
+        self, state: "HcraftState", columns: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Whether compiled tasks are achieved in the given state.
+
+        Args:
+            state: State to check.
+            columns: Sorted columns of the tasks to check. Defaults to all tasks.
+
+        Returns:
+            Boolean array of shape (n_tasks,) ordered as `CompiledTasks.tasks_indexes`,
+            or of the shape of the given columns.
+        """
+        return self._achieved(
+            state.player_inventory[np.newaxis],
+            np.array([state.zone_slot]),
+            state.zones_inventories[np.newaxis],
+            columns,
+        )[0]
+
+    def batched_achieved(self, states: "BatchedHcraftState") -> np.ndarray:
+        """Whether each compiled task is achieved in each state of the batch.
+
+        Returns:
+            Boolean array of shape (N, n_tasks) ordered as `CompiledTasks.tasks_indexes`.
+        """
+        return self._achieved(
+            states.player_inventories, states.positions, states.zones_inventories
+        )
+
+    def _achieved(
+        self,
+        player_inventories: np.ndarray,
+        zone_slots: np.ndarray,
+        zones_inventories: np.ndarray,
+        columns: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        n_states = player_inventories.shape[0]
+        get_item = go_to_zone = place_item = slice(None)
+        if columns is not None:
+            if columns.shape[0] == 0:
+                return np.zeros((n_states, 0), dtype=bool)
+            first_go_to_zone, first_place_item = self._first_columns
+            split = np.searchsorted(columns, self._first_columns)
+            get_item = columns[: split[0]]
+            go_to_zone = columns[split[0] : split[1]] - first_go_to_zone
+            place_item = columns[split[1] :] - first_place_item
+
+        achieved = []
+        player_thresholds = self.player_thresholds[get_item]
+        if player_thresholds.shape[0] > 0:
+            enough_items = player_inventories[:, np.newaxis] >= player_thresholds
+            achieved.append(enough_items.all(axis=2))
+        zones_slots = self.zones_slots[go_to_zone]
+        if zones_slots.shape[0] > 0:
+            achieved.append(zone_slots[:, np.newaxis] == zones_slots)
+        zones_thresholds = self.zones_thresholds[place_item]
+        if zones_thresholds.shape[0] > 0:
+            enough_zones_items = zones_inventories[:, np.newaxis] >= zones_thresholds
+            placed_in_zones = enough_zones_items.all(axis=3)
+            placed_items = np.where(
+                self.anywhere[place_item],
+                placed_in_zones.any(axis=2),
+                placed_in_zones.all(axis=2),
+            )
+            achieved.append(placed_items)
+        if not achieved:
+            return np.zeros((n_states, 0), dtype=bool)
+        return np.concatenate(achieved, axis=1)
+
+
+def _first_application(
+    values: np.ndarray, changes: np.ndarray, thresholds: np.ndarray, n: int
+) -> Optional[int]:
+    """Smallest j between 1 and n such that all values + j * changes reach
+    their thresholds, None if there is none."""
+    values = values.astype(np.int64)
+    missing = thresholds - values
+    constant = changes == 0
+    if np.any(missing[constant] > 0):
+        return None
+    first, last = 1, n
+    increasing = changes > 0
+    if np.any(increasing):
+        ceil = -(-missing[increasing] // changes[increasing])
+        first = max(first, int(np.max(ceil)))
+    decreasing = changes < 0
+    if np.any(decreasing):
+        floor = -missing[decreasing] // -changes[decreasing]
+        last = min(last, int(np.min(floor)))
+    if first > last:
+        return None
+    return first
+
+
 def _stack_item(item_or_stack: Union[Item, Stack]) -> Stack:
     if not isinstance(item_or_stack, Stack):
         item_or_stack = Stack(item_or_stack)
@@ -138,7 +138,7 @@ because the player only observe the current zone items.
 
 """
 
-from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple, Union, Any
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple, Union, Any
 from enum import Enum
 from dataclasses import dataclass
 
@@ -164,6 +164,11 @@ class InventoryOwner(Enum):
     """A specific zone inventory"""
 
 
+MIN_SENTINEL = int(np.iinfo(np.int32).min)
+"""Lower bound used for inventory slots that are not bounded from below."""
+MAX_SENTINEL = int(np.iinfo(np.int32).max)
+"""Upper bound used for inventory slots that are not bounded from above."""
+
 PLAYER = InventoryOwner.PLAYER
 CURRENT_ZONE = InventoryOwner.CURRENT
 DESTINATION = InventoryOwner.DESTINATION
@@ -185,8 +190,12 @@ class Use:
     By default, min is 1 if consume is 0, else min=consume.
 
     """
-    max: int = np.inf
-    """Maximum amout of the item *before* the transformation to be valid. Defaults to inf."""
+    max: int = MAX_SENTINEL
+    """Maximum amout of the item *before* the transformation to be valid.
+
+    Defaults to MAX_SENTINEL, hence unbounded.
+
+    """
 
     def __post_init__(self):
         if not isinstance(self.owner, Zone):
@@ -205,10 +214,18 @@ class Yield:
     """Item to yield."""
     create: int = 1
     """Amout of the item to create in the inventory. Defaults to 1."""
-    min: int = -np.inf
-    """Minimum amout of the item *before* the transformation to be valid. Defaults to -inf."""
-    max: int = np.inf
-    """Maximum amout of the item *before* the transformation to be valid. Defaults to inf."""
+    min: int = MIN_SENTINEL
+    """Minimum amout of the item *before* the transformation to be valid.
+
+    Defaults to MIN_SENTINEL, hence unbounded.
+
+    """
+    max: int = MAX_SENTINEL
+    """Maximum amout of the item *before* the transformation to be valid.
+
+    Defaults to MAX_SENTINEL, hence unbounded.
+
+    """
 
     def __post_init__(self):
         if not isinstance(self.owner, Zone):
@@ -235,7 +252,64 @@ InventoryChanges = Dict[
     InventoryOperation,
     Union[List[Union[Item, Stack]], Dict[Zone, List[Union[Item, Stack]]]],
 ]
-InventoryOperations = Dict[InventoryOperation, np.ndarray]
+
+
+class SparseOperationArray:
+    """Inventory operation array storing only the slots set by its stacks.
+
+    Large worlds use it instead of dense arrays, see `World.sparse_operations`.
+    Every other slot has the default value of the operation.
+    Slots of zones operations are indexes in the flattened zones inventories.
+
+    """
+
+    def __init__(
+        self,
+        slots: np.ndarray,
+        values: np.ndarray,
+        shape: Tuple[int, ...],
+        default: int = 0,
+    ) -> None:
+        """
+        Args:
+            slots: Flat indexes of the slots set by the operation.
+            values: Values of the operation on those slots.
+            shape: Shape of the equivalent dense operation array.
+            default: Value of the operation on every other slot. Defaults to 0.
+        """
+        self.slots = np.asarray(slots, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.int64)
+        self.shape = shape
+        self.default = default
+
+    def toarray(self) -> np.ndarray:
+        """Equivalent dense operation array."""
+        dense = np.full(self.shape, self.default, dtype=np.int32)
+        dense.reshape(-1)[self.slots] = self.values
+        return dense
+
+    def any_below(self, inventory: np.ndarray) -> bool:
+        """Whether any slot of the given inventory is below the operation values."""
+        flat_inventory = inventory.reshape(-1)
+        if np.any(flat_inventory[self.slots] < self.values):
+            return True
+        below_default = np.flatnonzero(flat_inventory < self.default)
+        return not np.all(np.isin(below_default, self.slots))
+
+    def any_above(self, inventory: np.ndarray) -> bool:
+        """Whether any slot of the given inventory is above the operation values."""
+        flat_inventory = inventory.reshape(-1)
+        if np.any(flat_inventory[self.slots] > self.values):
+            return True
+        above_default = np.flatnonzero(flat_inventory > self.default)
+        return not np.all(np.isin(above_default, self.slots))
+
+    def add_to(self, inventory: np.ndarray) -> None:
+        """Add the operation values in place to the given inventory."""
+        _add_to_inventory(inventory.reshape(-1), self.slots, self.values)
+
+
+InventoryOperations = Dict[InventoryOperation, Union[np.ndarray, SparseOperationArray]]
 
 
 class Transformation:
@@ -310,16 +384,10 @@ class Transformation:
                 Defaults to None.
         """
         self.destination = destination
-        self._destination = None
-
         self.zone = zone
-        self._zone = None
-
         self._changes_list = inventory_changes
         self.inventory_changes = _format_inventory_changes(inventory_changes)
-        self._inventory_operations: Optional[
-            Dict[InventoryOwner, InventoryOperations]
-        ] = None
+        self._operations: Optional["TransformationOperations"] = None
 
         self.name = name if name is not None else self.__repr__()
 
@@ -328,38 +396,69 @@ class Transformation:
         player_inventory: np.ndarray,
         position: np.ndarray,
         zones_inventories: np.ndarray,
-    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-        """Apply the transformation in place on the given state."""
+        zone_slot: Optional[int] = None,
+        world: Optional["World"] = None,
+    ) -> None:
+        """Apply the transformation in place on the given state.
 
-        for owner, operations in self._inventory_operations.items():
-            operation_arr = operations[InventoryOperation.APPLY]
-            if operation_arr is not None:
-                _update_inventory(
-                    owner,
-                    player_inventory,
-                    position,
-                    zones_inventories,
-                    self._destination,
-                    operation_arr,
-                )
-        if self._destination is not None:
-            position[...] = self._destination
+        The slot of the current zone is read from the position if not given.
+        Operations are the ones built on the given world, see `Transformation.operations`.
+        """
+        self.operations(world).apply(
+            player_inventory, position, zones_inventories, zone_slot=zone_slot
+        )
 
     def is_valid(self, state: "HcraftState") -> bool:
         """Is the transformation valid in the given state?"""
-        if not self._is_valid_position(state.position):
-            return False
-        if not self._is_valid_player_inventory(state.player_inventory):
-            return False
-        if not self._is_valid_zones_inventory(state.zones_inventories, state.position):
-            return False
-        return True
+        return self.operations(getattr(state, "world", None)).is_valid(state)
+
+    def max_applications(self, state: "HcraftState") -> int:
+        """Number of times in a row the transformation can be applied from the state.
+
+        Returns:
+            0 if the transformation is not valid, `MAX_SENTINEL` if it can be applied
+            indefinitely.
+        """
+        world = state.world
+        return world.compiled_transformations.max_applications(
+            world.slot_from_transformation(self),
+            state.player_inventory,
+            state.zone_slot,
+            state.zones_inventories,
+        )
 
     def build(self, world: "World") -> None:
-        """Build the transformation array operations on the given world."""
-        self._build_destination_op(world)
-        self._build_inventory_ops(world)
-        self._build_zones_op(world)
+        """Build the transformation array operations on the given world.
+
+        Those are only used when no world is given, as each world
+        builds and keeps its own operations of its transformations.
+        """
+        self._operations = TransformationOperations(self, world)
+
+    def operations(self, world: Optional["World"] = None) -> "TransformationOperations":
+        """Operations of the transformation built on the given world.
+
+        Args:
+            world: World containing the transformation.
+                Defaults to None, hence the operations of the last `build`.
+
+        Raises:
+            ValueError: If no world containing the transformation is given
+                and the transformation was never built.
+        """
+        if world is not None:
+            try:
+                index = world.slot_from_transformation(self)
+            except ValueError:
+                index = None
+            if index is not None:
+                return world.transformation_operations(index)
+        if self._operations is None:
+            raise ValueError(
+                f"Transformation {self.name} is not built,"
+                " give a world containing it or call build(world) first."
+            )
+        return self._operations
 
     def get_changes(
         self, owner: InventoryOwner, operation: InventoryOperation, default: Any = None
@@ -447,168 +546,6 @@ class Transformation:
 
         return items
 
-    def _is_valid_position(self, position: np.ndarray):
-        if self._zone is not None and not np.any(np.multiply(self._zone, position)):
-            return False
-        if self._destination is not None and np.all(self._destination == position):
-            return False
-        return True
-
-    def _is_valid_inventory(
-        self,
-        inventory: np.ndarray,
-        added: Optional[np.ndarray],
-        removed: Optional[np.ndarray],
-        max_items: Optional[np.ndarray],
-        min_items: Optional[np.ndarray],
-    ):
-        added = 0 if added is None else added
-        removed = 0 if removed is None else removed
-        if max_items is not None and np.any(inventory > max_items):
-            return False
-        if min_items is not None and np.any(inventory < min_items):
-            return False
-        return True
-
-    def _is_valid_player_inventory(self, player_inventory: np.ndarray):
-        items_changes = self._inventory_operations.get(InventoryOwner.PLAYER, {})
-        added = items_changes.get(InventoryOperation.ADD, 0)
-        removed = items_changes.get(InventoryOperation.REMOVE)
-        max_items = items_changes.get(InventoryOperation.MAX)
-        min_items = items_changes.get(InventoryOperation.MIN)
-        return self._is_valid_inventory(
-            player_inventory, added, removed, max_items, min_items
-        )
-
-    def _is_valid_zones_inventory(
-        self, zones_inventories: np.ndarray, position: np.ndarray
-    ):
-        if zones_inventories.size == 0:
-            return True
-
-        # Specific zones operations
-        zones_changes = self._inventory_operations.get(InventoryOwner.ZONES, {})
-        zeros = np.zeros_like(zones_inventories)
-        added = zones_changes.get(InventoryOperation.ADD, zeros.copy())
-        removed = zones_changes.get(InventoryOperation.REMOVE, zeros.copy())
-        infs = np.inf * np.ones_like(zones_inventories)
-        max_items = zones_changes.get(InventoryOperation.MAX, infs.copy())
-        min_items = zones_changes.get(InventoryOperation.MIN, zeros.copy())
-
-        # Current zone
-        current_changes = self._inventory_operations.get(InventoryOwner.CURRENT, {})
-        current_slot = position.nonzero()[0]
-        added[current_slot] += current_changes.get(InventoryOperation.ADD, 0)
-        removed[current_slot] += current_changes.get(InventoryOperation.REMOVE, 0)
-        max_items[current_slot] = np.minimum(
-            max_items[current_slot],
-            current_changes.get(InventoryOperation.MAX, np.inf),
-        )
-        min_items[current_slot] = np.maximum(
-            min_items[current_slot],
-            current_changes.get(InventoryOperation.MIN, -np.inf),
-        )
-
-        # Destination
-        if self._destination is not None:
-            dest_changes = self._inventory_operations.get(
-                InventoryOwner.DESTINATION, {}
-            )
-            dest_slot = self._destination.nonzero()[0]
-            added[dest_slot] += dest_changes.get(InventoryOperation.ADD, 0)
-            removed[dest_slot] += dest_changes.get(InventoryOperation.REMOVE, 0)
-            max_items[dest_slot] = np.minimum(
-                max_items[dest_slot],
-                dest_changes.get(InventoryOperation.MAX, np.inf),
-            )
-            min_items[dest_slot] = np.maximum(
-                min_items[dest_slot],
-                dest_changes.get(InventoryOperation.MIN, -np.inf),
-            )
-
-        return self._is_valid_inventory(
-            zones_inventories, added, removed, max_items, min_items
-        )
-
-    def _build_destination_op(self, world: "World") -> None:
-        if self.destination is None:
-            return
-        self._destination = np.zeros(world.n_zones, dtype=np.int32)
-        self._destination[world.slot_from_zone(self.destination)] = 1
-
-    def _build_zones_op(self, world: "World") -> None:
-        if self.zone is None:
-            return
-        self._zone = np.zeros(world.n_zones, dtype=np.int32)
-        self._zone[world.slot_from_zone(self.zone)] = 1
-
-    def _build_inventory_ops(self, world: "World"):
-        self._inventory_operations = {}
-        for owner, operations in self.inventory_changes.items():
-            self._build_inventory_operation(owner, operations, world)
-        self._build_apply_operations()
-
-    def _build_inventory_operation(
-        self, owner: InventoryOwner, operations: InventoryChanges, world: "World"
-    ):
-        owner = InventoryOwner(owner)
-        if owner is InventoryOwner.PLAYER:
-            world_items_list = world.items
-        else:
-            world_items_list = world.zones_items
-
-        for operation, stacks in operations.items():
-            operation = InventoryOperation(operation)
-            default_value = 0
-            if operation is InventoryOperation.MAX:
-                default_value = np.inf
-            if owner is InventoryOwner.ZONES:
-                operation_arr = self._build_zones_items_op(
-                    stacks, world.zones, world.zones_items, default_value
-                )
-            else:
-                operation_arr = self._build_operation_array(
-                    stacks, world_items_list, default_value
-                )
-            if owner not in self._inventory_operations:
-                self._inventory_operations[owner] = {}
-            self._inventory_operations[owner][operation] = operation_arr
-
-    def _build_apply_operations(self):
-        for owner, operations in self._inventory_operations.items():
-            apply_op = InventoryOperation.APPLY
-            apply_arr = _build_apply_operation_array(operations)
-            self._inventory_operations[owner][apply_op] = apply_arr
-
-    def _build_operation_array(
-        self,
-        stacks: List[Stack],
-        world_items_list: List["Item"],
-        default_value: int = 0,
-    ) -> np.ndarray:
-        operation = default_value * np.ones(len(world_items_list), dtype=np.int32)
-        for stack in stacks:
-            item_slot = world_items_list.index(stack.item)
-            operation[item_slot] = stack.quantity
-        return operation
-
-    def _build_zones_items_op(
-        self,
-        stacks_per_zone: Dict[Zone, List["Stack"]],
-        zones: List[Zone],
-        zones_items: List["Item"],
-        default_value: float = 0.0,
-    ) -> np.ndarray:
-        operation = default_value * np.ones(
-            (len(zones), len(zones_items)), dtype=np.int32
-        )
-        for zone, stacks in stacks_per_zone.items():
-            zone_slot = zones.index(zone)
-            for stack in stacks:
-                item_slot = zones_items.index(stack.item)
-                operation[zone_slot, item_slot] = stack.quantity
-        return operation
-
     def __str__(self) -> str:
         return self.name
 
@@ -741,31 +678,427 @@ class Transformation:
         return effects_text
 
 
+class TransformationOperations:
+    """Operations of a transformation built on the slots of a given world.
+
+    A `Transformation` only holds the definition of its changes,
+    so that one list of transformations can back any number of worlds.
+    Each world builds the operations of its transformations on its own slots.
+    (See `World.transformation_operations`)
+
+    """
+
+    def __init__(self, transformation: "Transformation", world: "World") -> None:
+        """
+        Args:
+            transformation: Transformation to build the operations of.
+            world: World giving the slots of items and zones.
+        """
+        self.destination: Optional[np.ndarray] = None
+        self.destination_slot: Optional[int] = None
+        self.zone: Optional[np.ndarray] = None
+        self.zone_slot: Optional[int] = None
+        self.inventory_operations: Dict[InventoryOwner, InventoryOperations] = {}
+        self.bounded_zones: Optional[np.ndarray] = None
+        self.bounded_zones_min: Optional[np.ndarray] = None
+        self.bounded_zones_max: Optional[np.ndarray] = None
+        self.current_zone_min: Optional[np.ndarray] = None
+        self.current_zone_max: Optional[np.ndarray] = None
+        self.sparse = False
+
+        self._build_destination_op(transformation.destination, world)
+        self._build_inventory_ops(transformation.inventory_changes, world)
+        self._build_zones_op(transformation.zone, world)
+        self._build_zones_bounds(world)
+
+    def apply(
+        self,
+        player_inventory: np.ndarray,
+        position: np.ndarray,
+        zones_inventories: np.ndarray,
+        zone_slot: Optional[int] = None,
+    ) -> None:
+        """Apply the operations in place on the given state.
+
+        The slot of the current zone is read from the position if not given.
+        """
+        if zone_slot is None:
+            zone_slot = _position_slot(position)
+        for owner, operations in self.inventory_operations.items():
+            operation_arr = operations[InventoryOperation.APPLY]
+            if operation_arr is not None:
+                _update_inventory(
+                    owner,
+                    player_inventory,
+                    zone_slot,
+                    zones_inventories,
+                    self.destination_slot,
+                    operation_arr,
+                )
+        if self.destination_slot is not None:
+            if zone_slot is not None:
+                position[zone_slot] = 0
+            position[self.destination_slot] = 1
+
+    def is_valid(self, state: "HcraftState") -> bool:
+        """Are the operations valid in the given state?"""
+        zone_slot = _position_slot(state.position)
+        if not self._is_valid_zone_slot(zone_slot):
+            return False
+        if not self._is_valid_player_inventory(state.player_inventory):
+            return False
+        if not self._is_valid_zones_inventory(state.zones_inventories, zone_slot):
+            return False
+        return True
+
+    def _is_valid_zone_slot(self, zone_slot: Optional[int]):
+        if self.zone_slot is not None and zone_slot != self.zone_slot:
+            return False
+        if self.destination_slot is not None and zone_slot == self.destination_slot:
+            return False
+        return True
+
+    def _is_valid_inventory(
+        self,
+        inventory: np.ndarray,
+        max_items: Optional[np.ndarray],
+        min_items: Optional[np.ndarray],
+    ):
+        if isinstance(max_items, SparseOperationArray):
+            if max_items.any_above(inventory):
+                return False
+        elif max_items is not None and np.any(inventory > max_items):
+            return False
+        if isinstance(min_items, SparseOperationArray):
+            if min_items.any_below(inventory):
+                return False
+        elif min_items is not None and np.any(inventory < min_items):
+            return False
+        return True
+
+    def _is_valid_player_inventory(self, player_inventory: np.ndarray):
+        items_changes = self.inventory_operations.get(InventoryOwner.PLAYER, {})
+        max_items = items_changes.get(InventoryOperation.MAX)
+        min_items = items_changes.get(InventoryOperation.MIN)
+        return self._is_valid_inventory(player_inventory, max_items, min_items)
+
+    def _is_valid_zones_inventory(
+        self, zones_inventories: np.ndarray, zone_slot: Optional[int]
+    ):
+        if zones_inventories.size == 0:
+            return True
+        if self.sparse:
+            return self._is_valid_sparse_zones_inventory(zones_inventories, zone_slot)
+
+        bounded_zones = self.bounded_zones
+        zones_min, zones_max = self.bounded_zones_min, self.bounded_zones_max
+        if zones_inventories.min() < 0:
+            # Zones items that are not explicitly bounded must be non-negative.
+            unbounded = np.ones(zones_inventories.shape[0], dtype=bool)
+            unbounded[bounded_zones] = False
+            if np.any(zones_inventories[unbounded] < 0):
+                return False
+
+        if bounded_zones.shape[0] > 0:
+            bounded_inventories = zones_inventories[bounded_zones]
+            if np.any(bounded_inventories < zones_min):
+                return False
+            if np.any(bounded_inventories > zones_max):
+                return False
+
+        if zone_slot is None:
+            return True
+        current_inventory = zones_inventories[zone_slot]
+        if np.any(current_inventory < self.current_zone_min):
+            return False
+        if np.any(current_inventory > self.current_zone_max):
+            return False
+        return True
+
+    def _is_valid_sparse_zones_inventory(
+        self, zones_inventories: np.ndarray, zone_slot: Optional[int]
+    ):
+        zones_changes = self.inventory_operations.get(InventoryOwner.ZONES, {})
+        zones_min = zones_changes.get(InventoryOperation.MIN)
+        if zones_min is not None:
+            if zones_min.any_below(zones_inventories):
+                return False
+        elif zones_inventories.min() < 0:
+            # Zones items that are not explicitly bounded must be non-negative.
+            return False
+        zones_max = zones_changes.get(InventoryOperation.MAX)
+        if zones_max is not None and zones_max.any_above(zones_inventories):
+            return False
+
+        owners_slots = [
+            (CURRENT_ZONE, zone_slot),
+            (DESTINATION, self.destination_slot),
+        ]
+        for owner, zone_slot in owners_slots:
+            if zone_slot is None:
+                continue
+            owner_changes = self.inventory_operations.get(owner, {})
+            min_items = owner_changes.get(InventoryOperation.MIN)
+            max_items = owner_changes.get(InventoryOperation.MAX)
+            if not self._is_valid_inventory(
+                zones_inventories[zone_slot], max_items, min_items
+            ):
+                return False
+        return True
+
+    def _build_destination_op(self, destination: Optional[Zone], world: "World"):
+        if destination is None:
+            return
+        self.destination_slot = world.slot_from_zone(destination)
+        self.destination = np.zeros(world.n_zones, dtype=np.int32)
+        self.destination[self.destination_slot] = 1
+
+    def _build_zones_op(self, zone: Optional[Zone], world: "World") -> None:
+        if zone is None:
+            return
+        self.zone_slot = world.slot_from_zone(zone)
+        self.zone = np.zeros(world.n_zones, dtype=np.int32)
+        self.zone[self.zone_slot] = 1
+
+    def _build_zones_bounds(self, world: "World") -> None:
+        """Precompute the zones inventories bounds that do not depend on position.
+
+        Only zones with bounds stronger than the non-negative default are kept,
+        so that validity checks never build (n_zones, n_zones_items) arrays.
+        The current zone bounds are kept apart as they depend on the position.
+        """
+        if self.sparse:
+            return
+        zones_changes = self.inventory_operations.get(InventoryOwner.ZONES, {})
+        zones_min = np.zeros((world.n_zones, world.n_zones_items), dtype=np.int32)
+        zones_max = np.full_like(zones_min, MAX_SENTINEL)
+        bounded = np.zeros(world.n_zones, dtype=bool)
+        if InventoryOperation.MIN in zones_changes:
+            zones_min[...] = zones_changes[InventoryOperation.MIN]
+            bounded |= np.any(zones_min != 0, axis=1)
+        if InventoryOperation.MAX in zones_changes:
+            zones_max[...] = _sentinel_bounds(zones_changes[InventoryOperation.MAX])
+            bounded |= np.any(zones_max != MAX_SENTINEL, axis=1)
+
+        if self.destination_slot is not None:
+            dest_slot = self.destination_slot
+            dest_min, dest_max = self._owner_bounds(
+                InventoryOwner.DESTINATION, world.n_zones_items
+            )
+            zones_min[dest_slot] = np.maximum(zones_min[dest_slot], dest_min)
+            zones_max[dest_slot] = np.minimum(zones_max[dest_slot], dest_max)
+            bounded[dest_slot] = True
+
+        self.bounded_zones = np.flatnonzero(bounded)
+        self.bounded_zones_min = zones_min[self.bounded_zones]
+        self.bounded_zones_max = zones_max[self.bounded_zones]
+        self.current_zone_min, self.current_zone_max = self._owner_bounds(
+            InventoryOwner.CURRENT, world.n_zones_items
+        )
+
+    def operation_entries(
+        self, owner: InventoryOwner, operation: InventoryOperation
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Flat slots and values of an operation that differ from its default.
+
+        Bounds are converted into integer sentinel bounds.
+        """
+        operations = self.inventory_operations.get(owner, {})
+        operation_arr = operations.get(operation)
+        if operation_arr is None:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        if isinstance(operation_arr, SparseOperationArray):
+            kept = operation_arr.values != operation_arr.default
+            slots, values = operation_arr.slots[kept], operation_arr.values[kept]
+        else:
+            default = MAX_SENTINEL if operation is InventoryOperation.MAX else 0
+            flat_operation = operation_arr.reshape(-1)
+            slots = np.flatnonzero(flat_operation != default)
+            values = flat_operation[slots]
+        return slots, _sentinel_bounds(values).astype(np.int64)
+
+    def _owner_bounds(
+        self, owner: InventoryOwner, n_slots: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Min and max bounds of an owner inventory as integer sentinel arrays."""
+        changes = self.inventory_operations.get(owner, {})
+        min_bounds = np.full(n_slots, MIN_SENTINEL, dtype=np.int32)
+        max_bounds = np.full(n_slots, MAX_SENTINEL, dtype=np.int32)
+        for operation, bounds in (
+            (InventoryOperation.MIN, min_bounds),
+            (InventoryOperation.MAX, max_bounds),
+        ):
+            operation_arr = changes.get(operation)
+            if isinstance(operation_arr, SparseOperationArray):
+                operation_arr = operation_arr.toarray()
+            if operation_arr is not None:
+                bounds[...] = _sentinel_bounds(operation_arr)
+        return min_bounds, max_bounds
+
+    def _build_inventory_ops(
+        self, inventory_changes: Dict[InventoryOwner, InventoryChanges], world: "World"
+    ):
+        self.sparse = world.sparse_operations
+        self.inventory_operations = {}
+        for owner, operations in inventory_changes.items():
+            self._build_inventory_operation(owner, operations, world)
+        self._build_apply_operations()
+
+    def _build_inventory_operation(
+        self, owner: InventoryOwner, operations: InventoryChanges, world: "World"
+    ):
+        owner = InventoryOwner(owner)
+        for operation, stacks in operations.items():
+            operation = InventoryOperation(operation)
+            default_value = 0
+            if operation is InventoryOperation.MAX:
+                default_value = MAX_SENTINEL
+            if self.sparse:
+                operation_arr = self._build_sparse_operation_array(
+                    owner, stacks, world, default_value
+                )
+            elif owner is InventoryOwner.ZONES:
+                operation_arr = self._build_zones_items_op(stacks, world, default_value)
+            else:
+                operation_arr = self._build_operation_array(
+                    owner, stacks, world, default_value
+                )
+            if owner not in self.inventory_operations:
+                self.inventory_operations[owner] = {}
+            self.inventory_operations[owner][operation] = operation_arr
+
+    def _build_sparse_operation_array(
+        self,
+        owner: InventoryOwner,
+        stacks: Union[List[Stack], Dict[Zone, List[Stack]]],
+        world: "World",
+        default_value: int = 0,
+    ) -> SparseOperationArray:
+        values_per_slot: Dict[int, int] = {}
+        if owner is InventoryOwner.ZONES:
+            shape = (world.n_zones, world.n_zones_items)
+            for zone, zone_stacks in stacks.items():
+                zone_slot = world.slot_from_zone(zone)
+                for stack in zone_stacks:
+                    item_slot = world.slot_from_zoneitem(stack.item)
+                    slot = zone_slot * world.n_zones_items + item_slot
+                    values_per_slot[slot] = stack.quantity
+        else:
+            n_slots, slot_from_item = _owner_slots(owner, world)
+            shape = (n_slots,)
+            for stack in stacks:
+                values_per_slot[slot_from_item(stack.item)] = stack.quantity
+        return SparseOperationArray(
+            list(values_per_slot.keys()),
+            list(values_per_slot.values()),
+            shape=shape,
+            default=default_value,
+        )
+
+    def _build_apply_operations(self):
+        for owner, operations in self.inventory_operations.items():
+            apply_op = InventoryOperation.APPLY
+            apply_arr = _build_apply_operation_array(operations)
+            self.inventory_operations[owner][apply_op] = apply_arr
+
+    def _build_operation_array(
+        self,
+        owner: InventoryOwner,
+        stacks: List[Stack],
+        world: "World",
+        default_value: int = 0,
+    ) -> np.ndarray:
+        n_slots, slot_from_item = _owner_slots(owner, world)
+        operation = np.full(n_slots, default_value, dtype=np.int32)
+        for stack in stacks:
+            operation[slot_from_item(stack.item)] = stack.quantity
+        return operation
+
+    def _build_zones_items_op(
+        self,
+        stacks_per_zone: Dict[Zone, List["Stack"]],
+        world: "World",
+        default_value: int = 0,
+    ) -> np.ndarray:
+        operation = np.full(
+            (world.n_zones, world.n_zones_items), default_value, dtype=np.int32
+        )
+        for zone, stacks in stacks_per_zone.items():
+            zone_slot = world.slot_from_zone(zone)
+            for stack in stacks:
+                item_slot = world.slot_from_zoneitem(stack.item)
+                operation[zone_slot, item_slot] = stack.quantity
+        return operation
+
+
+def _sentinel_bounds(bounds: np.ndarray) -> np.ndarray:
+    """Clip bounds into the integer sentinel bounds."""
+    return np.clip(bounds, MIN_SENTINEL, MAX_SENTINEL).astype(np.int32)
+
+
+def _position_slot(position: Optional[np.ndarray]) -> Optional[int]:
+    """Slot of the zone in a one-hot position, None if there is none."""
+    if position is None or position.shape[0] == 0 or position.max() < 1:
+        return None
+    return int(position.argmax())
+
+
 def _update_inventory(
     owner: InventoryOwner,
     player_inventory: np.ndarray,
-    position: np.ndarray,
+    zone_slot: Optional[int],
     zones_inventories: np.ndarray,
-    destination: np.ndarray,
+    destination_slot: Optional[int],
     operation_arr: np.ndarray,
 ):
-    position_slot: int = position.nonzero()[0]
+    if isinstance(operation_arr, SparseOperationArray):
+        if owner is PLAYER:
+            operation_arr.add_to(player_inventory)
+        elif owner is CURRENT_ZONE:
+            operation_arr.add_to(zones_inventories[zone_slot])
+        elif owner is DESTINATION:
+            operation_arr.add_to(zones_inventories[destination_slot])
+        elif owner is InventoryOwner.ZONES:
+            operation_arr.add_to(zones_inventories)
+        else:
+            raise NotImplementedError
+        return
     if owner is PLAYER:
-        player_inventory[...] += operation_arr
+        _add_to_inventory(player_inventory, ..., operation_arr)
     elif owner is CURRENT_ZONE:
-        zones_inventories[position_slot, :] += operation_arr
+        _add_to_inventory(zones_inventories, zone_slot, operation_arr)
     elif owner is DESTINATION:
-        destination_slot: int = destination.nonzero()[0]
-        zones_inventories[destination_slot, :] += operation_arr
+        _add_to_inventory(zones_inventories, destination_slot, operation_arr)
     elif owner is InventoryOwner.ZONES:
-        zones_inventories[...] += operation_arr
+        _add_to_inventory(zones_inventories, ..., operation_arr)
     else:
         raise NotImplementedError
 
 
+def _add_to_inventory(inventory: np.ndarray, index: Any, changes: np.ndarray) -> None:
+    """Add changes in place to `inventory[index]`.
+
+    Inventories with a dtype smaller than int32 saturate at the dtype bounds
+    instead of wrapping around.
+    """
+    if inventory.dtype.itemsize >= 4:
+        inventory[index] += changes
+        return
+    bounds = np.iinfo(inventory.dtype)
+    inventory[index] = np.clip(
+        inventory[index].astype(np.int32) + changes, bounds.min, bounds.max
+    )
+
+
 def _build_apply_operation_array(
     operations: InventoryOperations,
-) -> Optional[np.ndarray]:
+) -> Optional[Union[np.ndarray, SparseOperationArray]]:
+    added = operations.get(InventoryOperation.ADD)
+    removed = operations.get(InventoryOperation.REMOVE)
+    if isinstance(added, SparseOperationArray) or isinstance(
+        removed, SparseOperationArray
+    ):
+        return _build_sparse_apply_operation_array(added, removed)
     apply_operation = None
     if InventoryOperation.ADD in operations:
         add_op = operations[InventoryOperation.ADD]
@@ -780,6 +1113,30 @@ def _build_apply_operation_array(
     return apply_operation
 
 
+def _owner_slots(
+    owner: InventoryOwner, world: "World"
+) -> Tuple[int, Callable[[Item], int]]:
+    """Number of slots and slot lookup of the items of an owner's inventory."""
+    if owner is InventoryOwner.PLAYER:
+        return world.n_items, world.slot_from_item
+    return world.n_zones_items, world.slot_from_zoneitem
+
+
+def _build_sparse_apply_operation_array(
+    added: Optional[SparseOperationArray], removed: Optional[SparseOperationArray]
+) -> SparseOperationArray:
+    values_per_slot: Dict[int, int] = {}
+    for operation, sign in ((added, 1), (removed, -1)):
+        if operation is None:
+            continue
+        shape = operation.shape
+        for slot, value in zip(operation.slots, operation.values):
+            values_per_slot[slot] = values_per_slot.get(slot, 0) + sign * value
+    slots = [slot for slot, value in values_per_slot.items() if value != 0]
+    values = [values_per_slot[slot] for slot in slots]
+    return SparseOperationArray(slots, values, shape=shape)
+
+
 def _stacks_effects_str(
     stacks: Optional[List["Stack"]],
     prefix: str = "",
@@ -848,11 +1205,11 @@ def _append_changes(
             dict_of_changes[owner][operation][zone] = []
         dict_of_changes[owner][operation][zone].append(stack)
 
-    if change.min > -np.inf:
+    if change.min > MIN_SENTINEL:
         min_stack = Stack(change.item, change.min)
         _append_stack(InventoryOperation.MIN, min_stack)
 
-    if change.max < np.inf:
+    if change.max < MAX_SENTINEL:
         max_stack = Stack(change.item, change.max)
         _append_stack(InventoryOperation.MAX, max_stack)
 
@@ -0,0 +1,435 @@
+"""# Vectorized environments
+
+HierarchyCraft environments can be stepped by batches using `HcraftVectorEnv`,
+a gymnasium `VectorEnv` running all environments at once on a
+`hcraft.state.BatchedHcraftState` instead of looping over `HcraftEnv` instances.
+
+Every gymnasium environment of `hcraft.examples` is registered with a vector entry point,
+so `gymnasium.make_vec` builds a `HcraftVectorEnv` by default:
+
+```python
+import gymnasium as gym
+
+envs = gym.make_vec("MineHcraft-v1", num_envs=1024)
+observations, infos = envs.reset()
+actions = envs.action_space.sample()
+observations, rewards, terminated, truncated, infos = envs.step(actions)
+```
+
+An `HcraftVectorEnv` can also be built from any `HcraftEnv`:
+
+```python
+from hcraft.examples import MineHcraftEnv
+from hcraft.vector_env import HcraftVectorEnv
+
+envs = HcraftVectorEnv(MineHcraftEnv(max_step=100), num_envs=1024)
+```
+
+To use multiple cores, `SharedMemoryHcraftVectorEnv` splits the batch between
+worker processes sharing their states, actions and rewards through shared memory.
+It is also built by `gymnasium.make_vec` when giving a number of workers:
+
+```python
+envs = gym.make_vec("MineHcraft-Diamond-v1", num_envs=1024, num_workers=4)
+```
+
+Finished environments are reset on the following step (`AutoresetMode.NEXT_STEP`),
+where their action is ignored and a reward of 0 is given.
+
+"""
+
+import multiprocessing
+import weakref
+from functools import partial
+from multiprocessing.shared_memory import SharedMemory
+from threading import BrokenBarrierError
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Gym is an optional dependency, required by vectorized environments.
+try:
+    from gymnasium.envs.registration import load_env_creator
+    from gymnasium.vector import AutoresetMode, VectorEnv
+    from gymnasium.vector.utils import batch_space
+except ImportError as error:
+    raise ImportError(
+        "Missing import for vectorized environments. "
+        "Install using 'pip install hcraft[gym]'."
+    ) from error
+
+from hcraft.state import BatchedHcraftState
+
+if TYPE_CHECKING:
+    from hcraft.env import HcraftEnv
+
+
+class HcraftVectorEnv(VectorEnv):
+    """Batch of HierarchyCraft environments stepped all at once."""
+
+    metadata = {"autoreset_mode": AutoresetMode.NEXT_STEP}
+
+    def __init__(self, env: "HcraftEnv", num_envs: int) -> None:
+        """
+        Args:
+            env: Environment to replicate, giving the world, purpose,
+                invalid reward and maximum number of steps of all environments.
+            num_envs: Number of environments in the batch.
+        """
+        self.env = env
+        self.world = env.world
+        self.purpose = env.purpose
+        self.invalid_reward = env.invalid_reward
+        self.max_step = env.max_step
+        self.name = env.name
+        self.num_envs = num_envs
+
+        self.single_observation_space = env.observation_space
+        self.single_action_space = env.action_space
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+
+        self.purpose.build(env)
+        self.state = BatchedHcraftState(self.world, num_envs)
+        self.current_steps = np.zeros(num_envs, dtype=np.int64)
+        self.tasks_terminated = np.zeros(
+            (num_envs, len(self.purpose.tasks)), dtype=bool
+        )
+        self._autoreset = np.zeros(num_envs, dtype=bool)
+
+    def action_masks(self) -> np.ndarray:
+        """Return boolean mask of valid actions of shape (num_envs, n_actions)."""
+        return self.state.legal_actions
+
+    def step(
+        self, actions: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, Dict[str, Any]]:
+        """Perform one step in every environment given the index of wanted transformations.
+
+        Like in `HcraftEnv.step`, valid transformations update the state and are rewarded
+        by the purpose while invalid ones give the `invalid_reward`.
+        Environments that were done at the previous step are reset instead.
+
+        """
+        actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+        resetting = self._autoreset.copy()
+        stepping = ~resetting
+        if resetting.any():
+            self._reset_envs(resetting)
+
+        self.current_steps[stepping] += 1
+        success = self.state.apply(actions, mask=stepping)
+        purpose_rewards, terminated = self.purpose.batched_step(
+            self.state, self.tasks_terminated
+        )
+        self.tasks_terminated[resetting] = False
+
+        rewards = np.where(success, purpose_rewards, self.invalid_reward)
+        rewards[resetting] = 0.0
+        terminated &= stepping
+        truncated = np.zeros(self.num_envs, dtype=bool)
+        if self.max_step is not None:
+            truncated = stepping & (self.current_steps >= self.max_step)
+        self._autoreset = terminated | truncated
+        return self.state.observations, rewards, terminated, truncated, self.infos()
+
+    def reset(
+        self,
+        *,
+        seed: Optional[int] = None,
+        options: Optional[dict] = None,
+    ) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """Resets the state of every environment.
+
+        Returns:
+            (np.ndarray): The first observations.
+        """
+        super().reset(seed=seed, options=options)
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self.state.observations, self.infos()
+
+    def infos(self) -> Dict[str, Any]:
+        return {
+            "action_is_legal": self.action_masks(),
+            "_action_is_legal": np.ones(self.num_envs, dtype=bool),
+        }
+
+    def _reset_envs(self, mask: np.ndarray) -> None:
+        self.state.reset(mask)
+        self.current_steps[mask] = 0
+        self.tasks_terminated[mask] = False
+        self._autoreset[mask] = False
+
+
+class SharedArrays:
+    """Named numpy arrays laid out in a single shared memory block."""
+
+    def __init__(
+        self,
+        specs: Dict[str, Tuple[Tuple[int, ...], np.dtype]],
+        name: Optional[str] = None,
+    ) -> None:
+        """
+        Args:
+            specs: Shape and dtype of each array.
+            name: Name of an existing shared memory block to attach to.
+                Defaults to None, hence creating a new block.
+        """
+        self.specs = specs
+        offsets, size = {}, 0
+        for array_name, (shape, dtype) in specs.items():
+            dtype = np.dtype(dtype)
+            size = -(-size // dtype.alignment) * dtype.alignment
+            offsets[array_name] = size
+            size += int(np.prod(shape)) * dtype.itemsize
+        self.shared_memory = SharedMemory(name=name, create=name is None, size=size)
+        self.arrays = {
+            array_name: np.ndarray(
+                shape, dtype=dtype, buffer=self.shared_memory.buf, offset=offset
+            )
+            for (array_name, (shape, dtype)), offset in zip(
+                specs.items(), offsets.values()
+            )
+        }
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory block."""
+        return self.shared_memory.name
+
+    def __getitem__(self, array_name: str) -> np.ndarray:
+        return self.arrays[array_name]
+
+    def close(self, unlink: bool = False) -> None:
+        """Release the arrays and close the shared memory block.
+
+        Args:
+            unlink: Whether to also destroy the block, must be done by its creator.
+        """
+        self.arrays = {}
+        self.shared_memory.close()
+        if unlink:
+            self.shared_memory.unlink()
+
+
+_STEP, _RESET, _CLOSE = 0, 1, 2
+
+
+class SharedMemoryHcraftVectorEnv(VectorEnv):
+    """Batch of HierarchyCraft environments split between worker processes.
+
+    Each worker owns a contiguous slice of the batch and steps it with a
+    `HcraftVectorEnv` whose state arrays live in shared memory.
+    Actions, observations, rewards, terminations and action masks are also
+    shared arrays, so workers are only signalled through barriers on each step.
+
+    """
+
+    metadata = {"autoreset_mode": AutoresetMode.NEXT_STEP}
+
+    def __init__(
+        self,
+        env: "HcraftEnv",
+        num_envs: int,
+        num_workers: Optional[int] = None,
+        context: Optional[str] = None,
+    ) -> None:
+        """
+        Args:
+            env: Environment to replicate, giving the world, purpose,
+                invalid reward and maximum number of steps of all environments.
+            num_envs: Number of environments in the batch.
+            num_workers: Number of worker processes.
+                Defaults to the number of available cores, at most num_envs.
+            context: Multiprocessing start method. Defaults to the platform default.
+        """
+        if num_workers is None:
+            num_workers = multiprocessing.cpu_count()
+        num_workers = max(1, min(num_workers, num_envs))
+        self.env = env
+        self.world = env.world
+        self.num_envs = num_envs
+        self.num_workers = num_workers
+
+        self.single_observation_space = env.observation_space
+        self.single_action_space = env.action_space
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+
+        world = env.world
+        n_observations = world.n_items + world.n_zones + world.n_zones_items
+        self._specs = {
+            "command": ((1,), np.int64),
+            "actions": ((num_envs,), np.int64),
+            "rewards": ((num_envs,), np.float64),
+            "terminated": ((num_envs,), np.bool_),
+            "truncated": ((num_envs,), np.bool_),
+            "observations": ((num_envs, n_observations), world.inventory_dtype),
+            "action_is_legal": ((num_envs, len(world.transformations)), np.bool_),
+            "player_inventories": ((num_envs, world.n_items), world.inventory_dtype),
+            "positions": ((num_envs,), np.int64),
+            "zones_inventories": (
+                (num_envs, world.n_zones, world.n_zones_items),
+                world.inventory_dtype,
+            ),
+        }
+        self.buffers = SharedArrays(self._specs)
+
+        bounds = np.linspace(0, num_envs, num_workers + 1).astype(int)
+        self.slices = [slice(start, stop) for start, stop in zip(bounds, bounds[1:])]
+        ctx = multiprocessing.get_context(context)
+        self._barrier = ctx.Barrier(num_workers + 1)
+        self._workers: List[multiprocessing.Process] = []
+        for worker_slice in self.slices:
+            worker = ctx.Process(
+                target=_shared_memory_worker,
+                args=(env, worker_slice, self.buffers.name, self._specs, self._barrier),
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append(worker)
+        # Workers and shared memory are also released if the env is never closed.
+        self._finalizer = weakref.finalize(
+            self, _close_workers, self._workers, self.buffers, self._barrier
+        )
+
+    def action_masks(self) -> np.ndarray:
+        """Return boolean mask of valid actions of shape (num_envs, n_actions)."""
+        return self.buffers["action_is_legal"].copy()
+
+    def step(
+        self, actions: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, Dict[str, Any]]:
+        """Perform one step in every environment, see `HcraftVectorEnv.step`."""
+        self.buffers["actions"][...] = np.asarray(actions).reshape(self.num_envs)
+        self._run(_STEP)
+        return (
+            self.buffers["observations"].copy(),
+            self.buffers["rewards"].copy(),
+            self.buffers["terminated"].copy(),
+            self.buffers["truncated"].copy(),
+            self.infos(),
+        )
+
+    def reset(
+        self,
+        *,
+        seed: Optional[int] = None,
+        options: Optional[dict] = None,
+    ) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """Resets the state of every environment.
+
+        Returns:
+            (np.ndarray): The first observations.
+        """
+        super().reset(seed=seed, options=options)
+        self._run(_RESET)
+        return self.buffers["observations"].copy(), self.infos()
+
+    def infos(self) -> Dict[str, Any]:
+        return {
+            "action_is_legal": self.action_masks(),
+            "_action_is_legal": np.ones(self.num_envs, dtype=bool),
+        }
+
+    def close_extras(self, **kwargs: Any) -> None:
+        """Stop the workers and release the shared memory."""
+        self._finalizer()
+
+    def _run(self, command: int) -> None:
+        self.buffers["command"][0] = command
+        try:
+            self._barrier.wait()  # Start
+            self._barrier.wait()  # Done
+        except BrokenBarrierError as error:
+            raise RuntimeError("A worker of the vector environment failed.") from error
+
+
+def _close_workers(
+    workers: List[multiprocessing.Process],
+    buffers: SharedArrays,
+    barrier: "multiprocessing.synchronize.Barrier",
+) -> None:
+    """Stop the workers of a SharedMemoryHcraftVectorEnv and destroy its buffers."""
+    if any(worker.is_alive() for worker in workers):
+        try:
+            buffers["command"][0] = _CLOSE
+            barrier.wait(timeout=10)
+        except BrokenBarrierError:
+            pass
+    for worker in workers:
+        worker.join(timeout=10)
+        if worker.is_alive():
+            worker.terminate()
+    buffers.close(unlink=True)
+
+
+def _shared_memory_worker(
+    env: "HcraftEnv",
+    worker_slice: slice,
+    buffers_name: str,
+    specs: Dict[str, Tuple[Tuple[int, ...], np.dtype]],
+    barrier: "multiprocessing.synchronize.Barrier",
+) -> None:
+    buffers = SharedArrays(specs, name=buffers_name)
+    vector_env = HcraftVectorEnv(env, worker_slice.stop - worker_slice.start)
+    state = vector_env.state
+    state.player_inventories = buffers["player_inventories"][worker_slice]
+    state.positions = buffers["positions"][worker_slice]
+    state.zones_inventories = buffers["zones_inventories"][worker_slice]
+    try:
+        while True:
+            barrier.wait()
+            command = buffers["command"][0]
+            if command == _CLOSE:
+                break
+            if command == _RESET:
+                observations, infos = vector_env.reset()
+            else:
+                actions = buffers["actions"][worker_slice]
+                observations, rewards, terminated, truncated, infos = vector_env.step(
+                    actions
+                )
+                buffers["rewards"][worker_slice] = rewards
+                buffers["terminated"][worker_slice] = terminated
+                buffers["truncated"][worker_slice] = truncated
+            buffers["observations"][worker_slice] = observations
+            buffers["action_is_legal"][worker_slice] = infos["action_is_legal"]
+            barrier.wait()
+    except Exception:
+        barrier.abort()
+        raise
+    finally:
+        del state, vector_env
+        buffers.close()
+
+
+def make_vector_env(
+    env_entry_point: str,
+    num_envs: int = 1,
+    num_workers: Optional[int] = None,
+    **kwargs: Any,
+) -> VectorEnv:
+    """Build a HcraftVectorEnv from the entry point of an HcraftEnv.
+
+    Args:
+        env_entry_point: Entry point of the HcraftEnv, as given to `gymnasium.register`.
+        num_envs: Number of environments in the batch.
+        num_workers: Number of worker processes. If given, builds a
+            SharedMemoryHcraftVectorEnv instead. Defaults to None.
+        **kwargs: Keyword arguments of the HcraftEnv.
+    """
+    env_creator = load_env_creator(env_entry_point)
+    env = env_creator(**kwargs)
+    if num_workers is not None:
+        return SharedMemoryHcraftVectorEnv(env, num_envs, num_workers=num_workers)
+    return HcraftVectorEnv(env, num_envs)
+
+
+def vector_entry_point(env_entry_point: str) -> Callable[..., VectorEnv]:
+    """Vector entry point to give to `gymnasium.register` for the given HcraftEnv.
+
+    Args:
+        env_entry_point: Entry point of the HcraftEnv, as given to `gymnasium.register`.
+    """
+    return partial(make_vector_env, env_entry_point)
@@ -34,14 +34,29 @@ world = world_from_transformations(
 
 """
 
+from copy import copy
 from dataclasses import dataclass, field
 from functools import partial
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple, Union
+from typing import TYPE_CHECKING, Dict, Hashable, List, Optional, Set, Tuple, Union
 
+import numpy as np
+
+from hcraft.compiled import CompiledTransformations, CompiledWorld, compile_world
 from hcraft.elements import Item, Stack, Zone
 from hcraft.requirements import RequirementNode, Requirements, req_node_name
-from hcraft.transformation import Transformation, InventoryOwner
+from hcraft.transformation import (
+    InventoryOwner,
+    Transformation,
+    TransformationOperations,
+)
+
+if TYPE_CHECKING:
+    from numpy.typing import DTypeLike
+
+
+SPARSE_OPERATIONS_MIN_SLOTS = 4096
+"""Number of inventory slots from which transformations use sparse operations."""
 
 
 def _default_resources_path() -> Path:
@@ -55,6 +70,14 @@ class World:
 
     Elements are items, zones, zones_items and transformations
     Also contain optional start_zone, start_items and start_zones_items.
+
+    Transformations operations are stored as sparse arrays if `sparse_operations`,
+    by default when the world has at least `SPARSE_OPERATIONS_MIN_SLOTS`
+    player and zones inventories slots.
+
+    Inventories are stored with the integer `inventory_dtype`, int32 by default.
+    Compact dtypes like uint8 or int16 save memory on stored states,
+    and saturate at their bounds when transformations are applied.
     """
 
     items: List[Item]
@@ -68,9 +91,14 @@ class World:
 
     resources_path: str = field(default_factory=_default_resources_path)
     order_world: bool = False
+    sparse_operations: Optional[bool] = None
+    inventory_dtype: "DTypeLike" = np.int32
 
     def __post_init__(self):
+        self.inventory_dtype = _integer_dtype(self.inventory_dtype)
         self._requirements = None
+        self._compiled_world: Optional[CompiledWorld] = None
+        self._compiled_transformations = None
 
         if self.order_world:
             item_rank = partial(
@@ -88,8 +116,19 @@ class World:
             )
             self.zones.sort(key=zone_rank)
 
-        for transfo in self.transformations:
-            transfo.build(self)
+        self._items_slots = _slots_index(self.items)
+        self._zones_slots = _slots_index(self.zones)
+        self._zones_items_slots = _slots_index(self.zones_items)
+        self._transformations_slots = _slots_index(self.transformations)
+
+        if self.sparse_operations is None:
+            n_slots = self.n_items + self.n_zones * self.n_zones_items
+            self.sparse_operations = n_slots >= SPARSE_OPERATIONS_MIN_SLOTS
+
+        # Operations are built on demand so that transformations stay definitions.
+        self._transformations_operations: List[Optional[TransformationOperations]] = [
+            None
+        ] * len(self.transformations)
 
     @property
     def n_items(self) -> int:
@@ -117,17 +156,124 @@ class World:
             self._requirements = Requirements(self)
         return self._requirements
 
+    @property
+    def compiled_transformations(self) -> CompiledTransformations:
+        """All transformations compiled into stacked arrays for vectorized checks.
+
+        See `hcraft.compiled` for more details.
+
+        """
+        if self._compiled_transformations is None:
+            self._compiled_transformations = CompiledTransformations(self.compile())
+        return self._compiled_transformations
+
+    def transformation_operations(self, index: int) -> TransformationOperations:
+        """Operations of the transformation of the given index built on this world.
+
+        Transformations themselves are never modified by worlds,
+        so the same transformations can be used by many worlds at once.
+
+        """
+        operations = self._transformations_operations[index]
+        if operations is None:
+            operations = TransformationOperations(self.transformations[index], self)
+            self._transformations_operations[index] = operations
+        return operations
+
+    def compile(self) -> CompiledWorld:
+        """Compile all transformations into flat arrays, only once.
+
+        See `hcraft.compiled.CompiledWorld` for more details.
+
+        """
+        if self._compiled_world is None:
+            self._compiled_world = compile_world(self)
+        return self._compiled_world
+
+    def attach_compiled(self, compiled_world: CompiledWorld) -> None:
+        """Use an already compiled world, for example loaded from a file,
+        instead of compiling transformations again.
+
+        Raises:
+            ValueError: If the compiled world does not match the world sizes.
+        """
+        sizes = {
+            "n_items": self.n_items,
+            "n_zones": self.n_zones,
+            "n_zones_items": self.n_zones_items,
+            "n_transformations": len(self.transformations),
+        }
+        for name, size in sizes.items():
+            if compiled_world.sizes[name] != size:
+                raise ValueError(
+                    f"Compiled world has {name}={compiled_world.sizes[name]}"
+                    f" but world has {name}={size}"
+                )
+        self._compiled_world = compiled_world
+        self._compiled_transformations = None
+
+    def with_inventory_dtype(self, inventory_dtype: "DTypeLike") -> "World":
+        """Copy of the world storing inventories with the given dtype.
+
+        The copy shares elements, transformations and the compiled world,
+        the world itself is left unchanged.
+
+        Raises:
+            ValueError: If the dtype is not an integer dtype, or if it is unsigned
+                while transformations can make inventories negative.
+        """
+        inventory_dtype = _integer_dtype(inventory_dtype)
+        if (
+            not np.issubdtype(inventory_dtype, np.signedinteger)
+            and not self.compiled_transformations.keeps_non_negative
+        ):
+            raise ValueError(
+                f"Unsigned inventory dtype {inventory_dtype} would clamp"
+                " negative inventories to 0, but transformations of this world"
+                " can make inventories negative."
+            )
+        world = copy(self)
+        world.inventory_dtype = inventory_dtype
+        return world
+
+    def __getstate__(self) -> dict:
+        # Compiled transformations are rebuilt from the compact compiled world
+        # and transformations operations only if needed.
+        state = self.__dict__.copy()
+        state["_compiled_transformations"] = None
+        state["_transformations_operations"] = [None] * len(self.transformations)
+        return state
+
     def slot_from_item(self, item: Item) -> int:
         """Item's slot in the world"""
-        return self.items.index(item)
+        return _slot(self._items_slots, item, "items")
 
     def slot_from_zone(self, zone: Zone) -> int:
         """Zone's slot in the world"""
-        return self.zones.index(zone)
+        return _slot(self._zones_slots, zone, "zones")
 
     def slot_from_zoneitem(self, zone: Zone) -> int:
         """Item's slot in the world as a zone item."""
-        return self.zones_items.index(zone)
+        return _slot(self._zones_items_slots, zone, "zones_items")
+
+    def slot_from_transformation(self, transformation: "Transformation") -> int:
+        """Transformation's slot in the world, which is its action index."""
+        return _slot(self._transformations_slots, transformation, "transformations")
+
+
+def _slots_index(elements: List[Hashable]) -> Dict[Hashable, int]:
+    """Slot of each element, the first one if repeated like `list.index`."""
+    slots = {}
+    for slot, element in enumerate(elements):
+        slots.setdefault(element, slot)
+    return slots
+
+
+def _slot(slots: Dict[Hashable, int], element: Hashable, name: str) -> int:
+    try:
+        return slots[element]
+    except KeyError:
+        raise ValueError(f"{element} is not in world {name}") from None
 
 
 def world_from_transformations(
@@ -136,6 +282,7 @@ def world_from_transformations(
     start_items: Optional[List[Union[Stack, Item]]] = None,
     start_zones_items: Optional[Dict[Zone, List[Union[Stack, Item]]]] = None,
     order_world: bool = True,
+    inventory_dtype: "DTypeLike" = np.int32,
 ) -> World:
     """Reads the transformation to build the list of items, zones and zones_items
     composing the world."""
@@ -167,9 +314,17 @@ def world_from_transformations(
         start_items=start_items,
         start_zones_items=start_zones_items,
         order_world=order_world,
+        inventory_dtype=inventory_dtype,
     )
 
 
+def _integer_dtype(dtype: "DTypeLike") -> np.dtype:
+    dtype = np.dtype(dtype)
+    if not np.issubdtype(dtype, np.integer):
+        raise ValueError(f"Inventory dtype must be an integer dtype, got {dtype}")
+    return dtype
+
+
 def _start_elements(
     start_zone: Optional[Zone],
     start_items: List[Union[Stack, Item]],
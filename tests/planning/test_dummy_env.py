@@ -26,3 +26,24 @@ def test_hcraft_classic():
         "4_craft_table(other_zone)",
     ]
     assert expected_plan == [str(action) for action in problem.plan.actions]
+
+
+@pytest.mark.slow
+def test_hcraft_classic_plan_in_one_sequence():
+    pytest.importorskip("unified_planning")
+    env, _, named_transformations, start_zone, items, zones, zones_items = classic_env()
+
+    task = PlaceItemTask(Stack(Item("table"), 1), Zone("other_zone"))
+    env.purpose = Purpose(task)
+
+    problem = env.planning_problem(planner_name="aries")
+    env.reset()
+
+    actions = problem.actions_from_plan(env.state)
+    assert actions == [1, 0, 3, 4]
+    assert problem.plan is None
+
+    _observation, _reward, terminated, _truncated, infos = env.step_sequence(actions)
+    assert terminated
+    assert infos["n_steps"] == len(actions)
+    assert env.purpose.terminated
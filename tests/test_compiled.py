@@ -0,0 +1,288 @@
+import pickle
+from copy import deepcopy
+
+import numpy as np
+import pytest
+import pytest_check as check
+
+from hcraft.compiled import CompiledTransformations, CompiledWorld
+from hcraft.elements import Item, Zone
+from hcraft.env import HcraftEnv
+from hcraft.examples import EXAMPLE_ENVS, MineHcraftEnv
+from hcraft.state import HcraftState
+from hcraft.transformation import (
+    CURRENT_ZONE,
+    DESTINATION,
+    PLAYER,
+    Transformation,
+    Use,
+    Yield,
+)
+from hcraft.world import SPARSE_OPERATIONS_MIN_SLOTS, World, world_from_transformations
+from tests.custom_checks import check_np_equal
+
+
+def _reference_mask(state: HcraftState) -> np.ndarray:
+    return np.array([t.is_valid(state) for t in state.world.transformations], int)
+
+
+@pytest.mark.parametrize("env_class", EXAMPLE_ENVS)
+def test_valid_mask_matches_transformations(env_class):
+    env: HcraftEnv = env_class(max_step=50)
+    compiled = env.world.compiled_transformations
+    env.reset()
+    rng = np.random.default_rng(42)
+    done = False
+    while not done:
+        expected_mask = _reference_mask(env.state)
+        check_np_equal(compiled.valid_mask(env.state).astype(int), expected_mask)
+        for action, expected in enumerate(expected_mask):
+            check.equal(compiled.is_valid(action, env.state), bool(expected))
+        action = rng.choice(np.flatnonzero(expected_mask))
+        _obs, _reward, terminated, truncated, _infos = env.step(action)
+        done = terminated or truncated
+
+
+@pytest.mark.parametrize("env_class", EXAMPLE_ENVS)
+def test_incremental_legal_actions_match_full_mask(env_class):
+    env: HcraftEnv = env_class(max_step=50)
+    compiled = env.world.compiled_transformations
+    env.reset()
+    rng = np.random.default_rng(0)
+    done = False
+    while not done:
+        legal_actions = env.state.legal_actions.astype(int)
+        check_np_equal(legal_actions, compiled.valid_mask(env.state).astype(int))
+        action = rng.choice(np.flatnonzero(legal_actions))
+        _obs, _reward, terminated, truncated, _infos = env.step(action)
+        done = terminated or truncated
+
+
+def test_legal_actions_follow_direct_writes():
+    env = MineHcraftEnv(max_step=10)
+    compiled = env.world.compiled_transformations
+    env.reset()
+    check.is_true(compiled.keeps_non_negative)
+    env.state.player_inventory[...] = 5
+    expected_mask = _reference_mask(env.state)
+    check_np_equal(env.state.legal_actions.astype(int), expected_mask)
+    check_np_equal(env.action_masks().astype(int), expected_mask)
+
+    env.step(int(np.flatnonzero(expected_mask)[0]))
+    expected_mask = _reference_mask(env.state)
+    check_np_equal(env.state.legal_actions.astype(int), expected_mask)
+    check_np_equal(compiled.valid_mask(env.state).astype(int), expected_mask)
+
+
+@pytest.mark.parametrize("env_class", EXAMPLE_ENVS)
+def test_unaffected_transformations_keep_validity(env_class):
+    env: HcraftEnv = env_class(max_step=30)
+    compiled = env.world.compiled_transformations
+    if not compiled.keeps_non_negative:
+        pytest.skip("Dependency index only holds for non-negative inventories.")
+    env.reset()
+    rng = np.random.default_rng(1)
+    done = False
+    while not done:
+        mask_before = compiled.valid_mask(env.state)
+        action = rng.choice(np.flatnonzero(mask_before))
+        previous_zone = env.state.zone_slot
+        _obs, _reward, terminated, truncated, _infos = env.step(action)
+        changed = np.flatnonzero(mask_before != compiled.valid_mask(env.state))
+        affected = compiled.affected_transformations(action, previous_zone)
+        check.is_true(np.all(np.isin(changed, affected)))
+        done = terminated or truncated
+
+
+@pytest.mark.parametrize("env_class", EXAMPLE_ENVS)
+def test_zone_candidates_cover_valid_transformations(env_class):
+    env: HcraftEnv = env_class(max_step=30)
+    world = env.world
+    compiled = world.compiled_transformations
+    if world.n_zones == 0:
+        pytest.skip("No zone to restrict transformations to.")
+    for zone_slot in range(world.n_zones):
+        candidates = compiled.zone_candidates(zone_slot)
+        excluded = np.setdiff1d(np.arange(len(world.transformations)), candidates)
+        check.is_true(np.all(compiled.zone[excluded] != zone_slot))
+        check.is_true(np.all(compiled.zone[excluded] != -1))
+
+    env.reset()
+    rng = np.random.default_rng(2)
+    states, done = [], False
+    while not done:
+        states.append(deepcopy(env.state))
+        action = rng.choice(np.flatnonzero(_reference_mask(env.state)))
+        _obs, _reward, terminated, truncated, _infos = env.step(action)
+        done = terminated or truncated
+    for state in states:
+        # Spread states over zones, including ones they could not reach.
+        state.position[...] = 0
+        state.position[rng.integers(world.n_zones)] = 1
+    batched_mask = compiled.batched_valid_mask(
+        np.stack([state.player_inventory for state in states]),
+        np.array([state.zone_slot for state in states]),
+        np.stack([state.zones_inventories for state in states]),
+    )
+    for state, mask in zip(states, batched_mask):
+        check_np_equal(mask.astype(int), _reference_mask(state))
+        check_np_equal(compiled.valid_mask(state).astype(int), _reference_mask(state))
+
+
+@pytest.mark.parametrize("env_class", EXAMPLE_ENVS)
+def test_compiled_world_is_shareable(env_class, tmp_path):
+    env: HcraftEnv = env_class(max_step=30)
+    compiled_world = env.world.compile()
+    check.is_false(compiled_world["zone"].flags.writeable)
+
+    unpickled = pickle.loads(pickle.dumps(compiled_world))
+    compiled_world.save(tmp_path / "world.npy")
+    loaded = CompiledWorld.load(tmp_path / "world.npy")
+    check.is_instance(loaded.buffer, np.memmap)
+    check.equal(loaded.sizes, compiled_world.sizes)
+
+    env.reset()
+    rng = np.random.default_rng(3)
+    done = False
+    while not done:
+        expected_mask = _reference_mask(env.state)
+        for shared_world in (unpickled, loaded):
+            compiled = CompiledTransformations(shared_world)
+            check_np_equal(compiled.valid_mask(env.state).astype(int), expected_mask)
+            check.equal(
+                compiled.state_hash(
+                    env.state.player_inventory,
+                    env.state.zone_slot,
+                    env.state.zones_inventories,
+                ),
+                env.state.hash,
+            )
+        action = rng.choice(np.flatnonzero(expected_mask))
+        _obs, _reward, terminated, truncated, _infos = env.step(action)
+        done = terminated or truncated
+
+
+def test_attach_compiled_checks_world_sizes():
+    zones, item = [Zone("0"), Zone("1")], Item("item")
+    transformations = [
+        Transformation(inventory_changes=[Yield(PLAYER, item)], zone=zones[0]),
+        Transformation(destination=zones[1]),
+    ]
+    world = world_from_transformations(transformations, start_zone=zones[0])
+    other_world = world_from_transformations(
+        [Transformation(destination=zones[1])], start_zone=zones[0]
+    )
+    compiled_world = deepcopy(world.compile())
+    world.attach_compiled(compiled_world)
+    check.is_(world.compiled_transformations.compiled_world, compiled_world)
+    with pytest.raises(ValueError):
+        world.attach_compiled(other_world.compile())
+
+
+class TestCompiledEdgeCases:
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        self.zones = [Zone("0"), Zone("1"), Zone("2")]
+        self.wood = Item("wood")
+        self.dirt = Item("dirt")
+        self.transformations = [
+            Transformation(destination=self.zones[1], zone=self.zones[0]),
+            Transformation(
+                inventory_changes=[
+                    Use(PLAYER, self.wood, consume=2, min=1),
+                    Yield(PLAYER, self.dirt, max=1),
+                ]
+            ),
+            Transformation(
+                inventory_changes=[
+                    Use(CURRENT_ZONE, self.dirt, consume=1),
+                    Yield(DESTINATION, self.dirt, max=0),
+                ],
+                destination=self.zones[2],
+            ),
+            Transformation(
+                inventory_changes=[
+                    Use(self.zones[2], self.dirt, consume=1),
+                    Yield(self.zones[1], self.wood, max=2),
+                ],
+            ),
+        ]
+        self.world = world_from_transformations(
+            self.transformations, start_zone=self.zones[0]
+        )
+        self.state = HcraftState(self.world)
+
+    def test_random_states(self):
+        rng = np.random.default_rng(0)
+        compiled = self.world.compiled_transformations
+        for _ in range(200):
+            self.state.player_inventory[...] = rng.integers(-1, 3, self.world.n_items)
+            self.state.zones_inventories[...] = rng.integers(
+                -1, 3, self.state.zones_inventories.shape
+            )
+            self.state.position[...] = 0
+            self.state.position[rng.integers(self.world.n_zones)] = 1
+            expected_mask = _reference_mask(self.state)
+            check_np_equal(compiled.valid_mask(self.state).astype(int), expected_mask)
+            for action, expected in enumerate(expected_mask):
+                check.equal(compiled.is_valid(action, self.state), bool(expected))
+
+    def test_apply_checks_validity(self):
+        use_wood = 1
+        check.is_false(self.state.apply(use_wood))
+        self.state.player_inventory[self.world.slot_from_item(self.wood)] = 1
+        check.is_true(self.state.apply(use_wood))
+
+    def test_legal_actions_follow_outside_modifications(self):
+        use_wood = 1
+        check.is_false(self.state.legal_actions[use_wood])
+        self.state.player_inventory[self.world.slot_from_item(self.wood)] = 3
+        check.is_true(self.state.apply(use_wood))
+        check_np_equal(
+            self.state.legal_actions.astype(int),
+            _reference_mask(self.state),
+        )
+
+    def test_sparse_operations_match_dense(self):
+        check.is_false(self.world.sparse_operations)
+        sparse_world = World(
+            items=self.world.items,
+            zones=self.world.zones,
+            zones_items=self.world.zones_items,
+            transformations=deepcopy(self.transformations),
+            start_zone=self.zones[0],
+            sparse_operations=True,
+        )
+        sparse_state = HcraftState(sparse_world)
+        rng = np.random.default_rng(1)
+        for _ in range(200):
+            self.state.player_inventory[...] = rng.integers(-1, 3, self.world.n_items)
+            self.state.zones_inventories[...] = rng.integers(
+                -1, 3, self.state.zones_inventories.shape
+            )
+            self.state.position[...] = 0
+            self.state.position[rng.integers(self.world.n_zones)] = 1
+            sparse_state.player_inventory[...] = self.state.player_inventory
+            sparse_state.zones_inventories[...] = self.state.zones_inventories
+            sparse_state.position[...] = self.state.position
+            check_np_equal(_reference_mask(sparse_state), _reference_mask(self.state))
+            action = rng.integers(len(self.transformations))
+            check.equal(sparse_state.apply(action), self.state.apply(action))
+            check_np_equal(sparse_state.player_inventory, self.state.player_inventory)
+            check_np_equal(sparse_state.zones_inventories, self.state.zones_inventories)
+
+
+def test_sparse_operations_chosen_by_world_size():
+    zone, item = Zone("0"), Item("item")
+    transformations = [Transformation(inventory_changes=[Yield(zone, item)])]
+    world = world_from_transformations(transformations, start_zone=zone)
+    check.is_false(world.sparse_operations)
+    zones = [Zone(str(index)) for index in range(SPARSE_OPERATIONS_MIN_SLOTS)]
+    world = World(
+        items=[],
+        zones=zones,
+        zones_items=[item],
+        transformations=[Transformation(inventory_changes=[Yield(zones[0], item)])],
+        start_zone=zones[0],
+    )
+    check.is_true(world.sparse_operations)
@@ -1,3 +1,4 @@
+import tracemalloc
 from pathlib import Path
 from typing import List
 
@@ -8,9 +9,11 @@ from pytest_mock import MockerFixture
 
 from hcraft.elements import Item, Stack, Zone
 from hcraft.env import HcraftEnv
-from hcraft.task import GetItemTask
+from hcraft.examples import MineHcraftEnv
+from hcraft.purpose import Purpose
+from hcraft.task import GetItemTask, PlaceItemTask
 from hcraft.transformation import Transformation, Use, Yield, PLAYER, CURRENT_ZONE
-from hcraft.world import world_from_transformations
+from hcraft.world import World, world_from_transformations
 from tests.custom_checks import check_np_equal
 from tests.envs import classic_env, player_only_env, zone_only_env
 
@@ -374,6 +377,126 @@ def test_observation_one_zone_no_player_items():
     )
 
 
+def _gather_and_place_env(max_step=None) -> HcraftEnv:
+    forest = Zone("forest")
+    wood, plank = Item("wood"), Item("plank")
+    transformations = [
+        Transformation("search_wood", inventory_changes=[Yield(PLAYER, wood)]),
+        Transformation(
+            "craft_plank",
+            inventory_changes=[Use(PLAYER, wood, 2), Yield(PLAYER, plank)],
+        ),
+        Transformation(
+            "place_wood",
+            inventory_changes=[Use(PLAYER, wood), Yield(CURRENT_ZONE, wood)],
+        ),
+    ]
+    world = world_from_transformations(transformations, start_zone=forest)
+    purpose = Purpose(timestep_reward=-0.1)
+    purpose.add_task(GetItemTask(Stack(wood, 4), reward=3))
+    purpose.add_task(GetItemTask(Stack(plank, 2), reward=7))
+    purpose.add_task(PlaceItemTask(Stack(wood, 2), reward=5), terminal_groups=None)
+    return HcraftEnv(world, purpose=purpose, max_step=max_step)
+
+
+@pytest.mark.parametrize("max_step", [None, 12])
+def test_step_n_matches_repeated_steps(max_step):
+    bulk_env, env = _gather_and_place_env(max_step), _gather_and_place_env(max_step)
+    bulk_env.reset()
+    env.reset()
+    for action, k in [(1, 3), (0, 7), (2, 3), (0, 10), (1, 5), (2, 4), (0, 20)]:
+        observation, reward, terminated, truncated, infos = bulk_env.step_n(action, k)
+        expected_reward = 0.0
+        for n_steps in range(1, k + 1):
+            expected = env.step(action)
+            expected_reward += expected[1]
+            if expected[2] or expected[3] or not env.action_masks()[action]:
+                break
+        check_np_equal(observation, expected[0])
+        check.almost_equal(reward, expected_reward)
+        check.equal(terminated, expected[2])
+        check.equal(truncated, expected[3])
+        check.equal(infos["n_steps"], n_steps)
+        check.equal(bulk_env.current_step, env.current_step)
+        check.equal(
+            [task.terminated for task in bulk_env.purpose.tasks],
+            [task.terminated for task in env.purpose.tasks],
+        )
+        if terminated or truncated:
+            break
+
+
+@pytest.mark.parametrize("max_step", [None, 12])
+def test_step_sequence_matches_steps(max_step):
+    sequence_env, env = _gather_and_place_env(max_step), _gather_and_place_env(max_step)
+    sequence_env.reset()
+    env.reset()
+    actions = [1, 0, 0, 2, 0, 0, 2, 2, 0, 0, 1, 0, 0, 1, 1, 0]
+    observation, rewards, terminated, truncated, infos = sequence_env.step_sequence(
+        actions, per_step_rewards=True, step_infos=True
+    )
+    expected_rewards = []
+    for action in actions:
+        expected = env.step(action)
+        expected_rewards.append(expected[1])
+        if expected[2] or expected[3]:
+            break
+    check_np_equal(observation, expected[0])
+    check_np_equal(rewards, np.array(expected_rewards))
+    check.equal(terminated, expected[2])
+    check.equal(truncated, expected[3])
+    check.equal(infos["n_steps"], len(expected_rewards))
+    check.equal(infos["end_index"], len(expected_rewards) - 1)
+    check.equal(len(infos["step_infos"]), len(expected_rewards))
+    check_np_equal(
+        infos["action_is_legal"].astype(int), expected[4]["action_is_legal"].astype(int)
+    )
+    for key, value in expected[4].items():
+        if key != "action_is_legal":
+            check.almost_equal(infos[key], value)
+
+
+def test_step_does_not_allocate_zones_sized_arrays():
+    """step should not allocate arrays of shape (n_zones, n_zones_items)."""
+    zones = [Zone(f"zone_{i}") for i in range(300)]
+    zones_items = [Item(f"zone_item_{i}") for i in range(300)]
+    wood = Item("wood")
+    transformations = [
+        Transformation(destination=zones[1], zone=zones[0]),
+        Transformation(destination=zones[0], zone=zones[1]),
+        Transformation(inventory_changes=[Yield(CURRENT_ZONE, zones_items[0])]),
+        Transformation(
+            inventory_changes=[
+                Use(zones[2], zones_items[1], consume=1),
+                Yield(zones[3], zones_items[2], max=5),
+                Yield(PLAYER, wood),
+            ]
+        ),
+    ]
+    world = World(
+        items=[wood],
+        zones=zones,
+        zones_items=zones_items,
+        transformations=transformations,
+        start_zone=zones[0],
+    )
+    env = HcraftEnv(world)
+    env.reset()
+    for action in range(len(transformations)):
+        env.step(action)
+
+    zones_sized_bytes = world.n_zones * world.n_zones_items
+    tracemalloc.start()
+    for _ in range(5):
+        for action in range(len(transformations)):
+            env.step(action)
+            for transfo in world.transformations:
+                transfo.is_valid(env.state)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    check.less(peak, zones_sized_bytes // 2)
+
+
 @pytest.mark.slow
 def test_treasure_env(mocker: MockerFixture):
     """Ensure that the example for the documentation is working properly."""
@@ -500,3 +623,172 @@ def test_class_tresure_env(mocker: MockerFixture):
 
     env = TreasureEnv(max_step=10)
     render_env_with_human(env)
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.int16])
+def test_compact_inventory_dtype(dtype):
+    zone, wood = Zone("forest"), Item("wood")
+    transformations = [
+        Transformation(inventory_changes=[Yield(PLAYER, wood, create=100)]),
+        Transformation(inventory_changes=[Yield(CURRENT_ZONE, wood, create=20000)]),
+    ]
+    world = world_from_transformations(transformations, start_zone=zone)
+    env = HcraftEnv(world, inventory_dtype=dtype)
+    observation, _infos = env.reset()
+    check.equal(env.state.player_inventory.dtype, np.dtype(dtype))
+    check.equal(env.state.zones_inventories.dtype, np.dtype(dtype))
+    check.equal(env.observation_space.dtype, np.dtype(dtype))
+    check.is_true(env.observation_space.contains(observation))
+
+    max_amount = np.iinfo(dtype).max
+    for action in (0, 0, 0, 1):
+        observation, _reward, _terminated, _truncated, _infos = env.step(action)
+    check.equal(env.state.amount_of(wood), min(300, max_amount))
+    check.equal(env.state.amount_of(wood, zone), min(20000, max_amount))
+    check.is_true(env.observation_space.contains(observation))
+
+
+def test_inventory_dtype_leaves_shared_world_unchanged():
+    zone, wood = Zone("forest"), Item("wood")
+    transformations = [Transformation(inventory_changes=[Yield(PLAYER, wood)])]
+    world = world_from_transformations(transformations, start_zone=zone)
+    env = HcraftEnv(world)
+    compact_env = HcraftEnv(world, inventory_dtype="uint8")
+    check.equal(world.inventory_dtype, np.dtype(np.int32))
+    check.equal(env.observation_space.dtype, np.dtype(np.int32))
+    check.equal(compact_env.observation_space.dtype, np.dtype(np.uint8))
+    observation, _infos = env.reset()
+    check.is_true(env.observation_space.contains(observation))
+    check.is_(compact_env.world.compile(), world.compile())
+
+    with pytest.raises(ValueError, match="integer"):
+        HcraftEnv(world, inventory_dtype=np.float32)
+
+
+def test_unsigned_inventory_dtype_needs_non_negative_inventories():
+    wood = Item("wood")
+    transformations = [
+        Transformation(inventory_changes=[Use(PLAYER, wood, consume=2, min=1)])
+    ]
+    world = world_from_transformations(transformations)
+    check.is_false(world.compiled_transformations.keeps_non_negative)
+    with pytest.raises(ValueError, match="negative"):
+        HcraftEnv(world, inventory_dtype=np.uint8)
+    env = HcraftEnv(world, inventory_dtype=np.int8)
+    check.equal(env.state.player_inventory.dtype, np.dtype(np.int8))
+
+
+def test_get_and_set_state_branch_episodes():
+    env = MineHcraftEnv(max_step=50, purpose="all")
+    env.reset()
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        env.step(rng.choice(np.flatnonzero(env.action_masks())))
+    branch = env.get_state()
+
+    actions = [rng.integers(env.action_space.n) for _ in range(20)]
+    for action in actions[:5]:
+        env.step(action)
+    check.is_true(env.get_state(out=branch) is branch)
+    expected_results = [env.step(action)[:4] for action in actions[5:]]
+    expected_masks = env.action_masks()
+
+    env.set_state(branch)
+    check.equal(env.current_step, 15)
+    results = [env.step(action)[:4] for action in actions[5:]]
+    for result, expected in zip(results, expected_results):
+        check_np_equal(result[0], expected[0])
+        check.equal(result[1:], expected[1:])
+    check_np_equal(env.action_masks().astype(int), expected_masks.astype(int))
+
+
+def test_set_state_restores_scores_and_successes():
+    env = MineHcraftEnv(max_step=100, purpose="all")
+    fresh_env = MineHcraftEnv(max_step=100, purpose="all")
+    rng = np.random.default_rng(1)
+    actions = [rng.integers(env.action_space.n) for _ in range(60)]
+    for episode_env in (env, fresh_env):
+        episode_env.reset()
+        for action in actions[:10]:
+            episode_env.step(action)
+    branch = env.get_state()
+    for action in actions[10:40]:
+        env.step(action)
+    env.set_state(branch)
+
+    for action in actions[40:]:
+        infos = env.step(action)[4]
+        expected_infos = fresh_env.step(action)[4]
+        check_np_equal(
+            infos.pop("action_is_legal").astype(int),
+            expected_infos.pop("action_is_legal").astype(int),
+        )
+        check.equal(
+            {key: infos[key] for key in infos},
+            {key: expected_infos[key] for key in expected_infos},
+        )
+
+
+def test_spaces_are_cached_until_world_changes():
+    env = MineHcraftEnv(max_step=10)
+    observation_space, action_space = env.observation_space, env.action_space
+    check.is_(env.observation_space, observation_space)
+    check.is_(env.action_space, action_space)
+    n_items = env.world.n_items
+    n_zones = env.world.n_zones
+    expected_high = np.full(observation_space.shape, np.iinfo(np.int32).max)
+    expected_high[n_items : n_items + n_zones] = 1
+    check_np_equal(observation_space.high, expected_high)
+    check_np_equal(observation_space.low, np.zeros(observation_space.shape))
+    check.equal(action_space.n, len(env.world.transformations))
+
+    env.world = MineHcraftEnv(max_step=10, inventory_dtype=np.uint8).world
+    check.is_not(env.observation_space, observation_space)
+    check.equal(env.observation_space.dtype, np.dtype(np.uint8))
+    check.equal(env.observation_space.high.max(), np.iinfo(np.uint8).max)
+
+
+def test_action_mask_is_shared_until_state_changes(mocker: MockerFixture):
+    env = MineHcraftEnv(max_step=20, info_level="minimal")
+    env.reset()
+    compiled = env.world.compiled_transformations
+    valid_mask = mocker.spy(compiled, "valid_mask")
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        mask = env.action_masks()
+        invalid_actions = np.flatnonzero(~mask)
+        if invalid_actions.shape[0] > 0:
+            env.step(rng.choice(invalid_actions))
+            check.is_(env.action_masks(), mask)
+        _obs, _reward, _terminated, _truncated, infos = env.step(
+            rng.choice(np.flatnonzero(mask))
+        )
+        check.is_(infos["action_is_legal"], env.action_masks())
+        check.is_false(infos["action_is_legal"].flags.writeable)
+        check.is_not(env.action_masks(), mask)
+    check.less_equal(valid_mask.call_count, 10)
+
+
+def test_full_infos_own_their_action_mask():
+    env = MineHcraftEnv(max_step=20)
+    _obs, infos = env.reset()
+    check.is_not(infos["action_is_legal"], env.action_masks())
+    check_np_equal(infos["action_is_legal"].astype(int), env.action_masks().astype(int))
+    infos["action_is_legal"][...] = False
+    check.is_true(env.action_masks().any())
+
+
+def test_action_masks_follow_direct_writes():
+    env = MineHcraftEnv(max_step=20, info_level="minimal")
+    env.reset()
+    mask = env.action_masks()
+    env.state.player_inventory[...] = 5
+    new_mask = env.action_masks()
+    check.is_not(new_mask, mask)
+    check.is_false(new_mask.flags.writeable)
+    expected_mask = [
+        transformation.is_valid(env.state)
+        for transformation in env.world.transformations
+    ]
+    check_np_equal(new_mask.astype(int), np.array(expected_mask, int))
+    check.greater(int(new_mask.sum()), int(mask.sum()))
@@ -0,0 +1,143 @@
+from copy import deepcopy
+
+import numpy as np
+import pytest
+import pytest_check as check
+
+from hcraft.elements import Item, Zone
+from hcraft.examples import EXAMPLE_ENVS
+from hcraft.state import BatchedHcraftState, HcraftState
+from hcraft.transformation import (
+    CURRENT_ZONE,
+    DESTINATION,
+    PLAYER,
+    Transformation,
+    Use,
+    Yield,
+)
+from hcraft.world import World, world_from_transformations
+from tests.custom_checks import check_np_equal
+
+
+def _kernel_and_numpy_worlds(world: World):
+    """Copies of the world updating states with kernels or with NumPy."""
+    kernel_world, numpy_world = deepcopy(world), deepcopy(world)
+    kernel_world.compiled_transformations.use_kernels = True
+    numpy_world.compiled_transformations.use_kernels = False
+    return kernel_world, numpy_world
+
+
+def _check_states_equal(state: HcraftState, expected: HcraftState) -> None:
+    check_np_equal(state.player_inventory, expected.player_inventory)
+    check_np_equal(state.position, expected.position)
+    check_np_equal(state.zones_inventories, expected.zones_inventories)
+    check.equal(state.zone_slot, expected.zone_slot)
+    check.equal(state.hash, expected.hash)
+    check_np_equal(state._discovered, expected._discovered)
+    check_np_equal(state.legal_actions.astype(int), expected.legal_actions.astype(int))
+
+
+def _check_batches_equal(batch: BatchedHcraftState, expected: BatchedHcraftState):
+    check_np_equal(batch.player_inventories, expected.player_inventories)
+    check_np_equal(batch.positions, expected.positions)
+    check_np_equal(batch.zones_inventories, expected.zones_inventories)
+    check.equal(batch.hashes.tolist(), expected.hashes.tolist())
+    check_np_equal(batch.discovered_bits, expected.discovered_bits)
+
+
+@pytest.mark.parametrize("env_class", EXAMPLE_ENVS)
+def test_kernels_match_numpy_updates(env_class):
+    kernel_world, numpy_world = _kernel_and_numpy_worlds(env_class().world)
+    n_states = 4
+    kernel_batch = BatchedHcraftState(kernel_world, n_states)
+    numpy_batch = BatchedHcraftState(numpy_world, n_states)
+    kernel_state, numpy_state = HcraftState(kernel_world), HcraftState(numpy_world)
+    n_transformations = len(numpy_world.transformations)
+
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        legal_actions = numpy_batch.legal_actions
+        actions = np.array(
+            [
+                rng.choice(np.flatnonzero(legal))
+                if legal.any() and rng.random() < 0.8
+                else rng.integers(n_transformations)
+                for legal in legal_actions
+            ]
+        )
+        mask = rng.random(n_states) < 0.9
+        success = kernel_batch.apply(actions, mask)
+        expected_success = numpy_batch.apply(actions, mask)
+        check_np_equal(success.astype(int), expected_success.astype(int))
+        _check_batches_equal(kernel_batch, numpy_batch)
+
+        check.equal(kernel_state.apply(actions[0]), numpy_state.apply(actions[0]))
+        _check_states_equal(kernel_state, numpy_state)
+
+
+def test_kernels_validity_with_negative_inventories():
+    zones = [Zone("0"), Zone("1"), Zone("2")]
+    wood, dirt = Item("wood"), Item("dirt")
+    transformations = [
+        Transformation(destination=zones[1], zone=zones[0]),
+        Transformation(
+            inventory_changes=[
+                Use(PLAYER, wood, consume=2, min=1),
+                Yield(PLAYER, dirt, max=1),
+            ]
+        ),
+        Transformation(
+            inventory_changes=[
+                Use(CURRENT_ZONE, dirt, consume=1),
+                Yield(DESTINATION, dirt, max=0),
+            ],
+            destination=zones[2],
+        ),
+        Transformation(
+            inventory_changes=[
+                Use(zones[2], dirt, consume=1),
+                Yield(zones[1], wood, max=2),
+            ],
+        ),
+    ]
+    kernel_world, numpy_world = _kernel_and_numpy_worlds(
+        world_from_transformations(transformations, start_zone=zones[0])
+    )
+    n_states = 64
+    kernel_batch = BatchedHcraftState(kernel_world, n_states)
+    numpy_batch = BatchedHcraftState(numpy_world, n_states)
+    rng = np.random.default_rng(0)
+    player_inventories = rng.integers(-1, 3, kernel_batch.player_inventories.shape)
+    zones_inventories = rng.integers(-1, 3, kernel_batch.zones_inventories.shape)
+    positions = rng.integers(len(zones), size=n_states)
+    for action in range(len(transformations)):
+        for batch in (kernel_batch, numpy_batch):
+            batch.player_inventories[...] = player_inventories
+            batch.zones_inventories[...] = zones_inventories
+            batch.positions[...] = positions
+            batch.refresh_hashes()
+        actions = np.full(n_states, action)
+        expected_valid = numpy_batch.is_valid(actions)
+        success = kernel_batch.apply(actions)
+        check_np_equal(success.astype(int), expected_valid.astype(int))
+        numpy_batch.apply(actions)
+        _check_batches_equal(kernel_batch, numpy_batch)
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.int8, np.int16])
+def test_kernels_saturate_compact_inventories(dtype):
+    zone, wood = Zone("forest"), Item("wood")
+    transformations = [
+        Transformation(inventory_changes=[Yield(PLAYER, wood, create=100)]),
+        Transformation(inventory_changes=[Yield(CURRENT_ZONE, wood, create=200)]),
+    ]
+    kernel_world, numpy_world = _kernel_and_numpy_worlds(
+        world_from_transformations(
+            transformations, start_zone=zone, inventory_dtype=dtype
+        )
+    )
+    kernel_state, numpy_state = HcraftState(kernel_world), HcraftState(numpy_world)
+    for action in (0, 0, 0, 1, 1):
+        kernel_state.apply(action)
+        numpy_state.apply(action)
+    _check_states_equal(kernel_state, numpy_state)
@@ -184,3 +184,39 @@ class TestMetricsMultiPurpose:
                         msg=f"cumulated_score={self.env.cumulated_score}"
                         f"episode={self.env.episodes}",
                     )
+
+    def test_infos_keep_step_values(self):
+        self.env.reset()
+        all_infos, expected_infos = [], []
+        for action in _actions_per_episodes()[0]:
+            transfo = self.named_transformations.get(action)
+            action_id = self.env.world.transformations.index(transfo)
+            _, _, _, _, infos = self.env.step(action_id)
+            all_infos.append(infos)
+            expected = {"score": self.env.current_score}
+            for counter in (self.env.task_successes, self.env.terminal_successes):
+                expected.update(counter.done_infos)
+                expected.update(counter.rates_infos)
+            expected_infos.append(expected)
+        self.env.reset()
+        expected_keys = {"action_is_legal", "score_average"}
+        check.equal(set(dict(self.env.infos())), set(expected_infos[0]) | expected_keys)
+        for infos, expected in zip(all_infos, expected_infos):
+            for copied_infos in (dict(infos), {**infos}):
+                check.equal(set(copied_infos), set(expected) | expected_keys)
+                for key, value in expected.items():
+                    check.equal(copied_infos[key], value, msg=key)
+
+    @pytest.mark.parametrize(
+        "info_level,expected_keys",
+        [
+            ("none", set()),
+            ("minimal", {"action_is_legal", "score", "score_average"}),
+        ],
+    )
+    def test_info_levels(self, info_level, expected_keys):
+        env = HcraftEnv(self.world, purpose=self.purpose, info_level=info_level)
+        _observation, infos = env.reset()
+        check.equal(set(infos), expected_keys)
+        _, _, _, _, infos = env.step(0)
+        check.equal(set(infos), expected_keys)
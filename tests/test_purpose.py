@@ -1,11 +1,16 @@
+from copy import deepcopy
 from dataclasses import dataclass
 from typing import Any, List, Tuple
 
+import numpy as np
 import pytest
 import pytest_check as check
 
 from hcraft.elements import Item, Stack, Zone
 from hcraft.env import HcraftEnv
+from hcraft.examples import MineHcraftEnv
+from hcraft.examples.minecraft.items import CRAFTING_TABLE, DIAMOND, WOOD
+from hcraft.examples.minecraft.zones import FOREST
 from hcraft.purpose import Purpose, RewardShaping
 from hcraft.task import GetItemTask, GoToZoneTask, PlaceItemTask, Task
 from hcraft.transformation import (
@@ -357,6 +362,78 @@ class TestPurposeRewardShaping:
         )
 
 
+class CustomGetItemTask(GetItemTask):
+    """Subclass that must be evaluated on its own, not compiled."""
+
+
+@pytest.mark.parametrize("shaping", ["all", "required"])
+def test_compiled_purpose_matches_tasks(shaping: str):
+    purpose = Purpose(timestep_reward=-0.1)
+    purpose.add_task(GetItemTask(Stack(DIAMOND, 2), reward=10), shaping)
+    purpose.add_task(PlaceItemTask(CRAFTING_TABLE, zone=FOREST), terminal_groups="a")
+    purpose.add_task(CustomGetItemTask(WOOD, reward=3), terminal_groups="a")
+    env = MineHcraftEnv(purpose=purpose, max_step=200)
+    reference_env = deepcopy(env)
+    env.reset()
+    reference_env.reset()
+    reference_env.purpose._compiled_tasks = None
+    check.is_true(env.purpose._is_compiled())
+    check.is_false(reference_env.purpose._is_compiled())
+    check.equal(len(env.purpose._other_tasks), 1)
+
+    rng = np.random.default_rng(0)
+    branches = None
+    done = False
+    while not done:
+        if env.current_step == 50 and branches is None:
+            branches = (env.get_state(), reference_env.get_state())
+        if env.current_step == 100 and branches is not None:
+            env.set_state(branches[0])
+            reference_env.set_state(branches[1])
+            branches = ()
+        if env.current_step % 30 == 29:
+            # Reset a finished task outside of the purpose.
+            for task, reference_task in zip(
+                env.purpose.tasks, reference_env.purpose.tasks
+            ):
+                if task.terminated:
+                    task.reset()
+                    reference_task.reset()
+                    break
+        action = rng.choice(np.flatnonzero(env.action_masks()))
+        _obs, reward, terminated, truncated, _infos = env.step(action)
+        _obs, expected_reward, expected_terminated, _truncated, _infos = (
+            reference_env.step(action)
+        )
+        check.almost_equal(reward, expected_reward)
+        check.equal(terminated, expected_terminated)
+        check.equal(
+            [task.terminated for task in env.purpose.tasks],
+            [task.terminated for task in reference_env.purpose.tasks],
+        )
+        done = terminated or truncated
+
+
+def test_compiled_purpose_follows_direct_writes():
+    env = MineHcraftEnv(purpose=GetItemTask(Stack(WOOD, 1)), max_step=10)
+    env.reset()
+    moves = [
+        action
+        for action, transformation in enumerate(env.world.transformations)
+        if transformation.destination is not None
+    ]
+    move = next(action for action in moves if env.action_masks()[action])
+    _obs, reward, terminated, _truncated, _infos = env.step(move)
+    check.equal(reward, 0.0)
+    check.is_false(terminated)
+
+    env.state.player_inventory[env.world.slot_from_item(WOOD)] = 1
+    move = next(action for action in moves if env.action_masks()[action])
+    _obs, reward, terminated, _truncated, _infos = env.step(move)
+    check.equal(reward, 1.0)
+    check.is_true(terminated)
+
+
 def _check_get_item_tasks(items: List[Item], tasks: List[Task]):
     all_items_stacks = [Stack(item) for item in items]
     expected_task_names = [
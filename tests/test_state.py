@@ -0,0 +1,301 @@
+import numpy as np
+import pytest
+import pytest_check as check
+
+from hcraft.elements import Item, Zone
+from hcraft.examples import EXAMPLE_ENVS
+from hcraft.state import BatchedHcraftState, HcraftState
+from hcraft.transformation import (
+    CURRENT_ZONE,
+    DESTINATION,
+    PLAYER,
+    Transformation,
+    Use,
+    Yield,
+)
+from hcraft.world import world_from_transformations
+from tests.custom_checks import check_np_equal
+
+
+def _check_batch_matches_states(batch: BatchedHcraftState, states: list) -> None:
+    check_np_equal(
+        batch.player_inventories, np.array([s.player_inventory for s in states])
+    )
+    check_np_equal(batch.one_hot_positions, np.array([s.position for s in states]))
+    check_np_equal(
+        batch.zones_inventories, np.array([s.zones_inventories for s in states])
+    )
+    check_np_equal(batch.observations, np.array([s.observation for s in states]))
+    check_np_equal(
+        batch.legal_actions.astype(int),
+        np.array([s.legal_actions for s in states]).astype(int),
+    )
+    check.equal(batch.hashes.tolist(), [s.hash for s in states])
+    for name in (
+        "discovered_items",
+        "discovered_zones",
+        "discovered_zones_items",
+        "discovered_transformations",
+    ):
+        check_np_equal(
+            getattr(batch, name), np.array([getattr(s, name) for s in states])
+        )
+
+
+@pytest.mark.parametrize("env_class", EXAMPLE_ENVS)
+def test_batched_state_matches_single_states(env_class):
+    world = env_class().world
+    n_states = 8
+    batch = BatchedHcraftState(world, n_states)
+    states = [HcraftState(world) for _ in range(n_states)]
+    _check_batch_matches_states(batch, states)
+
+    rng = np.random.default_rng(42)
+    for step in range(30):
+        legal_actions = batch.legal_actions
+        actions = np.array(
+            [
+                rng.choice(np.flatnonzero(legal))
+                if legal.any() and rng.random() < 0.8
+                else rng.integers(len(world.transformations))
+                for legal in legal_actions
+            ]
+        )
+        success = batch.apply(actions)
+        expected_success = [s.apply(a) for s, a in zip(states, actions)]
+        check_np_equal(success.astype(int), np.array(expected_success, dtype=int))
+        if step == 15:
+            reset_mask = rng.random(n_states) < 0.5
+            batch.reset(reset_mask)
+            for state in np.array(states)[reset_mask]:
+                state.reset()
+        _check_batch_matches_states(batch, states)
+
+
+def test_batched_validity_with_negative_inventories():
+    zones = [Zone("0"), Zone("1"), Zone("2")]
+    wood, dirt = Item("wood"), Item("dirt")
+    transformations = [
+        Transformation(destination=zones[1], zone=zones[0]),
+        Transformation(
+            inventory_changes=[
+                Use(PLAYER, wood, consume=2, min=1),
+                Yield(PLAYER, dirt, max=1),
+            ]
+        ),
+        Transformation(
+            inventory_changes=[
+                Use(CURRENT_ZONE, dirt, consume=1),
+                Yield(DESTINATION, dirt, max=0),
+            ],
+            destination=zones[2],
+        ),
+        Transformation(
+            inventory_changes=[
+                Use(zones[2], dirt, consume=1),
+                Yield(zones[1], wood, max=2),
+            ],
+        ),
+    ]
+    world = world_from_transformations(transformations, start_zone=zones[0])
+    n_states = 64
+    batch = BatchedHcraftState(world, n_states)
+    rng = np.random.default_rng(0)
+    batch.player_inventories[...] = rng.integers(-1, 3, (n_states, world.n_items))
+    batch.zones_inventories[...] = rng.integers(-1, 3, batch.zones_inventories.shape)
+    batch.positions[...] = rng.integers(world.n_zones, size=n_states)
+
+    states = []
+    for index in range(n_states):
+        state = HcraftState(world)
+        state.player_inventory[...] = batch.player_inventories[index]
+        state.position[...] = batch.one_hot_positions[index]
+        state.zones_inventories[...] = batch.zones_inventories[index]
+        states.append(state)
+
+    expected_mask = np.array(
+        [[t.is_valid(s) for t in world.transformations] for s in states], dtype=int
+    )
+    check_np_equal(batch.legal_actions.astype(int), expected_mask)
+    for action in range(len(transformations)):
+        actions = np.full(n_states, action)
+        check_np_equal(batch.is_valid(actions).astype(int), expected_mask[:, action])
+    check.equal(batch.n_states, n_states)
+
+
+def test_observation_is_a_view_of_the_state():
+    zones = [Zone("0"), Zone("1")]
+    wood = Item("wood")
+    transformations = [
+        Transformation(destination=zones[1], zone=zones[0]),
+        Transformation(
+            inventory_changes=[Yield(CURRENT_ZONE, wood), Yield(PLAYER, wood)]
+        ),
+    ]
+    world = world_from_transformations(transformations, start_zone=zones[0])
+    state = HcraftState(world)
+    observation = state.observation
+    check.is_false(observation.flags.writeable)
+    check.is_true(np.shares_memory(observation, state.player_inventory))
+    check.is_true(np.shares_memory(observation, state.position))
+
+    state.zones_inventories[world.slot_from_zone(zones[1]), 0] = 3
+    check.is_true(state.apply(0))
+    check.is_true(state.apply(1))
+    check.is_true(state.observation is observation)
+    expected = np.concatenate(
+        (state.player_inventory, state.position, state.current_zone_inventory)
+    )
+    check_np_equal(observation, expected)
+    check.equal(observation[-1], 4)
+
+
+def test_zone_slot_follows_moves_and_outside_modifications():
+    zones = [Zone("0"), Zone("1"), Zone("2")]
+    transformations = [
+        Transformation(destination=zones[1], zone=zones[0]),
+        Transformation(destination=zones[2], zone=zones[1]),
+    ]
+    world = world_from_transformations(transformations, start_zone=zones[0])
+    state = HcraftState(world)
+    check.equal(state.zone_slot, world.slot_from_zone(zones[0]))
+    check.is_true(state.apply(0))
+    check.equal(state.zone_slot, world.slot_from_zone(zones[1]))
+    check.equal(state.current_zone, zones[1])
+    check.equal(int(state.position.sum()), 1)
+
+    state.position[...] = 0
+    state.position[world.slot_from_zone(zones[0])] = 1
+    check.equal(state.zone_slot, world.slot_from_zone(zones[0]))
+    check.is_false(state.apply(1))
+    check.is_true(state.apply(0))
+    check.is_true(state.apply(1))
+    check.equal(state.current_zone, zones[2])
+
+
+def test_last_transformation_tells_how_the_state_changed():
+    zones = [Zone("0"), Zone("1")]
+    wood = Item("wood")
+    transformations = [
+        Transformation(destination=zones[1], zone=zones[0]),
+        Transformation(inventory_changes=[Yield(PLAYER, wood)]),
+    ]
+    world = world_from_transformations(transformations, start_zone=zones[0])
+    state = HcraftState(world)
+    check.is_none(state.last_transformation)
+
+    version = state.version
+    check.is_true(state.apply(0))
+    check.equal(state.last_transformation, (version, 0, 0))
+    version = state.version
+    check.is_false(state.apply(0))
+    check.equal(state.version, version)
+    check.equal(state.last_transformation.action, 0)
+
+    snapshot = state.snapshot()
+    check.is_true(state.apply(1))
+    check.equal(state.last_transformation, (version, 1, 1))
+    state.restore(snapshot)
+    check.not_equal(state.version, version)
+    check.is_none(state.last_transformation)
+
+    # Changes of other slots cannot be told apart with negative inventories.
+    state.player_inventory[world.slot_from_item(wood)] = -2
+    state.refresh_hash()
+    check.is_none(state.last_transformation)
+    check.is_true(state.apply(1))
+    check.is_none(state.last_transformation)
+    state.reset()
+    check.is_none(state.last_transformation)
+
+
+def test_batched_state_saturates_compact_inventories():
+    zone, wood = Zone("forest"), Item("wood")
+    transformations = [
+        Transformation(inventory_changes=[Yield(PLAYER, wood, create=100)]),
+        Transformation(inventory_changes=[Yield(CURRENT_ZONE, wood, create=200)]),
+    ]
+    world = world_from_transformations(
+        transformations, start_zone=zone, inventory_dtype=np.uint8
+    )
+    batch = BatchedHcraftState(world, 3)
+    state = HcraftState(world)
+    for action in (0, 0, 0, 1, 1):
+        batch.apply(np.full(3, action))
+        state.apply(action)
+    check.equal(batch.player_inventories.dtype, np.dtype(np.uint8))
+    _check_batch_matches_states(batch, [state] * 3)
+    check.equal(state.amount_of(wood), 255)
+    check.equal(state.amount_of(wood, zone), 255)
+
+
+@pytest.mark.parametrize("env_class", EXAMPLE_ENVS)
+def test_hash_only_depends_on_state(env_class):
+    world = env_class().world
+    state = HcraftState(world)
+    rng = np.random.default_rng(0)
+    hashes = {}
+    for _ in range(50):
+        action = rng.integers(len(world.transformations))
+        state.apply(action)
+        expected_hash = state.hash
+        state.refresh_hash()
+        check.equal(state.hash, expected_hash)
+        observation = (
+            state.player_inventory.tobytes(),
+            state.zones_inventories.tobytes(),
+        )
+        key = observation + (state.zone_slot,)
+        check.equal(hashes.setdefault(key, state.hash), state.hash)
+    check.equal(len(set(hashes.values())), len(hashes))
+
+
+@pytest.mark.parametrize("env_class", EXAMPLE_ENVS)
+def test_apply_n_matches_repeated_applications(env_class):
+    world = env_class().world
+    state, repeated_state = HcraftState(world), HcraftState(world)
+    rng = np.random.default_rng(0)
+    for _ in range(30):
+        legal_actions = np.flatnonzero(state.legal_actions)
+        if legal_actions.shape[0] == 0:
+            break
+        action = rng.choice(legal_actions)
+        k = int(rng.integers(1, 12))
+        n_applications = 0
+        while n_applications < k and repeated_state.apply(action):
+            n_applications += 1
+        max_applications = world.transformations[action].max_applications(state)
+        check.equal(min(max_applications, k), n_applications)
+        check.equal(state.apply_n(action, k), n_applications)
+        check_np_equal(state.player_inventory, repeated_state.player_inventory)
+        check_np_equal(state.position, repeated_state.position)
+        check_np_equal(state.zones_inventories, repeated_state.zones_inventories)
+        check.equal(state.hash, repeated_state.hash)
+        check_np_equal(
+            state.legal_actions.astype(int), repeated_state.legal_actions.astype(int)
+        )
+        check_np_equal(
+            state.discovered_transformations,
+            repeated_state.discovered_transformations,
+        )
+
+
+@pytest.mark.parametrize("env_class", EXAMPLE_ENVS)
+def test_discoveries_only_follow_written_slots(env_class):
+    world = env_class().world
+    state = HcraftState(world)
+    discovered_items = state.player_inventory > 0
+    discovered_zones = state.position > 0
+    discovered_zones_items = state.current_zone_inventory > 0
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        legal_actions = np.flatnonzero(state.legal_actions)
+        if legal_actions.shape[0] == 0:
+            break
+        state.apply(rng.choice(legal_actions))
+        discovered_items |= state.player_inventory > 0
+        discovered_zones |= state.position > 0
+        discovered_zones_items |= state.current_zone_inventory > 0
+        check_np_equal(state.discovered_items, discovered_items.astype(int))
+        check_np_equal(state.discovered_zones, discovered_zones.astype(int))
+        check_np_equal(state.discovered_zones_items, discovered_zones_items.astype(int))
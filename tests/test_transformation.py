@@ -198,7 +198,7 @@ class TestTransformationIsValid:
 
         expected_op = np.zeros(len(self.zones), dtype=np.int32)
         expected_op[1] = 1
-        check_np_equal(transfo._destination, expected_op)
+        check_np_equal(transfo.operations().destination, expected_op)
 
     def test_destination(self):
         transfo = Transformation(destination=self.zones[1])
@@ -265,19 +265,19 @@ class TestTransformationIsValid:
     def test_no_destination(self):
         transfo = Transformation(destination=None)
         transfo.build(self.world)
-        check.is_none(transfo._destination)
+        check.is_none(transfo.operations().destination)
 
     def test_zone_requirement(self):
         tranfo = Transformation(zone=self.zones[1])
         tranfo.build(self.world)
 
         expected_op = np.array([0, 1, 0], dtype=np.int32)
-        check_np_equal(tranfo._zone, expected_op)
+        check_np_equal(tranfo.operations().zone, expected_op)
 
     def test_no_zones_requirement(self):
         tranfo = Transformation()
         tranfo.build(self.world)
-        check.is_none(tranfo._zone)
+        check.is_none(tranfo.operations().zone)
 
 
 ZONE_A = Zone("A")
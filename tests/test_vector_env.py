@@ -0,0 +1,148 @@
+import gc
+import importlib
+import sys
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pytest
+import pytest_check as check
+
+from hcraft.examples import EXAMPLE_ENVS, HCRAFT_GYM_ENVS, MineHcraftEnv
+from tests.custom_checks import check_np_equal
+
+if TYPE_CHECKING:
+    import gymnasium as gym
+
+gym_module: "gym" = pytest.importorskip("gymnasium")
+
+from hcraft.vector_env import (  # noqa: E402
+    HcraftVectorEnv,
+    SharedMemoryHcraftVectorEnv,
+)
+
+
+@pytest.mark.parametrize(
+    "env_class,kwargs",
+    [(env_class, {}) for env_class in EXAMPLE_ENVS]
+    + [(MineHcraftEnv, {"purpose": "all"})],
+)
+def test_vector_env_matches_single_envs(env_class, kwargs):
+    num_envs = 6
+    max_step = 15
+    envs = HcraftVectorEnv(env_class(max_step=max_step, **kwargs), num_envs)
+    single_envs = [env_class(max_step=max_step, **kwargs) for _ in range(num_envs)]
+
+    observations, infos = envs.reset()
+    expected_observations = np.array([env.reset()[0] for env in single_envs])
+    check_np_equal(observations, expected_observations)
+
+    rng = np.random.default_rng(42)
+    single_done = np.zeros(num_envs, dtype=bool)
+    for _ in range(3 * max_step):
+        legal_actions = infos["action_is_legal"]
+        actions = np.array(
+            [
+                rng.choice(np.flatnonzero(legal))
+                if legal.any() and rng.random() < 0.9
+                else rng.integers(envs.single_action_space.n)
+                for legal in legal_actions
+            ]
+        )
+        observations, rewards, terminated, truncated, infos = envs.step(actions)
+
+        for index, env in enumerate(single_envs):
+            if single_done[index]:
+                expected_obs, _infos = env.reset()
+                expected = (expected_obs, 0.0, False, False)
+                single_done[index] = False
+            else:
+                expected_obs, reward, term, trunc, _infos = env.step(actions[index])
+                expected = (expected_obs, reward, term, trunc)
+                single_done[index] = term or trunc
+            check_np_equal(observations[index], expected[0])
+            check.almost_equal(rewards[index], expected[1])
+            check.equal(bool(terminated[index]), expected[2])
+            check.equal(bool(truncated[index]), expected[3])
+            check_np_equal(
+                infos["action_is_legal"][index].astype(int),
+                env.action_masks().astype(int),
+            )
+
+
+@pytest.mark.parametrize("env_gym_id", HCRAFT_GYM_ENVS[:3] + HCRAFT_GYM_ENVS[-5:])
+def test_gym_make_vec(env_gym_id: str):
+    envs = gym_module.make_vec(env_gym_id, num_envs=3)
+    check.is_instance(envs.unwrapped, HcraftVectorEnv)
+    observations, _infos = envs.reset()
+    check.equal(observations.shape, envs.observation_space.shape)
+    observations, rewards, terminated, truncated, _infos = envs.step(np.zeros(3))
+    check.equal(observations.shape[0], 3)
+    check.equal(rewards.shape, (3,))
+    check.equal(terminated.shape, (3,))
+    check.equal(truncated.shape, (3,))
+
+
+def test_shared_memory_vector_env_matches_vector_env():
+    num_envs = 7
+    envs = HcraftVectorEnv(MineHcraftEnv(max_step=10, purpose="all"), num_envs)
+    shared_envs = SharedMemoryHcraftVectorEnv(
+        MineHcraftEnv(max_step=10, purpose="all"), num_envs, num_workers=3
+    )
+    try:
+        observations, infos = envs.reset()
+        shared_observations, shared_infos = shared_envs.reset()
+        check_np_equal(shared_observations, observations)
+        rng = np.random.default_rng(0)
+        for _ in range(25):
+            actions = np.array(
+                [
+                    rng.choice(np.flatnonzero(legal))
+                    for legal in infos["action_is_legal"]
+                ]
+            )
+            expected = envs.step(actions)
+            results = shared_envs.step(actions)
+            for result, expected_result in zip(results[:4], expected[:4]):
+                check_np_equal(result.astype(float), expected_result.astype(float))
+            infos, shared_infos = expected[4], results[4]
+            check_np_equal(
+                shared_infos["action_is_legal"].astype(int),
+                infos["action_is_legal"].astype(int),
+            )
+    finally:
+        shared_envs.close()
+    check.is_true(all(not worker.is_alive() for worker in shared_envs._workers))
+
+
+def test_shared_memory_is_released_without_close():
+    shared_envs = SharedMemoryHcraftVectorEnv(
+        MineHcraftEnv(max_step=10), num_envs=2, num_workers=2
+    )
+    shared_envs.reset()
+    name, workers = shared_envs.buffers.name, shared_envs._workers
+    del shared_envs
+    gc.collect()
+    check.is_true(all(not worker.is_alive() for worker in workers))
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=name)
+
+
+def test_gym_make_vec_with_workers():
+    envs = gym_module.make_vec("MineHcraft-Diamond-v1", num_envs=4, num_workers=2)
+    try:
+        check.is_instance(envs.unwrapped, SharedMemoryHcraftVectorEnv)
+        observations, _infos = envs.reset()
+        check.equal(observations.shape, envs.observation_space.shape)
+        _observations, rewards, _terminated, _truncated, _infos = envs.step(np.zeros(4))
+        check.equal(rewards.shape, (4,))
+    finally:
+        envs.close()
+
+
+def test_missing_gymnasium_names_the_extra(mocker):
+    missing = {name: None for name in sys.modules if name.startswith("gymnasium")}
+    mocker.patch.dict(sys.modules, missing)
+    del sys.modules["hcraft.vector_env"]
+    with pytest.raises(ImportError, match=r"hcraft\[gym\]"):
+        importlib.import_module("hcraft.vector_env")
@@ -1,7 +1,10 @@
 import pytest
 import pytest_check as check
 
-from hcraft.elements import Item, Zone
+from hcraft.elements import Item, Stack, Zone
+from hcraft.examples import EXAMPLE_ENVS
+from hcraft.state import HcraftState
+from hcraft.transformation import CURRENT_ZONE, PLAYER, Transformation, Use, Yield
 from hcraft.world import World
 
 
@@ -29,3 +32,68 @@ class TestWorld:
     def test_slot_from_zoneitem(self):
         zone_3 = self.zones_items[1]
         check.equal(self.world.slot_from_zoneitem(zone_3), 1)
+
+    def test_slot_from_unknown_element(self):
+        with pytest.raises(ValueError):
+            self.world.slot_from_item(Item("unknown"))
+        with pytest.raises(ValueError):
+            self.world.slot_from_zone(Zone("unknown"))
+
+
+@pytest.mark.parametrize("env_class", EXAMPLE_ENVS)
+def test_slots_follow_ordered_world(env_class):
+    world = env_class().world
+    for slot, item in enumerate(world.items):
+        check.equal(world.slot_from_item(item), slot)
+    for slot, zone in enumerate(world.zones):
+        check.equal(world.slot_from_zone(zone), slot)
+    for slot, zone_item in enumerate(world.zones_items):
+        check.equal(world.slot_from_zoneitem(zone_item), slot)
+
+
+def test_transformations_shared_between_worlds():
+    zones = [Zone("0"), Zone("1")]
+    items = [Item("wood"), Item("plank")]
+    zone_item = Item("tree")
+    transformations = [
+        Transformation(
+            inventory_changes=[
+                Use(CURRENT_ZONE, zone_item, consume=1),
+                Yield(PLAYER, items[0]),
+            ]
+        ),
+        Transformation(
+            inventory_changes=[
+                Use(PLAYER, items[0], consume=1),
+                Yield(PLAYER, items[1]),
+            ]
+        ),
+        Transformation(destination=zones[1], zone=zones[0]),
+    ]
+    start_zones_items = {zones[0]: [Stack(zone_item, 2)]}
+    world = World(
+        items, zones, [zone_item], transformations, zones[0], [], start_zones_items
+    )
+    reversed_world = World(
+        items[::-1],
+        zones[::-1],
+        [zone_item],
+        transformations,
+        zones[0],
+        [],
+        start_zones_items,
+    )
+    check.is_none(transformations[0]._operations)
+    with pytest.raises(ValueError):
+        transformations[0].operations()
+
+    for shared_world in (world, reversed_world):
+        state = HcraftState(shared_world)
+        for action in (0, 0, 1, 2):
+            check.is_true(transformations[action].is_valid(state))
+            check.is_true(state.apply(action))
+        wood, plank = (shared_world.slot_from_item(item) for item in items)
+        check.equal(state.player_inventory[wood], 1)
+        check.equal(state.player_inventory[plank], 1)
+        check.equal(state.zone_slot, shared_world.slot_from_zone(zones[1]))
+        check.is_false(transformations[0].is_valid(state))